@@ -0,0 +1,162 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from functools import lru_cache
+from typing import Any, List, Optional, Sequence
+
+import numpy as np
+from langchain_core.caches import BaseCache
+from langchain_core.embeddings import Embeddings
+from langchain_core.load import dumps, loads
+from langchain_core.outputs import Generation
+
+class CacheMiss(KeyError):
+    """Raised in replay mode when a response is not cached."""
+
+class ResponseCache:
+    """
+    Disk-backed cache of LLM and embedding responses in a SQLite file.
+
+    Entries are keyed by a hash of (namespace, model, temperature, input).
+    When the total size exceeds `max_bytes` the least recently used entries
+    are evicted. In `replay` mode the cache is read-only and a miss raises
+    CacheMiss, so a rerun is guaranteed not to call the model.
+    """
+
+    def __init__(self, path: str, max_bytes: int, mode: str = 'readwrite'):
+        if mode not in ('readwrite', 'replay'):
+            raise ValueError(f"Unsupported cache mode: {mode}")
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.replay = mode == 'replay'
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute(
+            'CREATE TABLE IF NOT EXISTS entries ('
+            'key TEXT PRIMARY KEY, value BLOB NOT NULL, size INTEGER NOT NULL, last_access REAL NOT NULL)'
+        )
+        self.db.execute('CREATE INDEX IF NOT EXISTS entries_last_access ON entries (last_access)')
+        self.db.commit()
+
+    @staticmethod
+    def key(*parts: Any) -> str:
+        return hashlib.sha256(json.dumps(parts, default=str).encode('utf-8')).hexdigest()
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self.lock:
+            row = self.db.execute('SELECT value FROM entries WHERE key = ?', (key,)).fetchone()
+            if row is None:
+                if self.replay:
+                    raise CacheMiss(key)
+                return None
+            if not self.replay:
+                self.db.execute('UPDATE entries SET last_access = ? WHERE key = ?', (time.time(), key))
+                self.db.commit()
+            return row[0]
+
+    def put(self, key: str, value: bytes) -> None:
+        if self.replay:
+            return
+        with self.lock:
+            self.db.execute(
+                'INSERT OR REPLACE INTO entries (key, value, size, last_access) VALUES (?, ?, ?, ?)',
+                (key, value, len(value), time.time()),
+            )
+            self._evict()
+            self.db.commit()
+
+    def _evict(self) -> None:
+        total = self.db.execute('SELECT COALESCE(SUM(size), 0) FROM entries').fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        # evict down to 90% of the limit so eviction does not run on every put
+        target = total - int(self.max_bytes * 0.9)
+        freed = 0
+        keys = []
+        for key, size in self.db.execute('SELECT key, size FROM entries ORDER BY last_access'):
+            keys.append((key,))
+            freed += size
+            if freed >= target:
+                break
+        self.db.executemany('DELETE FROM entries WHERE key = ?', keys)
+
+    def clear(self) -> None:
+        """Drop every entry, LLM and embedding alike. A no-op in replay mode."""
+        if self.replay:
+            return
+        with self.lock:
+            self.db.execute('DELETE FROM entries')
+            self.db.commit()
+
+class LangChainCache(BaseCache):
+    """Adapter for LangChain LLMs; llm_string already encodes model and temperature."""
+
+    def __init__(self, cache: ResponseCache):
+        self.cache = cache
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[Sequence[Generation]]:
+        value = self.cache.get(self.cache.key('llm', llm_string, prompt))
+        return loads(value.decode('utf-8')) if value is not None else None
+
+    def update(self, prompt: str, llm_string: str, return_val: Sequence[Generation]) -> None:
+        self.cache.put(self.cache.key('llm', llm_string, prompt), dumps(list(return_val)).encode('utf-8'))
+
+    def clear(self, **kwargs: Any) -> None:
+        self.cache.clear()
+
+class CachedEmbeddings(Embeddings):
+    """Caches embeddings per text as raw float32 bytes; only misses are sent to the model."""
+
+    def __init__(self, embeddings: Embeddings, model: str, cache: ResponseCache):
+        self.embeddings = embeddings
+        self.model = model
+        self.cache = cache
+
+    def embed_array(self, texts: List[str]) -> np.ndarray:
+        """Embeddings as one float32 (len(texts), dim) matrix."""
+        keys = [self.cache.key('embedding', self.model, text) for text in texts]
+        results: List[Optional[np.ndarray]] = []
+        for key in keys:
+            value = self.cache.get(key)
+            results.append(np.frombuffer(value, dtype=np.float32) if value is not None else None)
+
+        missing = [i for i, result in enumerate(results) if result is None]
+        if missing:
+            embed_array = getattr(self.embeddings, 'embed_array', None)
+            missing_texts = [texts[i] for i in missing]
+            if embed_array is not None:
+                vectors = embed_array(missing_texts)
+            else:
+                vectors = self.embeddings.embed_documents(missing_texts)
+            for i, vector in zip(missing, vectors):
+                # return the float32 round-trip so cached and fresh runs match exactly
+                vector = np.asarray(vector, dtype=np.float32)
+                self.cache.put(keys[i], vector.tobytes())
+                results[i] = vector
+        return np.asarray(results, dtype=np.float32)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.embed_array(texts).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+    async def embed_text(self, text: str, **kwargs) -> List[float]:
+        return self.embed_query(text)
+
+    async def aembed_text(self, text: str, **kwargs) -> List[float]:
+        return self.embed_query(text)
+
+@lru_cache(maxsize=1)
+def load_cache() -> Optional[ResponseCache]:
+    path = os.getenv('LLM_CACHE_PATH')
+    if not path:
+        return None
+    max_mb = int(os.getenv('LLM_CACHE_MAX_MB') or 1024)
+    mode = os.getenv('LLM_CACHE_MODE') or 'readwrite'
+    return ResponseCache(path, max_bytes=max_mb * 1024 * 1024, mode=mode)
@@ -1,9 +1,34 @@
+import base64
 import os
+import numpy as np
 import requests
 from typing import List
 from langchain_core.embeddings import Embeddings
 from langchain_ollama import OllamaEmbeddings
 from deepeval.models import DeepEvalBaseEmbeddingModel
+from cache import CachedEmbeddings, load_cache
+
+def request_embeddings(api_url: str, model: str, texts: List[str]) -> List[np.ndarray]:
+    """
+    Request embeddings from an OpenAI-compatible endpoint as base64 float32 (or the
+    EMBEDDING_ENCODING_FORMAT override) and decode them into float32 rows with frombuffer.
+    """
+    response = requests.post(
+        api_url,
+        headers = {"Content-Type": "application/json"},
+        json = {
+            "model": model,
+            "input": texts,
+            "encoding_format": os.getenv('EMBEDDING_ENCODING_FORMAT') or 'base64',
+        },
+    )
+    response.raise_for_status()
+
+    data = sorted(response.json()['data'], key=lambda item: item.get('index', 0))
+    if data and isinstance(data[0]['embedding'], str):
+        raw = b''.join(base64.b64decode(item['embedding']) for item in data)
+        return list(np.frombuffer(raw, dtype='<f4').reshape(len(data), -1))
+    return [np.asarray(item['embedding'], dtype=np.float32) for item in data]
 
 class OllamaRagasEmbeddings(OllamaEmbeddings):
     # need to implement BaseRagasEmbeddings https://docs.ragas.io/en/stable/references/embeddings/
@@ -28,22 +53,8 @@ class DeepEvalEmbeddings(DeepEvalBaseEmbeddingModel):
     def load_model(self):
         return self
 
-    def embed_texts(self, texts: List[str]) -> List[List[float]]:
-        response = requests.post(
-            self.api_url,
-            headers = {"Content-Type": "application/json"},
-            json = {
-                "model": self.model,
-                "input": texts,
-                "encoding_format": "float",
-            },
-        )
-        response.raise_for_status()
-
-        result = response.json()
-        embeddings = [item['embedding'] for item in result['data']]
-
-        return embeddings
+    def embed_texts(self, texts: List[str]) -> List[np.ndarray]:
+        return request_embeddings(self.api_url, self.model, texts)
 
     def embed_text(self, text: str) -> List[float]:
         return self.a_embed_texts([text])[0]
@@ -66,22 +77,12 @@ class LangChainEmbeddings(Embeddings):
         self.api_url = api_url
         self.model = model
 
-    def embed_documents(self, texts: List[str]) -> List[List[float]]:
-        response = requests.post(
-            self.api_url,
-            headers = {"Content-Type": "application/json"},
-            json = {
-                "model": self.model,
-                "input": texts,
-                "encoding_format": "float",
-            },
-        )
-        response.raise_for_status()
-
-        result = response.json()
-        embeddings = [item['embedding'] for item in result['data']]
+    def embed_array(self, texts: List[str]) -> np.ndarray:
+        """Embeddings as one float32 (len(texts), dim) matrix, without Python floats."""
+        return np.asarray(request_embeddings(self.api_url, self.model, texts), dtype=np.float32)
 
-        return embeddings
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.embed_array(texts).tolist()
 
     def embed_query(self, text: str) -> List[float]:
         return self.embed_documents([text])[0]
@@ -94,7 +95,13 @@ def load_embeddings():
     embedding = os.getenv('EMBEDDING_MODEL')
     if llm_type == "model_garden":
         embed_url = os.getenv('EMBEDDING_URL')
-        return LangChainEmbeddings(api_url=embed_url, model=embedding)
+        embeddings = LangChainEmbeddings(api_url=embed_url, model=embedding)
     elif llm_type == "ollama":
-        return OllamaRagasEmbeddings(model=embedding)
-    raise ValueError(f"Unsupported LLM type: {llm_type}")
+        embeddings = OllamaRagasEmbeddings(model=embedding)
+    else:
+        raise ValueError(f"Unsupported LLM type: {llm_type}")
+
+    cache = load_cache()
+    if cache is None:
+        return embeddings
+    return CachedEmbeddings(embeddings, model=f"{llm_type}/{embedding}", cache=cache)
@@ -1,32 +1,140 @@
 import argparse
+import hashlib
+import json
 import os
 import sys
+import time
 import pandas as pd
 import ast
 
+from typing import Iterator
 from dotenv import load_dotenv
 from ragas import evaluate, EvaluationDataset
 from ragas.metrics import context_precision, context_recall
 from llm import load_llm
+from retriever import KnowledgeServerRetriever, load_retriever
+from retrieval_metrics import latency_summary, retrieval_metrics
 
 load_dotenv()
 
-llm = load_llm()
+COLUMNS = ['user_input', 'reference_contexts', 'reference']
 
-def load_dataset(path: str) -> EvaluationDataset:
-    df = pd.read_csv(path, usecols=['user_input', 'reference_contexts', 'reference'])
-    df['reference_contexts'] = df['reference_contexts'].apply(ast.literal_eval)
-    df['retrieved_contexts'] = df['reference_contexts']
-    return EvaluationDataset.from_pandas(df)
+def iter_dataset(path: str, batch_size: int) -> Iterator[pd.DataFrame]:
+    """Stream the test set in batches; Parquet list columns need no parsing."""
+    if path.endswith('.parquet'):
+        import pyarrow.parquet as pq
+
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=batch_size, columns=COLUMNS):
+            df = batch.to_pandas()
+            df['reference_contexts'] = df['reference_contexts'].apply(list)
+            yield df
+        return
+
+    for df in pd.read_csv(path, usecols=COLUMNS, chunksize=batch_size):
+        df['reference_contexts'] = df['reference_contexts'].apply(ast.literal_eval)
+        yield df
+
+def retrieve(retriever: KnowledgeServerRetriever, df: pd.DataFrame, top_k: int, concurrency: int) -> list[float]:
+    contexts, latencies = retriever.search_many(df['user_input'].tolist(), top_k, concurrency)
+    df['retrieved_contexts'] = contexts
+    return latencies
+
+def evaluate_ragas(df: pd.DataFrame, llm) -> pd.DataFrame:
+    dataset = EvaluationDataset.from_pandas(df)
+    result = evaluate(dataset=dataset, metrics=[context_precision, context_recall], llm=llm)
+    return result.to_pandas()
+
+def evaluate_retrieval(df: pd.DataFrame, top_k: int, latencies: list[float]) -> pd.DataFrame:
+    metrics = retrieval_metrics(df['retrieved_contexts'].tolist(), df['reference_contexts'].tolist(), k=top_k)
+    result = pd.DataFrame({'user_input': df['user_input'].tolist(), **metrics})
+    result['latency_s'] = latencies
+    return result
+
+def file_digest(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        while chunk := f.read(1024 * 1024):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def check_manifest(output_dir: str, manifest: dict) -> None:
+    """
+    Part files are only valid for the run that wrote them: a different input
+    file, batch size, mode or top_k changes what batch N holds, so resuming
+    into a directory written by another run is refused.
+    """
+    path = os.path.join(output_dir, 'manifest.json')
+    if os.path.exists(path):
+        with open(path) as f:
+            existing = json.load(f)
+        if existing != manifest:
+            sys.exit(f'{output_dir} holds results of another run ({existing}), use a new output directory')
+        return
+    with open(path, 'w') as f:
+        json.dump(manifest, f, indent=2)
+
+def write_part(output_dir: str, index: int, result: pd.DataFrame) -> None:
+    # write then rename so an interrupted run never leaves a truncated part
+    path = os.path.join(output_dir, f'part-{index:05d}.parquet')
+    result.to_parquet(path + '.tmp', index=False)
+    os.replace(path + '.tmp', path)
+
+def summarize(results: pd.DataFrame, mode: str) -> None:
+    metric_columns = [c for c in results.columns if pd.api.types.is_numeric_dtype(results[c]) and c != 'latency_s']
+    for name in metric_columns:
+        print(f'{name}: {results[name].mean():.4f}')
+    if mode == 'retrieval':
+        for name, value in latency_summary(results['latency_s'].tolist()).items():
+            print(f'latency {name}: {value:.1f}')
 
 def main():
     parser = argparse.ArgumentParser()
     parser.add_argument('file_path', type=str)
+    parser.add_argument('-m', '--mode', choices=['ragas', 'retrieval'], default='ragas')
+    parser.add_argument('-k', '--top-k', type=int, default=4)
+    parser.add_argument('-j', '--concurrency', type=int, default=8)
+    parser.add_argument('-b', '--batch-size', type=int, default=256)
+    parser.add_argument('-o', '--output', type=str, help='directory for per-batch results; reruns skip finished batches')
     args = parser.parse_args()
-    
-    dataset = load_dataset(args.file_path)
-    result = evaluate(dataset=dataset, metrics=[context_precision, context_recall], llm=llm)
-    print(result)
+
+    if args.output:
+        os.makedirs(args.output, exist_ok=True)
+        check_manifest(args.output, {
+            'input_sha256': file_digest(args.file_path),
+            'batch_size': args.batch_size,
+            'mode': args.mode,
+            'top_k': args.top_k,
+        })
+
+    retriever = load_retriever()
+    llm = load_llm() if args.mode == 'ragas' else None
+    results = []
+    queries = 0
+    started = time.perf_counter()
+    for index, df in enumerate(iter_dataset(args.file_path, args.batch_size)):
+        part = os.path.join(args.output, f'part-{index:05d}.parquet') if args.output else None
+        if part and os.path.exists(part):
+            results.append(pd.read_parquet(part))
+            continue
+
+        latencies = retrieve(retriever, df, args.top_k, args.concurrency)
+        if args.mode == 'retrieval':
+            result = evaluate_retrieval(df, args.top_k, latencies)
+        else:
+            result = evaluate_ragas(df, llm)
+        if args.output:
+            write_part(args.output, index, result)
+        results.append(result)
+        queries += len(df)
+        print(f'batch {index}: {len(df)} queries', file=sys.stderr)
+
+    elapsed = time.perf_counter() - started
+    if not results:
+        print('No queries evaluated')
+        return
+    summarize(pd.concat(results, ignore_index=True), args.mode)
+    if queries:
+        print(f'{queries} queries evaluated in {elapsed:.2f}s ({queries / elapsed:.1f} queries/s)')
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -38,7 +38,11 @@ def main():
     
     docs = load_docs("../datasets")
     df = generate_dataset(docs, args.count)
-    df.to_csv(args.output, index=False)
+    if args.output.endswith('.parquet'):
+        # reference_contexts is stored as a native list column
+        df.to_parquet(args.output, index=False)
+    else:
+        df.to_csv(args.output, index=False)
 
 if __name__ == "__main__":
     main()
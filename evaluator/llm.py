@@ -1,25 +1,38 @@
 import requests
 import os
 
-from typing import List
+from typing import List, Optional
 from langchain_core.language_models.llms import LLM
 from langchain_core.outputs.llm_result import LLMResult, Generation
 from langchain_ollama import OllamaLLM
 from deepeval.models import DeepEvalBaseLLM
+from cache import LangChainCache, ResponseCache, load_cache
 
 class DeepEvalModel(DeepEvalBaseLLM):
     api_url: str
     model: str
     temperature: float = 0.4
 
-    def __init__(self, api_url, model):
+    def __init__(self, api_url, model, cache: Optional[ResponseCache] = None):
         self.api_url = api_url
         self.model = model
+        self.cache = cache
 
     def load_model(self):
         return self
 
     def generate(self, prompt: str) -> str:
+        if self.cache is None:
+            return self._generate(prompt)
+        key = self.cache.key('chat', self.model, self.temperature, prompt)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached.decode('utf-8')
+        output = self._generate(prompt)
+        self.cache.put(key, output.encode('utf-8'))
+        return output
+
+    def _generate(self, prompt: str) -> str:
         response = requests.post(
             self.api_url,
             headers = {"Content-Type": "application/json"},
@@ -59,12 +72,24 @@ class LangChainModel(LLM):
     api_url: str
     model: str
     temperature: float = 0.4
+    response_cache: Optional[ResponseCache] = None
     
     @property
     def _llm_type(self):
         return "model_garden"
 
     def _call(self, prompt: str, run_manager=None, stop=None):
+        if self.response_cache is None:
+            return self._request(prompt)
+        key = self.response_cache.key('chat', self.model, self.temperature, prompt)
+        cached = self.response_cache.get(key)
+        if cached is not None:
+            return cached.decode('utf-8')
+        output = self._request(prompt)
+        self.response_cache.put(key, output.encode('utf-8'))
+        return output
+
+    def _request(self, prompt: str) -> str:
         response = requests.post(
             self.api_url,
             headers = {"Content-Type": "application/json"},
@@ -104,9 +129,10 @@ class LangChainModel(LLM):
 def load_llm():
     llm_type = os.getenv('LLM_TYPE')
     model = os.getenv('MODEL_GARDEN_MODEL')
+    cache = load_cache()
     if llm_type == "model_garden":
         url = os.getenv('MODEL_GARDEN_URL')
-        return LangChainModel(api_url=url, model=model)
+        return LangChainModel(api_url=url, model=model, response_cache=cache)
     elif llm_type == "ollama":
-        return OllamaLLM(model=model, temperature=0.4)
+        return OllamaLLM(model=model, temperature=0.4, cache=LangChainCache(cache) if cache else None)
     raise ValueError(f"Unsupported LLM type: {llm_type}")
@@ -0,0 +1,81 @@
+import re
+import zlib
+from typing import Dict, List
+
+import numpy as np
+from scipy import sparse
+
+HOP_PREFIX = re.compile(r"^<\d+-hop>\s*")
+HASH_DIM = 1 << 20
+SHINGLE_SIZE = 3
+
+def _shingle_matrix(texts: List[str]) -> sparse.csr_matrix:
+    """Binary bag of hashed word 3-grams, one row per text."""
+    indptr = [0]
+    indices: List[int] = []
+    for text in texts:
+        words = HOP_PREFIX.sub("", text).lower().split()
+        grams = {
+            zlib.crc32(" ".join(words[i:i + SHINGLE_SIZE]).encode("utf-8")) % HASH_DIM
+            for i in range(max(1, len(words) - SHINGLE_SIZE + 1))
+        }
+        indices.extend(sorted(grams))
+        indptr.append(len(indices))
+    data = np.ones(len(indices), dtype=np.float32)
+    return sparse.csr_matrix((data, indices, indptr), shape=(len(texts), HASH_DIM))
+
+def relevance_matrix(retrieved: List[str], references: List[str], threshold: float) -> np.ndarray:
+    """
+    (len(retrieved), len(references)) boolean matrix: a retrieved chunk matches a
+    reference context when at least `threshold` of its shingles occur in it.
+    Chunks are usually smaller than the page-level reference contexts, so
+    containment is used rather than Jaccard similarity.
+    """
+    if not retrieved or not references:
+        return np.zeros((len(retrieved), len(references)), dtype=bool)
+    r = _shingle_matrix(retrieved)
+    c = _shingle_matrix(references)
+    overlap = (r @ c.T).toarray()
+    sizes = np.maximum(np.asarray(r.sum(axis=1)), 1.0)
+    return (overlap / sizes) >= threshold
+
+def retrieval_metrics(retrieved: List[List[str]], references: List[List[str]], k: int, threshold: float = 0.5) -> Dict[str, np.ndarray]:
+    """
+    Per-query recall@k, reciprocal rank and nDCG@k with binary relevance. A
+    rank gains 1 when it is the first to match some reference context, so
+    later matches of the same reference gain nothing. The ideal DCG places one
+    match per reference at the top ranks, so missed references lower nDCG.
+    """
+    recall = np.zeros(len(retrieved))
+    reciprocal_rank = np.zeros(len(retrieved))
+    ndcg = np.zeros(len(retrieved))
+    discounts = 1.0 / np.log2(np.arange(2, k + 2))
+
+    for q, (contexts, refs) in enumerate(zip(retrieved, references)):
+        matches = relevance_matrix(contexts[:k], refs, threshold)
+        if matches.size == 0:
+            continue
+        relevant = matches.any(axis=1)
+        recall[q] = matches.any(axis=0).mean()
+        if relevant.any():
+            reciprocal_rank[q] = 1.0 / (np.argmax(relevant) + 1)
+        found = matches.any(axis=0)
+        gains = np.bincount(matches.argmax(axis=0)[found], minlength=len(matches)) > 0
+        idcg = discounts[:min(len(refs), k)].sum()
+        ndcg[q] = (gains * discounts[:len(gains)]).sum() / idcg
+
+    return {
+        f"recall@{k}": recall,
+        "mrr": reciprocal_rank,
+        f"ndcg@{k}": ndcg,
+    }
+
+def latency_summary(latencies: List[float]) -> Dict[str, float]:
+    values = np.asarray(latencies) * 1000
+    return {
+        "mean_ms": float(values.mean()),
+        "p50_ms": float(np.percentile(values, 50)),
+        "p90_ms": float(np.percentile(values, 90)),
+        "p99_ms": float(np.percentile(values, 99)),
+        "max_ms": float(values.max()),
+    }
@@ -0,0 +1,71 @@
+import asyncio
+import os
+import time
+from typing import List, Optional, Tuple
+
+from mcp import ClientSession
+from mcp.client.streamable_http import streamablehttp_client
+
+class KnowledgeServerRetriever:
+    """
+    Calls the knowledge server's `query_knowledge_base` MCP tool, so
+    evaluations measure the deployed retriever end to end: its hybrid or
+    two-stage search, document-level search, collection and datasource
+    routing, query cache and response packing.
+    """
+
+    def __init__(self, url: str, collections: Optional[List[str]] = None,
+                 datasources: Optional[List[str]] = None):
+        self.url = url
+        self.collections = collections
+        self.datasources = datasources
+
+    def _arguments(self, query: str, top_k: int) -> dict:
+        arguments = {'query': query, 'top_k': top_k, 'fields': ['text']}
+        if self.collections:
+            arguments['collection'] = self.collections
+        if self.datasources:
+            arguments['datasource'] = self.datasources
+        return arguments
+
+    async def _search(self, session: ClientSession, query: str, top_k: int) -> List[str]:
+        result = await session.call_tool('query_knowledge_base', self._arguments(query, top_k))
+        if result.isError:
+            raise RuntimeError(f'query_knowledge_base failed for {query!r}: {result.content}')
+        hits = (result.structuredContent or {}).get('result', [])
+        return [hit['text'] for hit in hits]
+
+    async def _search_many(self, queries: List[str], top_k: int,
+                           concurrency: int) -> List[Tuple[List[str], float]]:
+        semaphore = asyncio.Semaphore(concurrency)
+        async with streamablehttp_client(self.url) as (read, write, _):
+            async with ClientSession(read, write) as session:
+                await session.initialize()
+
+                async def timed_search(query: str) -> Tuple[List[str], float]:
+                    async with semaphore:
+                        started = time.perf_counter()
+                        contexts = await self._search(session, query, top_k)
+                        return contexts, time.perf_counter() - started
+
+                return await asyncio.gather(*(timed_search(query) for query in queries))
+
+    def search(self, query: str, top_k: int) -> List[str]:
+        contexts, _ = self.search_many([query], top_k, concurrency=1)
+        return contexts[0]
+
+    def search_many(self, queries: List[str], top_k: int, concurrency: int) -> Tuple[List[List[str]], List[float]]:
+        """Search every query concurrently, returning contexts and per-query latency in seconds."""
+        results = asyncio.run(self._search_many(queries, top_k, concurrency))
+        return [contexts for contexts, _ in results], [latency for _, latency in results]
+
+def _split_env(name: str) -> Optional[List[str]]:
+    value = os.getenv(name) or ''
+    return [item.strip() for item in value.split(',') if item.strip()] or None
+
+def load_retriever() -> KnowledgeServerRetriever:
+    return KnowledgeServerRetriever(
+        url=os.getenv('KNOWLEDGE_SERVER_URL') or 'http://127.0.0.1:8000/mcp',
+        collections=_split_env('COLLECTION_NAME'),
+        datasources=_split_env('DATASOURCE'),
+    )
@@ -0,0 +1,53 @@
+import os
+import sys
+
+from langchain_core.embeddings import Embeddings
+from langchain_core.outputs import Generation
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cache import CachedEmbeddings, LangChainCache, ResponseCache
+
+def test_clear_deletes_every_entry(tmp_path):
+    cache = ResponseCache(str(tmp_path / 'cache.sqlite'), max_bytes=1 << 20)
+    llm_cache = LangChainCache(cache)
+    llm_cache.update('prompt', 'llm', [Generation(text='answer')])
+    cache.put(cache.key('embedding', 'model', 'text'), b'vector')
+
+    llm_cache.clear()
+
+    assert llm_cache.lookup('prompt', 'llm') is None
+    assert cache.db.execute('SELECT COUNT(*) FROM entries').fetchone()[0] == 0
+
+def test_clear_keeps_entries_in_replay_mode(tmp_path):
+    path = str(tmp_path / 'cache.sqlite')
+    ResponseCache(path, max_bytes=1 << 20).put('key', b'value')
+    replay = ResponseCache(path, max_bytes=1 << 20, mode='replay')
+
+    LangChainCache(replay).clear()
+
+    assert replay.get('key') == b'value'
+
+class CountingEmbeddings(Embeddings):
+    def __init__(self):
+        self.calls = 0
+
+    def embed_documents(self, texts):
+        self.calls += 1
+        return [[float(len(text)), 0.5] for text in texts]
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+def test_cached_embeddings_return_lists(tmp_path):
+    inner = CountingEmbeddings()
+    cache = ResponseCache(str(tmp_path / 'cache.sqlite'), max_bytes=1 << 20)
+    embeddings = CachedEmbeddings(inner, model='model', cache=cache)
+
+    fresh = embeddings.embed_documents(['a', 'bb'])
+    cached = embeddings.embed_documents(['a', 'bb'])
+
+    assert fresh == cached == [[1.0, 0.5], [2.0, 0.5]]
+    assert all(type(value) is float for vector in fresh for value in vector)
+    assert embeddings.embed_query('a') == [1.0, 0.5]
+    assert inner.calls == 1
@@ -0,0 +1,42 @@
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from retrieval_metrics import retrieval_metrics
+
+REFERENCE_A = 'the quick brown fox jumps over the lazy dog near the river bank'
+REFERENCE_B = 'milvus stores dense and sparse vectors in partitioned collections'
+UNRELATED = 'an unrelated chunk about cooking pasta with garlic and olive oil'
+
+def ndcg(retrieved, references, k=4):
+    return retrieval_metrics([retrieved], [references], k=k)[f'ndcg@{k}'][0]
+
+def test_ndcg_is_bounded_with_duplicate_matches():
+    # the same reference is matched at every rank, only the first one counts
+    value = ndcg([REFERENCE_A] * 4, [REFERENCE_A, REFERENCE_B])
+    discounts = 1.0 / np.log2(np.arange(2, 6))
+    assert 0.0 <= value <= 1.0
+    assert np.isclose(value, discounts[0] / (discounts[0] + discounts[1]))
+
+def test_ndcg_penalizes_missed_references():
+    value = ndcg([REFERENCE_A, UNRELATED, UNRELATED, UNRELATED], [REFERENCE_A, REFERENCE_B])
+    assert value < 1.0
+    assert ndcg([REFERENCE_A, REFERENCE_B], [REFERENCE_A, REFERENCE_B]) == 1.0
+
+def test_ndcg_is_bounded_for_a_combined_chunk():
+    # one chunk matching both references at the first rank
+    value = ndcg([REFERENCE_A + ' ' + REFERENCE_B], [REFERENCE_A, REFERENCE_B])
+    assert 0.0 <= value <= 1.0
+
+def test_ndcg_credits_each_reference_at_its_first_rank():
+    value = ndcg([UNRELATED, REFERENCE_A, REFERENCE_A, REFERENCE_B], [REFERENCE_A, REFERENCE_B])
+    discounts = 1.0 / np.log2(np.arange(2, 6))
+    expected = (discounts[1] + discounts[3]) / (discounts[0] + discounts[1])
+    assert 0.0 <= value <= 1.0
+    assert np.isclose(value, expected)
+
+def test_ndcg_is_zero_without_matches():
+    assert ndcg([UNRELATED], [REFERENCE_A]) == 0.0
@@ -1,15 +1,24 @@
+import argparse
+import base64
+import functools
+import json
+import logging
 import os
+import sqlite3
+import time
+import numpy as np
 import requests
-from pymilvus import AnnSearchRequest, DataType, Function, FunctionType, MilvusClient, model, RRFRanker
+from pymilvus import AnnSearchRequest, DataType, Function, FunctionType, MilvusClient, RRFRanker
 from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_community.document_loaders import PyPDFLoader
 
-EMBEDDING_FN = model.DefaultEmbeddingFunction()
+from profiler import NullProfiler, build_profiler
+
 CHUNK_SIZE = 1000
-VECTOR_DIM = EMBEDDING_FN.dim
 COLLECTION_NAME = 'pdf_collection'
 DATASET_DIR = './datasets'
-CLIENT = MilvusClient(uri=os.getenv('MILVUS_ADDR') or '')
+STATE_PATH = os.getenv('INGEST_STATE_PATH') or 'ingest_state.sqlite'
+MAX_ATTEMPTS = int(os.getenv('INGEST_MAX_ATTEMPTS') or 3)
+RETRY_BACKOFF_SECONDS = float(os.getenv('INGEST_RETRY_BACKOFF_SECONDS') or 1)
 TEXT_SPLITTER = RecursiveCharacterTextSplitter(
     chunk_size=CHUNK_SIZE,
     chunk_overlap=CHUNK_SIZE/5, # Overlap to maintain context between chunks
@@ -17,8 +26,27 @@ TEXT_SPLITTER = RecursiveCharacterTextSplitter(
     is_separator_regex=False,
 )
 
-def define_collection() -> None:
-    schema = CLIENT.create_schema(auto_id=True)
+# Built on first use so importing this module (or `--help`) neither loads the
+# ONNX model nor connects to Milvus.
+@functools.cache
+def embedding_fn():
+    from pymilvus import model
+    return model.DefaultEmbeddingFunction()
+
+@functools.cache
+def client() -> MilvusClient:
+    return MilvusClient(
+        uri=os.getenv('MILVUS_ADDR') or '',
+        timeout=float(os.getenv('MILVUS_TIMEOUT') or 10),
+    )
+
+def define_collection(reset: bool) -> None:
+    if client().has_collection(COLLECTION_NAME):
+        if not reset:
+            return # keep what previous runs ingested
+        client().drop_collection(COLLECTION_NAME)
+
+    schema = client().create_schema(auto_id=True)
     bm25_function = Function(
         name="text_bm25_emb",
         input_field_names=["text"],
@@ -43,7 +71,7 @@ def define_collection() -> None:
     schema.add_field(
         field_name='vector_dense',
         datatype=DataType.FLOAT_VECTOR,
-        dim=VECTOR_DIM,
+        dim=embedding_fn().dim,
         enable_analyzer=True,
         description='document chunked text dense vector',
     )
@@ -57,7 +85,7 @@ def define_collection() -> None:
         datatype=DataType.JSON,
         description='document metadata',
     )
-    index_params = CLIENT.prepare_index_params()
+    index_params = client().prepare_index_params()
     index_params.add_index(
         field_name='vector_dense',
         index_name='vector_dense_index',
@@ -72,39 +100,94 @@ def define_collection() -> None:
         params={"inverted_index_algo": "DAAT_MAXSCORE"}, # need to compare another algo
     )
 
-    if CLIENT.has_collection(COLLECTION_NAME):
-        CLIENT.drop_collection(COLLECTION_NAME)
-
-    CLIENT.create_collection(
+    client().create_collection(
         collection_name=COLLECTION_NAME,
         schema=schema,
         index_params=index_params,
     )
 
-def load_datasets() -> None:
+def open_state(path: str) -> sqlite3.Connection:
+    """Per-file ingest status (pending, done or failed) persisted across runs."""
+    state = sqlite3.connect(path)
+    state.execute(
+        'CREATE TABLE IF NOT EXISTS files ('
+        'path TEXT PRIMARY KEY, status TEXT NOT NULL, attempts INTEGER NOT NULL DEFAULT 0, '
+        "error TEXT NOT NULL DEFAULT '', updated_at REAL NOT NULL)"
+    )
+    state.commit()
+    return state
+
+def mark(state: sqlite3.Connection, path: str, status: str, attempts: int = 0, error: str = '') -> None:
+    state.execute(
+        'INSERT OR REPLACE INTO files (path, status, attempts, error, updated_at) VALUES (?, ?, ?, ?, ?)',
+        (path, status, attempts, error, time.time()),
+    )
+    state.commit()
+
+def load_datasets(profiler: NullProfiler, state: sqlite3.Connection, retry_failed: bool) -> None:
     for root, _, files in os.walk(DATASET_DIR):
         for file in files:
-            if file.lower().endswith('.pdf'):
-                file_path = os.path.join(root, file)
-                docs = PyPDFLoader(file_path).load()
-                chunks = TEXT_SPLITTER.split_documents(docs)
-                data = []
-                for i in range(len(chunks)):
-                    chunk = chunks[i]
-                    vector = vectorize([chunk.page_content])
-                    data.append({
-                        "vector_dense": vector[0],
-                        "text": chunk.page_content[:CHUNK_SIZE],
-                        "metadata": chunk.metadata,
-                    })
-                CLIENT.insert(
-                    collection_name=COLLECTION_NAME,
-                    data=data,
-                )
+            if not file.lower().endswith('.pdf'):
+                continue
+            file_path = os.path.join(root, file)
+            row = state.execute('SELECT status FROM files WHERE path = ?', (file_path,)).fetchone()
+            status = row[0] if row else None
+            if status == 'done' or (status == 'failed' and not retry_failed):
+                continue
+            if status == 'pending':
+                # the previous run stopped while ingesting this file, drop what it inserted
+                client().load_collection(collection_name=COLLECTION_NAME)
+                client().delete(collection_name=COLLECTION_NAME, filter=f'metadata["source"] == {json.dumps(file_path)}')
+            mark(state, file_path, 'pending')
+
+            for attempt in range(1, MAX_ATTEMPTS + 1):
+                try:
+                    ingest_file(file_path, profiler)
+                    mark(state, file_path, 'done', attempt)
+                    break
+                except Exception as e:
+                    if attempt == MAX_ATTEMPTS:
+                        logging.error('Giving up on %s after %d attempts: %s', file_path, attempt, e)
+                        mark(state, file_path, 'failed', attempt, repr(e))
+                        break
+                    delay = RETRY_BACKOFF_SECONDS * 2 ** (attempt - 1)
+                    logging.warning('Ingesting %s failed (attempt %d/%d), retrying in %.1fs: %s',
+                                    file_path, attempt, MAX_ATTEMPTS, delay, e)
+                    time.sleep(delay)
+
+    for path, attempts, error in state.execute("SELECT path, attempts, error FROM files WHERE status = 'failed'"):
+        logging.warning('Dead letter %s after %d attempts: %s', path, attempts, error)
+
+def ingest_file(file_path: str, profiler: NullProfiler) -> None:
+    from langchain_community.document_loaders import PyPDFLoader
+
+    with profiler.stage('load'):
+        docs = PyPDFLoader(file_path).load()
+    with profiler.stage('split'):
+        chunks = TEXT_SPLITTER.split_documents(docs)
+    if not chunks:
+        profiler.record_document(file_path)
+        return
+    # embed the whole file in one call so the model can batch it
+    with profiler.stage('embed'):
+        vectors = vectorize([chunk.page_content for chunk in chunks])
+    data = []
+    for chunk, vector in zip(chunks, vectors):
+        data.append({
+            "vector_dense": vector,
+            "text": chunk.page_content[:CHUNK_SIZE],
+            "metadata": chunk.metadata,
+        })
+    with profiler.stage('insert'):
+        client().insert(
+            collection_name=COLLECTION_NAME,
+            data=data,
+        )
+    profiler.record_document(file_path)
 
 def search(query: str, limit: int = 2, output_fields: list = ['text', 'metadata']) -> list:
     vector_search = {
-        "data": vectorize([query]),
+        "data": list(vectorize([query])),
         "anns_field": "vector_dense",
         "param": {"nprobe": 10},
         "limit": limit,
@@ -120,7 +203,7 @@ def search(query: str, limit: int = 2, output_fields: list = ['text', 'metadata'
         AnnSearchRequest(**fulltext_search),
     ]
     
-    res = CLIENT.hybrid_search(
+    res = client().hybrid_search(
         collection_name=COLLECTION_NAME,
         reqs=reqs,
         ranker=RRFRanker(),
@@ -133,10 +216,10 @@ def search(query: str, limit: int = 2, output_fields: list = ['text', 'metadata'
         for hit in hits
     ]
 
-def vectorize(texts: list[str]) -> list[list[float]]:
+def vectorize(texts: list[str]) -> np.ndarray:
     url = os.getenv('MODEL_GARDEN_URL') or ''
     if url == '':
-        return EMBEDDING_FN.encode_documents(texts)
+        return np.asarray(embedding_fn().encode_documents(texts), dtype=np.float32)
 
     headers = {
             'Content-Type': 'application/json',
@@ -144,20 +227,52 @@ def vectorize(texts: list[str]) -> list[list[float]]:
     payload = {
             "model": os.getenv('MODEL_NAME'),
             "input": texts,
-            "encoding_format": "float",
+            # base64 float32 is decoded with frombuffer instead of parsing a JSON float per component
+            "encoding_format": os.getenv('MODEL_ENCODING_FORMAT') or 'base64',
     }
     response = requests.post(url, headers=headers, json=payload)
     response.raise_for_status()
-    result = response.json()
-    embeddings = [item['embedding'] for item in result['data']]
-    return embeddings
+    data = sorted(response.json()['data'], key=lambda item: item.get('index', 0))
+    if data and isinstance(data[0]['embedding'], str):
+        raw = b''.join(base64.b64decode(item['embedding']) for item in data)
+        return np.frombuffer(raw, dtype='<f4').reshape(len(data), -1)
+    return np.asarray([item['embedding'] for item in data], dtype=np.float32)
 
 def main():
-    define_collection()
-    load_datasets()
-    for hit in search('why do we need barito?', limit=3):
+    parser = argparse.ArgumentParser(description='Seed Milvus with the PDF datasets')
+    parser.add_argument(
+        '--profile',
+        nargs='?',
+        const='profile',
+        default=None,
+        metavar='DIR',
+        help='profile each ingest stage and the search, writing the results to DIR (default: profile)',
+    )
+    parser.add_argument('--reset', action='store_true', help='drop the collection and ingest every file again')
+    parser.add_argument('--retry-failed', action='store_true', help='retry files that failed in a previous run')
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    profiler = build_profiler(args.profile, logging.getLogger('ingester'))
+    profiler.start()
+
+    state = open_state(STATE_PATH)
+    if args.reset:
+        state.execute('DELETE FROM files')
+        state.commit()
+    define_collection(reset=args.reset)
+    load_datasets(profiler, state, args.retry_failed)
+    state.close()
+    with profiler.stage('flush'):
+        client().flush(collection_name=COLLECTION_NAME)
+        client().load_collection(collection_name=COLLECTION_NAME) # load before the first search instead of on it
+    with profiler.stage('search'):
+        hits = search('why do we need barito?', limit=3)
+    for hit in hits:
         print(f'id: {hit.id}\ndistance: {hit.distance}\ntext: {hit.entity.text}\nmetadata: {hit.metadata}\n')
 
+    profiler.stop()
+    profiler.report()
+
 
 
 if __name__ == "__main__":
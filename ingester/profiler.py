@@ -0,0 +1,92 @@
+import logging
+import os
+import time
+import tracemalloc
+from collections import Counter
+from collections.abc import Iterator
+from contextlib import contextmanager, nullcontext
+
+class NullProfiler:
+    """Profiler used when profiling is off. Every hook is a no-op."""
+
+    def start(self) -> None:
+        pass
+
+    def stop(self) -> None:
+        pass
+
+    def stage(self, name: str):
+        return nullcontext()
+
+    def record_document(self, name: str) -> None:
+        pass
+
+    def report(self) -> None:
+        pass
+
+class StageProfiler(NullProfiler):
+    """
+    Wall-clock time per ingest stage (nested stages are reported under their
+    parent, e.g. `load;split`) and the peak traced memory of every file.
+
+    `report` writes `summary.txt` (time per stage and the files with the
+    highest peak memory) and `memory.tsv` (peak memory per file) to
+    `output_dir`.
+    """
+
+    def __init__(self, output_dir: str, logger: logging.Logger, top_n: int = 20):
+        self.output_dir = output_dir
+        self.logger = logger
+        self.top_n = top_n
+        self.stage_seconds: Counter[str] = Counter()
+        self.document_peaks: list[tuple[str, int]] = []
+        self._stack: list[str] = []
+
+    def start(self) -> None:
+        tracemalloc.start()
+        self.logger.info('Profiling into %s', self.output_dir)
+
+    def stop(self) -> None:
+        tracemalloc.stop()
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        self._stack.append(name)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stage_seconds[';'.join(self._stack)] += time.perf_counter() - started
+            self._stack.pop()
+
+    def record_document(self, name: str) -> None:
+        """Record the peak memory since the previous file."""
+        if not tracemalloc.is_tracing():
+            return
+        _, peak = tracemalloc.get_traced_memory()
+        self.document_peaks.append((name, peak))
+        tracemalloc.reset_peak()
+
+    def report(self) -> None:
+        os.makedirs(self.output_dir, exist_ok=True)
+        with open(os.path.join(self.output_dir, 'memory.tsv'), 'w') as f:
+            f.write('document\tpeak_bytes\n')
+            for name, peak in self.document_peaks:
+                f.write(f'{name}\t{peak}\n')
+
+        lines = ['Time per stage:']
+        for stage, seconds in sorted(self.stage_seconds.items()):
+            lines.append(f'  {seconds:10.3f} s  {stage}')
+        lines.append('')
+        lines.append('Peak memory per file:')
+        for name, peak in sorted(self.document_peaks, key=lambda item: -item[1])[:self.top_n]:
+            lines.append(f'  {peak / (1 << 20):10.1f} MiB  {name}')
+        summary = '\n'.join(lines) + '\n'
+        with open(os.path.join(self.output_dir, 'summary.txt'), 'w') as f:
+            f.write(summary)
+        self.logger.info('Profile written to %s\n%s', self.output_dir, summary)
+
+def build_profiler(output_dir: str | None, logger: logging.Logger) -> NullProfiler:
+    if not output_dir:
+        return NullProfiler()
+    return StageProfiler(output_dir, logger)
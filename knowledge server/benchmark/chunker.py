@@ -0,0 +1,92 @@
+"""
+Compare the recursive character splitter with the token chunker on a corpus.
+
+    uv run python -m benchmark.chunker ../datasets --tokenizer google/embeddinggemma-300m
+
+Documents are loaded once up front so only splitting is timed. Token counts
+of every chunk are measured with the same tokenizer the token chunker budgets
+with, to show how many chunks would overflow the embedding model's context.
+"""
+
+import argparse
+import logging
+import statistics
+import time
+
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from loader.directory import DirectoryLoader
+from transformer.chunker import TokenTextChunker, load_tokenizer
+
+
+def measure(name, split, documents, tokenizer, max_tokens, repeat) -> None:
+    timings = []
+    chunks = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        chunks = split(documents)
+        timings.append(time.perf_counter() - started)
+
+    token_counts = [len(tokenizer.offsets(chunk.page_content)) for chunk in chunks]
+    over_budget = sum(1 for count in token_counts if count > max_tokens)
+    print(
+        f"{name:<10} median {statistics.median(timings) * 1000:8.1f} ms  "
+        f"chunks {len(chunks):6d}  "
+        f"tokens/chunk mean {statistics.fmean(token_counts or [0]):6.1f} "
+        f"max {max(token_counts or [0]):5d}  "
+        f"over {max_tokens} tokens: {over_budget}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("path", type=str)
+    parser.add_argument("--tokenizer", type=str, default="")
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--chunk-overlap", type=int, default=200)
+    parser.add_argument("--max-tokens", type=int, default=256)
+    parser.add_argument("--overlap-tokens", type=int, default=32)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    logger = logging.getLogger("benchmark")
+    documents = DirectoryLoader(args.path, logger).load()
+    print(
+        f"{len(documents)} documents, "
+        f"{sum(len(d.page_content) for d in documents)} characters"
+    )
+
+    tokenizer = load_tokenizer(args.tokenizer)
+    recursive = RecursiveCharacterTextSplitter(
+        chunk_size=args.chunk_size,
+        chunk_overlap=args.chunk_overlap,
+        length_function=len,
+        is_separator_regex=False,
+    )
+    token = TokenTextChunker(
+        tokenizer=args.tokenizer,
+        max_tokens=args.max_tokens,
+        overlap_tokens=args.overlap_tokens,
+        max_chars=args.chunk_size,
+    )
+
+    measure(
+        "recursive",
+        recursive.split_documents,
+        documents,
+        tokenizer,
+        args.max_tokens,
+        args.repeat,
+    )
+    measure(
+        "token",
+        token.split_documents,
+        documents,
+        tokenizer,
+        args.max_tokens,
+        args.repeat,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Measure the cold import time of the server (or the ingester) entry point.
+
+    uv run python -m benchmark.import_time
+    uv run python -m benchmark.import_time --module main --cwd ../ingester
+
+Each run starts a fresh interpreter with `-X importtime`, so nothing is cached
+in `sys.modules`. The median wall-clock time of the import is printed with the
+heaviest modules of the last run, by cumulative and by self time. With
+`--max-ms` the benchmark exits with status 1 when the median exceeds the
+budget, so a new eager import of a heavy dependency is caught in CI.
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+
+def parse_importtime(stderr: str) -> list[tuple[str, int, int, int]]:
+    """Return (module, depth, self_us, cumulative_us) of every imported module."""
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:") :].split("|", 2)
+        depth = (len(name) - len(name.lstrip())) // 2
+        modules.append((name.strip(), depth, int(self_us), int(cumulative_us)))
+    return modules
+
+
+def measure(module: str, cwd: str) -> tuple[float, list[tuple[str, int, int, int]]]:
+    started = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=cwd,
+        capture_output=True,
+        text=True,
+    )
+    elapsed = time.perf_counter() - started
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr[-2000:]}")
+    return elapsed, parse_importtime(result.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--module", type=str, default="main")
+    parser.add_argument("--cwd", type=str, default=os.getcwd())
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--max-ms", type=float, default=0)
+    args = parser.parse_args()
+
+    timings = []
+    modules = []
+    for _ in range(args.repeat):
+        elapsed, modules = measure(args.module, args.cwd)
+        timings.append(elapsed)
+
+    median_ms = statistics.median(timings) * 1000
+    print(
+        f"import {args.module}: median {median_ms:.1f} ms over {args.repeat} runs "
+        f"(interpreter start included), {len(modules)} modules imported"
+    )
+
+    top_level = [entry for entry in modules if entry[1] == 0]
+    top_level.sort(key=lambda entry: -entry[3])
+    print("\nTop-level imports by cumulative time (last run):")
+    for name, _, _, cumulative_us in top_level[: args.top]:
+        print(f"  {cumulative_us / 1000:8.1f} ms  {name}")
+
+    print("\nModules by self time (last run):")
+    for name, _, self_us, _ in sorted(modules, key=lambda e: -e[2])[: args.top]:
+        print(f"  {self_us / 1000:8.1f} ms  {name}")
+
+    if args.max_ms > 0 and median_ms > args.max_ms:
+        print(f"\nimport {args.module} exceeds the {args.max_ms:.0f} ms budget")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Load test the MCP server's query_knowledge_base tool.
+
+    uv run python -m benchmark.load_test --url http://127.0.0.1:8000/mcp --clients 32
+
+Each client opens its own MCP session and calls the tool back to back for the
+duration of the test, drawing queries in its own random order. Run it against
+the server with `server.workers` set to 1, 2, 4, ... to see how throughput
+scales with worker processes.
+
+The server's query cache answers repeated and paraphrased queries without
+searching, so with the few built-in queries the test measures the cache.
+Pass `--queries` a file with one query per line (e.g. the `user_input` column
+of an evaluator test set) holding more distinct queries than
+`query_cache_size`, or set `query_cache_size: 0` on the server for the run.
+"""
+
+import argparse
+import asyncio
+import random
+import statistics
+import time
+
+from mcp import ClientSession
+from mcp.client.streamable_http import streamablehttp_client
+
+QUERIES = [
+    "What is Barito project name is inspired from?",
+    "Who is the goto financial head of consumer payment infrastructure?",
+    "How to query pod metrics?",
+    "how do I get pod metrics",
+    "Why do we need barito?",
+]
+
+
+def load_queries(path: str | None) -> list[str]:
+    if not path:
+        return QUERIES
+    with open(path, "r", encoding="utf-8") as f:
+        queries = [line.strip() for line in f if line.strip()]
+    if not queries:
+        raise ValueError(f"{path} holds no queries")
+    return queries
+
+
+def shuffled(queries: list[str], seed: int):
+    rng = random.Random(seed)
+    order = list(queries)
+    while True:
+        rng.shuffle(order)
+        yield from order
+
+
+async def run_client(
+    url: str,
+    deadline: float,
+    top_k: int,
+    queries: list[str],
+    seed: int,
+    latencies: list[float],
+):
+    order = shuffled(queries, seed)
+    async with streamablehttp_client(url) as (read, write, _):
+        async with ClientSession(read, write) as session:
+            await session.initialize()
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                result = await session.call_tool(
+                    "query_knowledge_base", {"query": next(order), "top_k": top_k}
+                )
+                if result.isError:
+                    raise RuntimeError(f"Tool call failed: {result.content}")
+                latencies.append(time.perf_counter() - started)
+
+
+async def run(args: argparse.Namespace) -> None:
+    queries = load_queries(args.queries)
+    latencies: list[float] = []
+    started = time.perf_counter()
+    deadline = started + args.duration
+    await asyncio.gather(
+        *(
+            run_client(args.url, deadline, args.top_k, queries, i, latencies)
+            for i in range(args.clients)
+        )
+    )
+    elapsed = time.perf_counter() - started
+
+    latencies_ms = sorted(latency * 1000 for latency in latencies)
+    quantiles = statistics.quantiles(latencies_ms, n=100)
+    print(
+        f"{len(latencies)} calls ({len(queries)} distinct queries) from "
+        f"{args.clients} clients in {elapsed:.1f}s: "
+        f"{len(latencies) / elapsed:.1f} calls/s, "
+        f"p50 {quantiles[49]:.1f}ms p90 {quantiles[89]:.1f}ms "
+        f"p99 {quantiles[98]:.1f}ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", type=str, default="http://127.0.0.1:8000/mcp")
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=30)
+    parser.add_argument("--top-k", type=int, default=4)
+    parser.add_argument(
+        "--queries", type=str, default=None, help="file with one query per line"
+    )
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,5 @@
+import os
+
 import yaml
 
 
@@ -13,6 +15,11 @@ class Config:
     chunk_size: int
     chunk_overlap: int
     embeddings: "EmbeddingsConfig"
+    dedup: "DedupConfig"
+    splitter: "SplitterConfig"
+    server: "ServerConfig"
+    ingest: "IngestConfig"
+    parse_cache: "ParseCacheConfig"
 
     def __init__(self, filepath):
         config = load_config(filepath)
@@ -24,11 +31,48 @@ class Config:
         self.chunk_overlap = config.get("chunk_overlap", 200)
         self.embeddings = EmbeddingsConfig(config)
         self.lark = LarkConfig(config)
+        self.dedup = DedupConfig(config)
+        self.splitter = SplitterConfig(config)
+        self.server = ServerConfig(config)
+        self.ingest = IngestConfig(config)
+        self.parse_cache = ParseCacheConfig(config)
+
+
+class IngestConfig:
+    state_path: str
+    max_attempts: int
+    retry_backoff_seconds: float
+
+    def __init__(self, config: dict):
+        ingest_config = config.get("ingest", None) or {}
+
+        self.state_path = ingest_config.get("state_path", "ingest_state.sqlite")
+        self.max_attempts = ingest_config.get("max_attempts", 3)
+        self.retry_backoff_seconds = ingest_config.get("retry_backoff_seconds", 1.0)
+
+
+class ParseCacheConfig:
+    enabled: bool
+    directory: str
+
+    def __init__(self, config: dict):
+        parse_cache_config = config.get("parse_cache", None) or {}
+
+        self.enabled = parse_cache_config.get("enabled", True)
+        self.directory = parse_cache_config.get("directory", "parse_cache")
 
 
 class EmbeddingsConfig:
     source: str
     model: str
+    url: str
+    encoding_format: str
+    model_path: str
+    tokenizer: str
+    batch_size: int
+    max_length: int
+    intra_op_threads: int
+    pooling: str
 
     def __init__(self, config: dict):
         embeddings_config = config.get("embeddings", None)
@@ -37,6 +81,76 @@ class EmbeddingsConfig:
 
         self.source = embeddings_config.get("source", None)
         self.model = embeddings_config.get("model", None)
+        # model_garden only
+        self.url = embeddings_config.get("url", "")
+        self.encoding_format = embeddings_config.get("encoding_format", "base64")
+        # onnx only
+        self.model_path = embeddings_config.get("model_path", "")
+        self.tokenizer = embeddings_config.get("tokenizer", "")
+        self.batch_size = embeddings_config.get("batch_size", 32)
+        self.max_length = embeddings_config.get("max_length", 512)
+        self.intra_op_threads = embeddings_config.get(
+            "intra_op_threads", os.cpu_count() or 1
+        )
+        self.pooling = embeddings_config.get("pooling", "mean")
+
+
+class ServerConfig:
+    host: str
+    port: int
+    workers: int
+    max_concurrency: int
+    response_max_tokens: int
+    response_fields: list[str]
+    merge_adjacent_chunks: bool
+
+    def __init__(self, config: dict):
+        server_config = config.get("server", None) or {}
+
+        self.host = server_config.get("host", "127.0.0.1")
+        self.port = server_config.get("port", 8000)
+        self.workers = server_config.get("workers", 1)
+        self.max_concurrency = server_config.get("max_concurrency", 8)
+        self.response_max_tokens = server_config.get("response_max_tokens", 2000)
+        self.response_fields = server_config.get(
+            "response_fields", ["text", "source", "title", "page"]
+        )
+        self.merge_adjacent_chunks = server_config.get("merge_adjacent_chunks", True)
+
+
+class SplitterConfig:
+    type: str
+    tokenizer: str
+    max_tokens: int
+    overlap_tokens: int
+
+    def __init__(self, config: dict):
+        splitter_config = config.get("splitter", None) or {}
+
+        self.type = splitter_config.get("type", "recursive")
+        self.tokenizer = splitter_config.get("tokenizer", "")
+        self.max_tokens = splitter_config.get("max_tokens", 256)
+        self.overlap_tokens = splitter_config.get("overlap_tokens", 32)
+
+        if self.type not in ["recursive", "token"]:
+            raise ValueError(f"Unsupported splitter type: {self.type}")
+
+
+class DedupConfig:
+    enabled: bool
+    threshold: float
+    num_perm: int
+    bands: int
+    shingle_size: int
+
+    def __init__(self, config: dict):
+        dedup_config = config.get("dedup", None) or {}
+
+        self.enabled = dedup_config.get("enabled", False)
+        self.threshold = dedup_config.get("threshold", 0.85)
+        self.num_perm = dedup_config.get("num_perm", 128)
+        self.bands = dedup_config.get("bands", 32)
+        self.shingle_size = dedup_config.get("shingle_size", 5)
 
 
 class LarkConfig:
@@ -60,6 +174,24 @@ class VectorStoreConfig:
     collection_name: str
     reset_collection: bool
     enable_full_text_search: bool
+    insert_batch_size: int
+    insert_batch_bytes: int
+    flush_interval_seconds: float
+    matryoshka_dim: int
+    matryoshka_candidates: int
+    document_search: bool
+    document_candidates: int
+    timeout_seconds: float
+    retry_attempts: int
+    retry_backoff_seconds: float
+    ready_timeout_seconds: float
+    warmup_queries: list[str]
+    query_cache_size: int
+    query_cache_threshold: float
+    query_cache_ttl_seconds: float
+    lazy_load_collections: bool
+    collection_idle_seconds: float
+    search_fanout_threads: int
 
     def __init__(self, config: dict):
         vector_store_config = config.get("vector_store", None)
@@ -68,10 +200,46 @@ class VectorStoreConfig:
                 "Vector store configuration is missing in the config file."
             )
 
-        self.type = vector_store_config.get("type", None)
+        self.type = vector_store_config.get("type", "milvus")
         self.url = vector_store_config.get("url", None)
         self.collection_name = vector_store_config.get("collection_name", None)
         self.reset_collection = vector_store_config.get("reset_collection", False)
         self.enable_full_text_search = vector_store_config.get(
             "enable_full_text_search", False
         )
+        self.insert_batch_size = vector_store_config.get("insert_batch_size", 1000)
+        self.insert_batch_bytes = vector_store_config.get(
+            "insert_batch_bytes", 16 * 1024 * 1024
+        )
+        self.flush_interval_seconds = vector_store_config.get(
+            "flush_interval_seconds", 0
+        )
+        self.matryoshka_dim = vector_store_config.get("matryoshka_dim", 0)
+        self.matryoshka_candidates = vector_store_config.get(
+            "matryoshka_candidates", 10
+        )
+        self.document_search = vector_store_config.get("document_search", False)
+        self.document_candidates = vector_store_config.get("document_candidates", 20)
+        self.timeout_seconds = vector_store_config.get("timeout_seconds", 10)
+        self.retry_attempts = vector_store_config.get("retry_attempts", 3)
+        self.retry_backoff_seconds = vector_store_config.get(
+            "retry_backoff_seconds", 0.5
+        )
+        self.ready_timeout_seconds = vector_store_config.get(
+            "ready_timeout_seconds", 300
+        )
+        self.warmup_queries = vector_store_config.get("warmup_queries", [])
+        self.query_cache_size = vector_store_config.get("query_cache_size", 0)
+        self.query_cache_threshold = vector_store_config.get(
+            "query_cache_threshold", 0.95
+        )
+        self.query_cache_ttl_seconds = vector_store_config.get(
+            "query_cache_ttl_seconds", 600
+        )
+        self.lazy_load_collections = vector_store_config.get(
+            "lazy_load_collections", False
+        )
+        self.collection_idle_seconds = vector_store_config.get(
+            "collection_idle_seconds", 0
+        )
+        self.search_fanout_threads = vector_store_config.get("search_fanout_threads", 8)
@@ -0,0 +1,400 @@
+import logging
+import time
+from collections.abc import Callable
+from typing import TYPE_CHECKING, TypeVar
+
+from langchain_core.documents import Document
+
+from config.config import IngestConfig
+from ingest.state import DONE, FAILED, PENDING, IngestState
+from loader.factory import Datasource, LoaderFactory
+from profiling.profiler import NullProfiler
+from transformer.chunker import TokenTextChunker
+from transformer.dedup import ChunkDeduplicator
+
+if TYPE_CHECKING:
+    from langchain_text_splitters import TextSplitter
+
+    from vector_store.milvus import MilvusBufferedWriter, MilvusVectorStore
+
+T = TypeVar("T")
+
+# unit key recorded when a whole datasource could not be listed
+DATASOURCE_UNIT = "*"
+
+
+class IngestJob:
+    """
+    Ingests datasources unit by unit (a file or a Lark document), recording
+    each unit's status in an IngestState so a restarted job skips the units
+    that are already done. Loading a unit is retried with exponential
+    backoff; a unit that still fails is marked failed and the job moves on.
+
+    Each unit is loaded, split and handed to one buffered writer before the
+    next unit is loaded. Chunks carry their unit key in
+    `metadata["ingest_key"]`. Embedding a unit and inserting the writer's
+    batches are retried the same way; when an insert still fails, the units
+    with rows in the writer's buffer are marked failed and their rows are
+    discarded. A unit is marked done once all of its chunks are inserted,
+    and with document search once its document vector is written too, and
+    the rows of a unit that was interrupted mid-way, or failed, are
+    deleted, and dropped from the deduplication index, before it is ingested
+    again.
+
+    Duplicates are dropped across all the datasources of a collection. The
+    chunks the collection already holds are indexed before its first
+    datasource is ingested, except those of partitions about to be
+    reindexed. Units that dropped copies of another datasource's chunks are
+    recorded in the state and ingested again when that datasource is
+    reindexed, so its copies are not lost with its partition.
+    """
+
+    def __init__(
+        self,
+        config: IngestConfig,
+        vector_store: "MilvusVectorStore",
+        loader_factory: LoaderFactory,
+        splitter: "TextSplitter | TokenTextChunker",
+        deduplicator: ChunkDeduplicator | None,
+        state: IngestState,
+        profiler: NullProfiler,
+        logger: logging.Logger,
+        retry_failed: bool = False,
+    ):
+        self.config = config
+        self.vector_store = vector_store
+        self.loader_factory = loader_factory
+        self.splitter = splitter
+        self.deduplicator = deduplicator
+        self.state = state
+        self.profiler = profiler
+        self.logger = logger
+        self.retry_failed = retry_failed
+
+    def run(self, datasources: list[Datasource]) -> None:
+        default_collection = self.vector_store.config.collection_name
+        started: list[str] = []
+        reindexed = {
+            f"{datasource.collection or default_collection}/{datasource.partition_name}"
+            for datasource in datasources
+            if datasource.reindex
+        }
+        for datasource_key in reindexed:
+            # these units dropped chunks that only the reindexed partition held
+            for dependent, key in self.state.dependents(datasource_key):
+                if dependent not in reindexed:
+                    self.state.mark(dependent, key, PENDING)
+        indexed: set[str] = set()
+        # chunks of each (datasource, unit) not inserted yet
+        remaining: dict[tuple[str, str], int] = {}
+        # inserted units whose document vectors are not written yet
+        inserted: list[tuple[str, str]] = []
+
+        def on_insert(
+            collection_name: str, partition_name: str | None, rows: list[dict]
+        ) -> None:
+            datasource_key = f"{collection_name}/{partition_name}"
+            for row in rows:
+                unit = (datasource_key, row["metadata"]["ingest_key"])
+                remaining[unit] -= 1
+                if remaining[unit] == 0:
+                    del remaining[unit]
+                    if self.vector_store.document_search:
+                        inserted.append(unit)
+                    else:
+                        self.state.mark(*unit, DONE)
+
+        def on_documents() -> None:
+            for datasource_key, key in inserted:
+                self.state.mark(datasource_key, key, DONE)
+            inserted.clear()
+
+        # Units are written as soon as they are split, so only the writer's
+        # buffer is held in memory, never the whole corpus.
+        with self.vector_store.writer(
+            on_insert=on_insert, on_documents=on_documents
+        ) as writer:
+            for datasource in datasources:
+                collection_name = datasource.collection or default_collection
+                partition_name = datasource.partition_name
+                datasource_key = f"{collection_name}/{partition_name}"
+                self.vector_store.ensure_collection(collection_name)
+                if not self._needs_ingest(datasource, collection_name, datasource_key):
+                    self.logger.info(
+                        "Skipping datasource partition %s, already ingested",
+                        datasource_key,
+                    )
+                    continue
+                if self.deduplicator is not None and collection_name not in indexed:
+                    indexed.add(collection_name)
+                    with self.profiler.stage("dedup"):
+                        self._index_existing(collection_name, reindexed)
+                if datasource.reindex:
+                    self.logger.info(
+                        "Reindexing datasource partition %s", datasource_key
+                    )
+                    self.vector_store.reset_partition(partition_name, collection_name)
+                    self.state.reset(datasource_key)
+                else:
+                    self.vector_store.ensure_partition(partition_name, collection_name)
+                # kept pending until the whole datasource is ingested, so an
+                # interrupted run resumes it even though its partition exists
+                self.state.mark(datasource_key, DATASOURCE_UNIT, PENDING)
+                started.append(datasource_key)
+
+                units = self._attempt(
+                    "Loading",
+                    datasource_key,
+                    DATASOURCE_UNIT,
+                    lambda: list(
+                        self.loader_factory.get_loader(datasource).lazy_load_units()
+                    ),
+                )
+                if units is None:
+                    continue
+
+                for key, load in units:
+                    status = self.state.status(datasource_key, key)
+                    if status == DONE:
+                        self.logger.debug("Skipping %s, already ingested", key)
+                        continue
+                    if status == FAILED and not self.retry_failed:
+                        self.logger.info(
+                            "Skipping %s, it failed in a previous run", key
+                        )
+                        continue
+                    if status in (PENDING, FAILED):
+                        # a previous run may have inserted part of its chunks
+                        self.vector_store.delete_unit(
+                            key, partition_name, collection_name
+                        )
+                        if self.deduplicator is not None:
+                            self.deduplicator.forget(datasource_key, key)
+                        self.state.forget_duplicates(datasource_key, key)
+
+                    self.state.mark(datasource_key, key, PENDING)
+                    with self.profiler.stage("load"):
+                        documents = self._attempt("Loading", datasource_key, key, load)
+                    if documents is None:
+                        continue
+                    chunks = self._split(
+                        documents, collection_name, datasource_key, key
+                    )
+                    if not chunks:
+                        self.state.mark(datasource_key, key, DONE)
+                        continue
+                    self.logger.info(
+                        "Adding %d document chunks of %s to partition %s",
+                        len(chunks),
+                        key,
+                        datasource_key,
+                    )
+                    with self.profiler.stage("write"):
+                        rows = self._attempt(
+                            "Embedding",
+                            datasource_key,
+                            key,
+                            lambda: self._embed(chunks, writer.batch_size),
+                        )
+                        if rows is None:
+                            if self.deduplicator is not None:
+                                self.deduplicator.forget(datasource_key, key)
+                            continue
+                        remaining[(datasource_key, key)] = len(rows)
+                        writer.buffer_rows(
+                            rows,
+                            partition_name=partition_name,
+                            collection_name=collection_name,
+                        )
+                        self._insert(
+                            writer, writer.insert_full, remaining, datasource_key, key
+                        )
+
+            with self.profiler.stage("write"):
+                self._insert(writer, writer.insert_all, remaining, "remaining", "rows")
+
+        if self.deduplicator is not None:
+            self.logger.info(
+                "Dropped %d exact and %d near-duplicate chunks",
+                self.deduplicator.dropped_exact,
+                self.deduplicator.dropped_near,
+            )
+
+        for datasource_key in started:
+            if self.state.status(datasource_key, DATASOURCE_UNIT) == PENDING:
+                self.state.forget(datasource_key, DATASOURCE_UNIT)
+
+        counts = self.state.counts()
+        self.logger.info(
+            "Ingest finished: %d units done, %d failed",
+            counts.get(DONE, 0),
+            counts.get(FAILED, 0),
+        )
+        for datasource_key, key, attempts, error in self.state.dead_letters():
+            self.logger.warning(
+                "Dead letter %s %s after %d attempts: %s",
+                datasource_key,
+                key,
+                attempts,
+                error,
+            )
+
+    def _needs_ingest(
+        self, datasource: Datasource, collection_name: str, datasource_key: str
+    ) -> bool:
+        """
+        Ingest datasources that are new (no partition yet), marked `reindex`,
+        or left unfinished by a previous run. The others are already in the
+        vector store and would only be inserted a second time.
+        """
+        if datasource.reindex:
+            return True
+        partitions = self.vector_store.collections.get(collection_name, set())
+        if datasource.partition_name not in partitions:
+            return True
+        return self.state.unfinished(datasource_key, self.retry_failed)
+
+    def _index_existing(self, collection_name: str, reindexed: set[str]) -> None:
+        """
+        Index the chunks already stored in `collection_name`, so copies of
+        them from any datasource are dropped. Partitions about to be
+        reindexed are skipped since their chunks are dropped with them.
+        """
+        if self.deduplicator is None:
+            return
+        for partition_name in sorted(
+            self.vector_store.collections.get(collection_name, set())
+        ):
+            datasource_key = f"{collection_name}/{partition_name}"
+            if datasource_key in reindexed:
+                continue
+            self.deduplicator.add_existing(
+                self.vector_store.iter_chunks(partition_name, collection_name),
+                scope=collection_name,
+                owner=datasource_key,
+            )
+
+    def _split(
+        self,
+        documents: list[Document],
+        collection_name: str,
+        datasource_key: str,
+        key: str,
+    ) -> list[Document]:
+        chunks = []
+        for document in documents:
+            source = document.metadata.get("source", "unknown")
+            self.logger.info("Loaded document from %s", source)
+            document.metadata["ingest_key"] = key
+            with self.profiler.stage("split"):
+                document_chunks = self.splitter.split_documents([document])
+            if self.deduplicator is not None:
+                with self.profiler.stage("dedup"):
+                    document_chunks = self.deduplicator.transform_documents(
+                        document_chunks, scope=collection_name, owner=datasource_key
+                    )
+            chunks.extend(document_chunks)
+            self.profiler.record_document(source)
+        if self.deduplicator is not None:
+            self.state.add_duplicates(self.deduplicator.pop_references())
+        return chunks
+
+    def _embed(self, chunks: list[Document], batch_size: int) -> list[dict]:
+        # one embedding call per batch, as the writer does
+        rows = []
+        for start in range(0, len(chunks), batch_size):
+            rows.extend(self.vector_store.to_rows(chunks[start : start + batch_size]))
+        return rows
+
+    def _insert(
+        self,
+        writer: "MilvusBufferedWriter",
+        insert: Callable[[], None],
+        remaining: dict[tuple[str, str], int],
+        datasource_key: str,
+        key: str,
+    ) -> None:
+        """
+        Run one of the writer's inserts with retries. When it still fails,
+        the buffered rows are discarded and every unit they belong to is
+        marked failed, so the job moves on with the next unit. Rows those
+        units already inserted are deleted when possible, and otherwise when
+        the units are retried.
+        """
+        try:
+            self._retry("Inserting", datasource_key, key, insert)
+        except Exception as e:
+            units = {
+                (collection_name, partition_name, row["metadata"]["ingest_key"])
+                for collection_name, partition_name, row in writer.discard()
+            }
+            attempts = max(1, self.config.max_attempts)
+            for collection_name, partition_name, unit_key in units:
+                unit_datasource = f"{collection_name}/{partition_name}"
+                self.logger.error(
+                    "Giving up on %s %s: %s", unit_datasource, unit_key, e
+                )
+                remaining.pop((unit_datasource, unit_key), None)
+                self.state.mark(unit_datasource, unit_key, FAILED, attempts, repr(e))
+                if self.deduplicator is not None:
+                    self.deduplicator.forget(unit_datasource, unit_key)
+                if partition_name is None:
+                    continue
+                try:
+                    self.vector_store.delete_unit(
+                        unit_key, partition_name, collection_name
+                    )
+                except Exception as delete_error:
+                    self.logger.warning(
+                        "Could not delete the rows of %s %s: %s",
+                        unit_datasource,
+                        unit_key,
+                        delete_error,
+                    )
+
+    def _attempt(
+        self, action: str, datasource_key: str, key: str, function: Callable[[], T]
+    ) -> T | None:
+        """
+        Call `function`, retrying with exponential backoff. After the last
+        attempt the unit is marked failed and None is returned.
+        """
+        try:
+            return self._retry(action, datasource_key, key, function)
+        except Exception as e:
+            attempts = max(1, self.config.max_attempts)
+            self.logger.error(
+                "Giving up on %s %s after %d attempts: %s",
+                datasource_key,
+                key,
+                attempts,
+                e,
+            )
+            self.state.mark(datasource_key, key, FAILED, attempts, repr(e))
+            return None
+
+    def _retry(
+        self, action: str, datasource_key: str, key: str, function: Callable[[], T]
+    ) -> T:
+        """Call `function`, retrying with exponential backoff; the last error is raised."""
+        attempts = max(1, self.config.max_attempts)
+        attempt = 1
+        while True:
+            try:
+                return function()
+            except Exception as e:
+                if attempt == attempts:
+                    raise
+                delay = self.config.retry_backoff_seconds * 2 ** (attempt - 1)
+                self.logger.warning(
+                    "%s %s %s failed (attempt %d/%d), retrying in %.1fs: %s",
+                    action,
+                    datasource_key,
+                    key,
+                    attempt,
+                    attempts,
+                    delay,
+                    e,
+                )
+                time.sleep(delay)
+                attempt += 1
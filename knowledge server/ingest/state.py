@@ -0,0 +1,164 @@
+import sqlite3
+import threading
+import time
+from collections.abc import Iterable
+
+PENDING = "pending"
+DONE = "done"
+FAILED = "failed"
+
+
+class IngestState:
+    """
+    Persisted status of every ingest unit (a file, or a Lark document),
+    keyed by datasource and unit key. A unit is `pending` from the moment it
+    is loaded until all of its chunks are inserted (`done`), or `failed` once
+    its retries are exhausted. Failed units form the dead-letter list.
+
+    With deduplication, the state also records which units dropped copies of
+    chunks held by another datasource, so they can be ingested again when
+    that datasource is reindexed.
+    """
+
+    def __init__(self, path: str):
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS units (
+                datasource TEXT NOT NULL,
+                key TEXT NOT NULL,
+                status TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                error TEXT NOT NULL DEFAULT '',
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (datasource, key)
+            )
+            """
+        )
+        self.connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS duplicates (
+                datasource TEXT NOT NULL,
+                key TEXT NOT NULL,
+                canonical_datasource TEXT NOT NULL,
+                PRIMARY KEY (datasource, key, canonical_datasource)
+            )
+            """
+        )
+        self.connection.commit()
+        self._lock = threading.Lock()
+
+    def status(self, datasource: str, key: str) -> str | None:
+        with self._lock:
+            row = self.connection.execute(
+                "SELECT status FROM units WHERE datasource = ? AND key = ?",
+                (datasource, key),
+            ).fetchone()
+        return row[0] if row else None
+
+    def mark(
+        self,
+        datasource: str,
+        key: str,
+        status: str,
+        attempts: int = 0,
+        error: str = "",
+    ) -> None:
+        with self._lock:
+            self.connection.execute(
+                """
+                INSERT INTO units (datasource, key, status, attempts, error, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT (datasource, key) DO UPDATE SET
+                    status = excluded.status,
+                    attempts = excluded.attempts,
+                    error = excluded.error,
+                    updated_at = excluded.updated_at
+                """,
+                (datasource, key, status, attempts, error, time.time()),
+            )
+            self.connection.commit()
+
+    def forget(self, datasource: str, key: str) -> None:
+        with self._lock:
+            self.connection.execute(
+                "DELETE FROM units WHERE datasource = ? AND key = ?", (datasource, key)
+            )
+            self.connection.commit()
+
+    def reset(self, datasource: str | None = None) -> None:
+        """Forget the units of one datasource, or of every datasource."""
+        with self._lock:
+            if datasource is None:
+                self.connection.execute("DELETE FROM units")
+                self.connection.execute("DELETE FROM duplicates")
+            else:
+                self.connection.execute(
+                    "DELETE FROM units WHERE datasource = ?", (datasource,)
+                )
+                self.connection.execute(
+                    "DELETE FROM duplicates WHERE datasource = ?", (datasource,)
+                )
+            self.connection.commit()
+
+    def add_duplicates(self, references: Iterable[tuple[str, str, str]]) -> None:
+        """
+        Record (datasource, key, canonical_datasource): unit `key` dropped
+        chunks that are only stored by `canonical_datasource`.
+        """
+        with self._lock:
+            self.connection.executemany(
+                "INSERT OR IGNORE INTO duplicates "
+                "(datasource, key, canonical_datasource) VALUES (?, ?, ?)",
+                references,
+            )
+            self.connection.commit()
+
+    def forget_duplicates(self, datasource: str, key: str) -> None:
+        with self._lock:
+            self.connection.execute(
+                "DELETE FROM duplicates WHERE datasource = ? AND key = ?",
+                (datasource, key),
+            )
+            self.connection.commit()
+
+    def dependents(self, canonical_datasource: str) -> list[tuple[str, str]]:
+        """Return (datasource, key) of the units relying on `canonical_datasource`."""
+        with self._lock:
+            return self.connection.execute(
+                "SELECT DISTINCT datasource, key FROM duplicates "
+                "WHERE canonical_datasource = ? AND datasource != ? "
+                "ORDER BY datasource, key",
+                (canonical_datasource, canonical_datasource),
+            ).fetchall()
+
+    def dead_letters(self) -> list[tuple[str, str, int, str]]:
+        """Return (datasource, key, attempts, error) of every failed unit."""
+        with self._lock:
+            return self.connection.execute(
+                "SELECT datasource, key, attempts, error FROM units "
+                "WHERE status = ? ORDER BY datasource, key",
+                (FAILED,),
+            ).fetchall()
+
+    def unfinished(self, datasource: str, include_failed: bool = False) -> bool:
+        """Whether `datasource` has pending units (or failed ones, if included)."""
+        statuses = [PENDING, FAILED] if include_failed else [PENDING]
+        with self._lock:
+            row = self.connection.execute(
+                "SELECT 1 FROM units WHERE datasource = ? AND status IN "
+                f"({', '.join('?' * len(statuses))}) LIMIT 1",
+                (datasource, *statuses),
+            ).fetchone()
+        return row is not None
+
+    def counts(self) -> dict[str, int]:
+        with self._lock:
+            rows = self.connection.execute(
+                "SELECT status, COUNT(*) FROM units GROUP BY status"
+            ).fetchall()
+        return dict(rows)
+
+    def close(self) -> None:
+        self.connection.close()
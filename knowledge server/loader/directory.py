@@ -1,20 +1,46 @@
-from collections.abc import Iterator
+from collections.abc import Callable, Iterator
+from datetime import datetime, timezone
+from functools import partial
+from importlib.metadata import PackageNotFoundError, version
+from pathlib import Path
 import logging
+import os
 from langchain_core.document_loaders.base import BaseBlobParser
 from langchain_community.document_loaders import (
     FileSystemBlobLoader,
-    PyPDFDirectoryLoader,
+    PyPDFLoader,
 )
 from langchain_core.documents import Document
 from langchain_community.document_loaders.blob_loaders import Blob
 from langchain_community.document_loaders.generic import GenericLoader
 from langchain_core.document_loaders.base import BaseLoader
 
+from loader.parse_cache import ParseCache
+
+# PyPDFLoader's single-mode page delimiter; the form feed marks page breaks
+# for the token chunker
+PAGES_DELIMITER = "\n\f"
+PAGE_METADATA_KEYS = ("page", "page_label")
+
+
+def pdf_parser_settings() -> dict:
+    """Settings that change the extracted text, part of the parse cache key."""
+    try:
+        pypdf_version = version("pypdf")
+    except PackageNotFoundError:
+        pypdf_version = ""
+    return {"parser": "pypdf", "pypdf": pypdf_version, "extraction_mode": "layout"}
+
 
 class TextParser(BaseBlobParser):
     def lazy_parse(self, blob: Blob) -> Iterator[Document]:
         content = blob.as_string()
-        metadata = {"source": blob.source}
+        metadata = {"source": blob.source, "type": "markdown"}
+        if blob.path is not None:
+            modified = os.path.getmtime(blob.path)
+            metadata["moddate"] = datetime.fromtimestamp(
+                modified, timezone.utc
+            ).isoformat()
         yield Document(page_content=content, metadata=metadata)
 
     def parse(self, blob: Blob) -> list[Document]:
@@ -22,14 +48,19 @@ class TextParser(BaseBlobParser):
 
 
 class DirectoryLoader(BaseLoader):
-    pdf_loader: PyPDFDirectoryLoader
+    path: str
     md_loader: GenericLoader
     logger: logging.Logger
+    parse_cache: ParseCache | None
 
-    def __init__(self, path: str, logger: logging.Logger) -> None:
-        self.pdf_loader = PyPDFDirectoryLoader(
-            path, recursive=True, mode="single", extraction_mode="layout"
-        )
+    def __init__(
+        self,
+        path: str,
+        logger: logging.Logger,
+        parse_cache: ParseCache | None = None,
+    ) -> None:
+        self.path = path
+        self.parse_cache = parse_cache
         self.md_loader = GenericLoader(
             blob_loader=FileSystemBlobLoader(
                 path=path,
@@ -40,14 +71,47 @@ class DirectoryLoader(BaseLoader):
         self.logger = logger
 
     def lazy_load(self) -> Iterator[Document]:
-        self.logger.debug("Loading PDF documents from %s", self.pdf_loader.path)
-        for doc in self.pdf_loader.lazy_load():
-            yield doc
-        self.logger.debug(
-            "Loading Markdown documents from %s", self.md_loader.blob_loader.path
-        )
-        for doc in self.md_loader.lazy_load():
-            yield doc
+        for _, load in self.lazy_load_units():
+            yield from load()
+
+    def lazy_load_units(self) -> Iterator[tuple[str, Callable[[], list[Document]]]]:
+        """Yield (file path, load function) for every PDF and Markdown file."""
+        self.logger.debug("Loading PDF documents from %s", self.path)
+        # same files as PyPDFDirectoryLoader(recursive=True): no hidden files
+        for file_path in sorted(Path(self.path).glob("**/[!.]*.pdf")):
+            yield str(file_path), partial(self._load_pdf, str(file_path))
+        self.logger.debug("Loading Markdown documents from %s", self.path)
+        for blob in self.md_loader.blob_loader.yield_blobs():
+            yield str(blob.source), partial(self.md_loader.blob_parser.parse, blob)
+
+    def _load_pdf(self, file_path: str) -> list[Document]:
+        """
+        Load a PDF as one document whose pages are joined like PyPDFLoader's
+        single mode. Pages are extracted (or read from the parse cache) one
+        by one so the cache keeps the page boundaries.
+        """
+        pages = None
+        if self.parse_cache is not None:
+            key = self.parse_cache.key(file_path, pdf_parser_settings())
+            pages = self.parse_cache.get(key)
+            if pages is not None:
+                self.logger.debug("Using cached text of %s", file_path)
+        if pages is None:
+            loader = PyPDFLoader(file_path, mode="page", extraction_mode="layout")
+            pages = loader.load()
+            if self.parse_cache is not None:
+                self.parse_cache.put(key, pages)
+        if not pages:
+            return []
+
+        metadata = {
+            k: v for k, v in pages[0].metadata.items() if k not in PAGE_METADATA_KEYS
+        }
+        # the same content may have been cached under another path
+        metadata["source"] = file_path
+        metadata["type"] = "pdf"
+        content = PAGES_DELIMITER.join(page.page_content for page in pages)
+        return [Document(page_content=content, metadata=metadata)]
 
     def load(self) -> list[Document]:
         return list(self.lazy_load())
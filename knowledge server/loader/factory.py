@@ -1,17 +1,30 @@
+import hashlib
 import logging
+import re
+from functools import cached_property
+from typing import TYPE_CHECKING
 
 
-from loader.lark import (
-    LarkSuiteDocLoader,
-    LarkSuiteWikiLoader,
-    LarkSuiteWikiSpaceLoader,
-)
+from langchain_core.document_loaders.base import BaseLoader
 
+from config.config import LarkConfig
+from loader.parse_cache import ParseCache
+from registry.lazy import LazyRegistry
 
-from langchain_core.document_loaders.base import BaseLoader
-from loader.directory import DirectoryLoader
+if TYPE_CHECKING:
+    import lark_oapi as lark
 
-import lark_oapi as lark
+# LangChain community loaders and lark_oapi are only imported for the
+# datasource types that are actually configured.
+LOADERS = LazyRegistry(
+    "document source type",
+    {
+        "directory": "loader.directory:DirectoryLoader",
+        "lark-doc": "loader.lark:LarkSuiteDocLoader",
+        "lark-wiki": "loader.lark:LarkSuiteWikiLoader",
+        "lark-space": "loader.lark:LarkSuiteWikiSpaceLoader",
+    },
+)
 
 
 class Datasource:
@@ -19,8 +32,18 @@ class Datasource:
     path: str
     url: str
     id: str
+    reindex: bool
+    collection: str
 
-    def __init__(self, type: str, path: str = "", url: str = "", id: str = ""):
+    def __init__(
+        self,
+        type: str,
+        path: str = "",
+        url: str = "",
+        id: str = "",
+        reindex: bool = False,
+        collection: str = "",
+    ):
         if not type:
             raise ValueError("Document source type is missing.")
 
@@ -28,6 +51,9 @@ class Datasource:
         self.path = path
         self.url = url
         self.id = id
+        self.reindex = reindex
+        # Milvus collection holding this datasource; empty for the default one
+        self.collection = collection
 
         if self.type == "directory" and not self.path:
             raise ValueError("Directory source path is missing.")
@@ -37,35 +63,74 @@ class Datasource:
             raise ValueError("Lark wiki source id is missing.")
         elif self.type == "lark-space" and not self.id:
             raise ValueError("Lark space source id is missing.")
-        elif self.type not in ["directory", "lark-doc", "lark-wiki", "lark-space"]:
+        elif self.type not in LOADERS:
             raise ValueError(f"Unsupported document source type: {self.type}")
 
+    @property
+    def partition_name(self) -> str:
+        """
+        Milvus partition holding this datasource's chunks. Lark sources use their
+        id; directories use a short hash of the path since paths are not valid
+        partition names.
+        """
+        if self.type == "directory":
+            key = hashlib.sha1(self.path.encode("utf-8")).hexdigest()[:12]
+        else:
+            key = self.id
+        return re.sub(r"[^0-9A-Za-z_]", "_", f"{self.type}_{key}")[:255]
+
 
 class LoaderFactory:
     logger: logging.Logger
-    lark_client: lark.Client
+    lark_config: LarkConfig
+    log_level: str
+    parse_cache: ParseCache | None
 
-    def __init__(self, lark_client: lark.Client, logger: logging.Logger) -> None:
-        self.lark_client = lark_client
+    def __init__(
+        self,
+        lark_config: LarkConfig,
+        log_level: str,
+        logger: logging.Logger,
+        parse_cache: ParseCache | None = None,
+    ) -> None:
+        self.lark_config = lark_config
+        self.log_level = log_level
         self.logger = logger
+        self.parse_cache = parse_cache
+
+    @cached_property
+    def lark_client(self) -> "lark.Client":
+        """Built on the first Lark datasource, so lark_oapi is imported only then."""
+        import lark_oapi as lark
+
+        lark_log_level = getattr(
+            lark.LogLevel, self.log_level.upper(), lark.LogLevel.INFO
+        )
+        return (
+            lark.Client.builder()
+            .domain(self.lark_config.domain)
+            .app_id(self.lark_config.app_id)
+            .app_secret(self.lark_config.app_secret)
+            .log_level(lark_log_level)
+            .build()
+        )
 
     def get_loader(self, datasource: Datasource) -> BaseLoader:
+        loader_class = LOADERS.get(datasource.type)
         if datasource.type == "directory":
-            return DirectoryLoader(datasource.path, self.logger)
+            return loader_class(datasource.path, self.logger, self.parse_cache)
         elif datasource.type == "lark-doc":
-            return LarkSuiteDocLoader(
+            return loader_class(
                 client=self.lark_client,
                 document_id=datasource.id,
             )
         elif datasource.type == "lark-wiki":
-            return LarkSuiteWikiLoader(
+            return loader_class(
                 client=self.lark_client,
                 wiki_id=datasource.id,
             )
-        elif datasource.type == "lark-space":
-            return LarkSuiteWikiSpaceLoader(
+        else:
+            return loader_class(
                 client=self.lark_client,
                 space_id=datasource.id,
             )
-        else:
-            raise ValueError(f"Unsupported source type: {datasource.type}")
@@ -8,6 +8,8 @@ from lark_oapi.api.wiki.v2 import (
     ListSpaceNodeRequest,
 )
 
+from collections.abc import Callable
+from functools import partial
 from typing import Iterator
 
 ### TODO: Restructure the metadata to show the Lark Wiki/Docs hierarchy better.
@@ -57,6 +59,13 @@ class LarkSuiteDocLoader(BaseLoader):
 
         yield Document(page_content=str(content), metadata=metadata)
 
+    @property
+    def unit_key(self) -> str:
+        return f"lark-doc://{self.document_id}"
+
+    def lazy_load_units(self) -> Iterator[tuple[str, Callable[[], list[Document]]]]:
+        yield self.unit_key, self.load
+
 
 class LarkSuiteWikiLoader(LarkSuiteDocLoader):
     wiki_metadata: dict
@@ -73,6 +82,7 @@ class LarkSuiteWikiLoader(LarkSuiteDocLoader):
         self.wiki_metadata = {
             "owner": response.data.node.owner,
             "creator": response.data.node.creator,
+            "updated_at": response.data.node.obj_edit_time,
         }
 
         document_id = response.data.node.obj_token
@@ -87,8 +97,13 @@ class LarkSuiteWikiLoader(LarkSuiteDocLoader):
             doc.metadata["type"] = "lark-wiki"
             doc.metadata["lark_owner"] = self.wiki_metadata["owner"]
             doc.metadata["lark_creator"] = self.wiki_metadata["creator"]
+            doc.metadata["updated_at"] = self.wiki_metadata["updated_at"]
             yield doc
 
+    @property
+    def unit_key(self) -> str:
+        return f"lark-wiki://{self.wiki_id}"
+
 
 class LarkSuiteWikiSpaceLoader(BaseLoader):
     client: lark.Client
@@ -115,11 +130,29 @@ class LarkSuiteWikiSpaceLoader(BaseLoader):
         )
 
     def lazy_load(self) -> Iterator[Document]:
-        yield from self.__lazy_load_space_node_children(space_id=self.space_id)
-
-    def __lazy_load_space_node_children(
+        for _, load in self.lazy_load_units():
+            yield from load()
+
+    def lazy_load_units(self) -> Iterator[tuple[str, Callable[[], list[Document]]]]:
+        """
+        Yield (wiki URI, load function) for every document of the space, so
+        each document can be loaded and retried on its own.
+        """
+        for node_token in self.__lazy_list_space_node_children(space_id=self.space_id):
+            yield f"lark-wiki://{node_token}", partial(self._load_node, node_token)
+
+    def _load_node(self, node_token: str) -> list[Document]:
+        loader = LarkSuiteWikiLoader(client=self.client, wiki_id=node_token)
+        documents = loader.load()
+        for doc in documents:
+            doc.metadata["source"] = f"lark-space://{self.space_id}"
+            doc.metadata["space_name"] = self.space_name
+            doc.metadata["space_description"] = self.space_description
+        return documents
+
+    def __lazy_list_space_node_children(
         self, space_id: str, parent_node_token: str = ""
-    ) -> Iterator[Document]:
+    ) -> Iterator[str]:
         ### TODO: handle pagination
         request = ListSpaceNodeRequest.builder().space_id(space_id).page_size(50)
         if parent_node_token != "":
@@ -136,14 +169,9 @@ class LarkSuiteWikiSpaceLoader(BaseLoader):
             ### TODO: handle other obj_types
             node_token = node.node_token if node.node_token else ""
             if node.obj_type == "docx":
-                loader = LarkSuiteWikiLoader(client=self.client, wiki_id=node_token)
-                for doc in loader.lazy_load():
-                    doc.metadata["source"] = f"lark-space://{self.space_id}"
-                    doc.metadata["space_name"] = self.space_name
-                    doc.metadata["space_description"] = self.space_description
-                    yield doc
+                yield node_token
             if node.has_child:
-                yield from self.__lazy_load_space_node_children(
+                yield from self.__lazy_list_space_node_children(
                     space_id=space_id, parent_node_token=node_token
                 )
         return
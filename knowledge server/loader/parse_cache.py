@@ -0,0 +1,78 @@
+import gzip
+import hashlib
+import json
+import logging
+import os
+import tempfile
+
+from langchain_core.documents import Document
+
+# bump when the cached layout changes so old entries are ignored
+PARSE_CACHE_VERSION = 1
+READ_CHUNK_BYTES = 1024 * 1024
+
+
+class ParseCache:
+    """
+    On-disk cache of parsed documents, one gzip-compressed JSON file per
+    entry holding the text and metadata of every page. Entries are keyed by
+    the SHA-256 of the file content and the parser settings, so re-chunking
+    or re-ingesting unchanged files skips parsing, while an edited file or a
+    different parser configuration is parsed again.
+    """
+
+    def __init__(self, directory: str, logger: logging.Logger):
+        self.directory = directory
+        self.logger = logger
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, file_path: str, settings: dict) -> str:
+        digest = hashlib.sha256()
+        with open(file_path, "rb") as f:
+            while chunk := f.read(READ_CHUNK_BYTES):
+                digest.update(chunk)
+        settings_json = json.dumps(
+            {"version": PARSE_CACHE_VERSION, **settings}, sort_keys=True
+        )
+        digest.update(settings_json.encode("utf-8"))
+        return digest.hexdigest()
+
+    def get(self, key: str) -> list[Document] | None:
+        try:
+            with gzip.open(self._path(key), "rt", encoding="utf-8") as f:
+                entry = json.load(f)
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        except (OSError, ValueError) as e:
+            self.logger.warning("Ignoring unreadable parse cache entry %s: %s", key, e)
+            self.misses += 1
+            return None
+        self.hits += 1
+        return [
+            Document(page_content=page["text"], metadata=page["metadata"])
+            for page in entry["pages"]
+        ]
+
+    def put(self, key: str, pages: list[Document]) -> None:
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        entry = {
+            "pages": [
+                {"text": page.page_content, "metadata": page.metadata} for page in pages
+            ]
+        }
+        # write then rename so a crash never leaves a truncated entry behind
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        os.close(fd)
+        try:
+            with gzip.open(temp_path, "wt", encoding="utf-8") as f:
+                json.dump(entry, f, default=str)
+            os.replace(temp_path, path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}.json.gz")
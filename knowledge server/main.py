@@ -1,13 +1,23 @@
+import argparse
 import logging
+from typing import TYPE_CHECKING
 from config.config import Config
+from ingest.job import IngestJob
+from ingest.state import IngestState
 from loader.factory import Datasource, LoaderFactory
-from langchain_text_splitters import RecursiveCharacterTextSplitter
-from mcp.server.fastmcp import FastMCP
+from loader.parse_cache import ParseCache
 
 from model.factory import EmbeddingsFactory
-from vector_store.milvus import MilvusVectorStore
+from profiling.profiler import build_profiler
+from server.app import build_server, run_workers, serve_on_shared_port
+from transformer.chunker import TokenTextChunker
+from transformer.dedup import ChunkDeduplicator
+from vector_store.factory import VectorStoreFactory
 
-import lark_oapi as lark
+if TYPE_CHECKING:
+    from langchain_text_splitters import TextSplitter
+
+    from vector_store.milvus import MilvusVectorStore
 
 
 CONFIG_FILE_PATH = "config.yaml"
@@ -46,84 +56,228 @@ def read_datasource(logger: logging.Logger) -> list[Datasource]:
                 path=source.get("path", ""),
                 url=source.get("url", ""),
                 id=source.get("id", ""),
+                reindex=source.get("reindex", False),
+                collection=source.get("collection", ""),
             )
         )
 
     return datasources
 
 
-def main():
-    logger = build_logger()
-    logger.info("Loading configuration from %s", CONFIG_FILE_PATH)
-    config = Config(CONFIG_FILE_PATH)
-    logger.setLevel(config.log_level.upper())
-    logger.debug(config)
+def build_splitter(config: Config) -> "TextSplitter | TokenTextChunker":
+    if config.splitter.type == "token":
+        return TokenTextChunker(
+            tokenizer=config.splitter.tokenizer,
+            max_tokens=config.splitter.max_tokens,
+            overlap_tokens=config.splitter.overlap_tokens,
+            max_chars=config.chunk_size,
+        )
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
 
-    lark_log_level = getattr(
-        lark.LogLevel, config.log_level.upper(), lark.LogLevel.INFO
-    )
-    lark_client = (
-        lark.Client.builder()
-        .domain(config.lark.domain)
-        .app_id(config.lark.app_id)
-        .app_secret(config.lark.app_secret)
-        .log_level(lark_log_level)
-        .build()
+    return RecursiveCharacterTextSplitter(
+        chunk_size=config.chunk_size,
+        chunk_overlap=config.chunk_overlap,
+        length_function=len,
+        is_separator_regex=False,
+        add_start_index=True,
     )
 
-    datasources = read_datasource(logger)
-    loaderFactory = LoaderFactory(lark_client=lark_client, logger=logger)
-    loaders = [loaderFactory.get_loader(datasource) for datasource in datasources]
 
-    splitter = RecursiveCharacterTextSplitter(
+def build_vector_store(config: Config, logger: logging.Logger) -> "MilvusVectorStore":
+    embeddings = EmbeddingsFactory.get_embeddings(config.embeddings)
+    return VectorStoreFactory.get_vector_store(
+        config.vector_store,
         chunk_size=config.chunk_size,
         chunk_overlap=config.chunk_overlap,
-        length_function=len,
-        is_separator_regex=False,
+        embeddings=embeddings,
+        logger=logger,
+    )
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Knowledge base MCP server")
+    parser.add_argument(
+        "--profile",
+        nargs="?",
+        const="profile",
+        default=None,
+        metavar="DIR",
+        help="profile ingestion and queries, writing the results to DIR "
+        "(default: profile)",
+    )
+    parser.add_argument(
+        "--retry-failed",
+        action="store_true",
+        help="retry documents that failed in a previous ingest run",
+    )
+    commands = parser.add_subparsers(
+        dest="command", metavar="{export,import}", help="default: ingest and serve"
     )
+    for name, help in (
+        ("export", "write a collection to a snapshot directory"),
+        ("import", "load a snapshot directory into a collection, without embedding"),
+    ):
+        command = commands.add_parser(name, help=help)
+        command.add_argument("directory", help="snapshot directory")
+        command.add_argument(
+            "--collection",
+            default="",
+            help="collection to export or import into (default: "
+            "vector_store.collection_name, or the snapshot's collection on import)",
+        )
+        command.add_argument("--batch-size", type=int, default=1000)
+    return parser.parse_args()
+
+
+def export_collection(
+    args: argparse.Namespace, config: Config, logger: logging.Logger
+) -> None:
+    from vector_store.connection import connect
+    from vector_store.snapshot import export_snapshot
+
+    export_snapshot(
+        connect(config.vector_store, logger),
+        args.collection or config.vector_store.collection_name,
+        args.directory,
+        config.embeddings,
+        logger,
+        batch_size=args.batch_size,
+    )
+
+
+def import_collection(
+    args: argparse.Namespace, config: Config, logger: logging.Logger
+) -> None:
+    from vector_store.snapshot import import_snapshot, read_manifest
+
+    manifest = read_manifest(args.directory)
+    config.vector_store.reset_collection = False  # import next to what exists
     embeddings = EmbeddingsFactory.get_embeddings(config.embeddings)
-    vector_store = MilvusVectorStore(
+    vector_store = VectorStoreFactory.get_vector_store(
         config.vector_store,
         chunk_size=config.chunk_size,
         chunk_overlap=config.chunk_overlap,
         embeddings=embeddings,
         logger=logger,
+        vector_dim=manifest["dim"],
     )
+    state = IngestState(config.ingest.state_path)
+    import_snapshot(
+        vector_store,
+        args.directory,
+        args.collection or manifest["collection"],
+        config.embeddings,
+        logger,
+        state=state,
+        batch_size=args.batch_size,
+    )
+    state.close()
+
+
+def main():
+    args = parse_args()
+    logger = build_logger()
+    logger.info("Loading configuration from %s", CONFIG_FILE_PATH)
+    config = Config(CONFIG_FILE_PATH)
+    logger.setLevel(config.log_level.upper())
+    logger.debug(config)
+
+    if args.command == "export":
+        export_collection(args, config, logger)
+        return
+    if args.command == "import":
+        import_collection(args, config, logger)
+        return
+
+    datasources = read_datasource(logger)
+    parse_cache = None
+    if config.parse_cache.enabled:
+        parse_cache = ParseCache(config.parse_cache.directory, logger)
+    loaderFactory = LoaderFactory(
+        lark_config=config.lark,
+        log_level=config.log_level,
+        logger=logger,
+        parse_cache=parse_cache,
+    )
+
+    splitter = build_splitter(config)
+    vector_store = build_vector_store(config, logger)
+
+    profiler = build_profiler(args.profile, logger)
+    vector_store.set_profiler(profiler)
+    profiler.start()
+    try:
+        deduplicator = None
+        if config.dedup.enabled:
+            deduplicator = ChunkDeduplicator(
+                logger=logger,
+                threshold=config.dedup.threshold,
+                num_perm=config.dedup.num_perm,
+                bands=config.dedup.bands,
+                shingle_size=config.dedup.shingle_size,
+            )
 
-    for loader in loaders:
-        for doc in loader.lazy_load():
-            document = doc  # make a copy from iterator to single Document
-            logger.debug("Document content: %s", document.page_content[:20])
+        state = IngestState(config.ingest.state_path)
+        if config.vector_store.reset_collection:
+            state.reset()  # the collections are recreated, nothing is ingested yet
+        job = IngestJob(
+            config.ingest,
+            vector_store=vector_store,
+            loader_factory=loaderFactory,
+            splitter=splitter,
+            deduplicator=deduplicator,
+            state=state,
+            profiler=profiler,
+            logger=logger,
+            retry_failed=args.retry_failed,
+        )
+        job.run(datasources)
+        state.close()
+        if parse_cache is not None:
             logger.info(
-                "Loaded document from %s", document.metadata.get("source", "unknown")
+                "Parse cache: %d hits, %d misses", parse_cache.hits, parse_cache.misses
             )
-            chunks = splitter.split_documents([document])
-            logger.info("Adding %d document chunks to the vector store", len(chunks))
-            vector_store.add_documents(chunks)
-
-    queries = [
-        "What is Barito project name is inspired from?",
-        "Who is the goto financial head of consumer payment infrastructure?",
-        "How to query pod metrics?",
-    ]
-    for query in queries:
-        logger.debug("Searching for query: %s", query)
-        results = vector_store.search(query=query, top_k=4)
-        logger.debug("Search results total: %s", len(results))
-        for i, result in enumerate(results):
-            logger.info("Result %d: %s", i + 1, result.page_content[:200])
-
-    mcp_server = FastMCP("KnowledgeServer")
-
-    @mcp_server.tool()
-    def query_knowledge_base(query: str, top_k: int = 4) -> list[str]:
-        """Query the knowledge base to gather relevant information."""
-        logger.info("Received query: %s", query)
-        results = vector_store.search(query=query, top_k=top_k)
-        logger.info("Returning %d results", len(results))
-        return [str(result) for result in results]
-
-    mcp_server.run(transport="streamable-http")
+
+        if config.server.workers > 1:
+            if profiler.enabled:
+                logger.warning("Queries are not profiled with more than one worker")
+            profiler.stop()
+            run_workers(config.server, run_worker, logger)
+            return
+
+        vector_store.load()
+        logger.info("Knowledge base is ready")
+        mcp_server = build_server(
+            config.server, vector_store, datasources, config.splitter.tokenizer, logger
+        )
+        mcp_server.run(transport="streamable-http")
+    finally:
+        profiler.stop()
+        profiler.report()
+
+
+def run_worker():
+    """
+    Entry point of one serving process. It attaches to the collection the
+    parent process ingested, with its own Milvus client and embeddings.
+    """
+    logger = build_logger()
+    config = Config(CONFIG_FILE_PATH)
+    logger.setLevel(config.log_level.upper())
+    config.vector_store.reset_collection = False  # never drop what was ingested
+
+    datasources = read_datasource(logger)
+    vector_store = build_vector_store(config, logger)
+    for datasource in datasources:
+        vector_store.ensure_collection(
+            datasource.collection or config.vector_store.collection_name
+        )
+    vector_store.load()
+    logger.info("Worker is ready")
+    mcp_server = build_server(
+        config.server, vector_store, datasources, config.splitter.tokenizer, logger
+    )
+    serve_on_shared_port(mcp_server, config.server)
 
 
 if __name__ == "__main__":
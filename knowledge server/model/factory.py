@@ -1,12 +1,23 @@
 from config.config import EmbeddingsConfig
 from langchain_core.embeddings import Embeddings
-from langchain_ollama import OllamaEmbeddings
+
+from registry.lazy import LazyRegistry
+
+EMBEDDINGS = LazyRegistry(
+    "embeddings source",
+    {
+        "ollama": "langchain_ollama:OllamaEmbeddings",
+        "onnx": "model.onnx:OnnxEmbeddings",
+        "model_garden": "model.model_garden:ModelGarden",
+    },
+)
 
 
 class EmbeddingsFactory:
     @staticmethod
     def get_embeddings(config: EmbeddingsConfig) -> Embeddings:
+        embeddings_class = EMBEDDINGS.get(config.source)
         if config.source == "ollama":
-            return OllamaEmbeddings(model=config.model)
-        # Add other embedding sources as needed
-        raise ValueError(f"Unsupported embeddings source: {config.source}")
+            return embeddings_class(model=config.model)
+        # Add other embedding sources to EMBEDDINGS as needed
+        return embeddings_class(config)
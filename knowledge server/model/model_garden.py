@@ -1,28 +1,48 @@
+import base64
+
+import numpy as np
+import requests
 from langchain_core.embeddings import Embeddings
+
 from config.config import EmbeddingsConfig
-import requests
+
+
+def decode_embeddings(data: list[dict]) -> np.ndarray:
+    """
+    Decode the `data` items of an OpenAI-compatible embeddings response into
+    a (len(data), dim) float32 array. Base64 payloads are little-endian
+    float32 and are read with `frombuffer`, without per-float Python objects.
+    """
+    data = sorted(data, key=lambda item: item.get("index", 0))
+    if not data:
+        return np.empty((0, 0), dtype=np.float32)
+    if isinstance(data[0]["embedding"], str):
+        raw = b"".join(base64.b64decode(item["embedding"]) for item in data)
+        return np.frombuffer(raw, dtype="<f4").reshape(len(data), -1)
+    return np.asarray([item["embedding"] for item in data], dtype=np.float32)
 
 
 class ModelGarden(Embeddings):
     def __init__(self, config: EmbeddingsConfig):
         self.config = config
+        self.session = requests.Session()
 
-    def embed_documents(self, texts: list[str]) -> list[list[float]]:
-        response = requests.post(
+    def embed_array(self, texts: list[str]) -> np.ndarray:
+        """Embed `texts` into a (len(texts), dim) float32 array."""
+        response = self.session.post(
             self.config.url + "/embed",
             headers={"Content-Type": "application/json"},
             json={
                 "model": self.config.model,
                 "input": texts,
-                "encoding_format": "float",
+                "encoding_format": self.config.encoding_format,
             },
         )
         response.raise_for_status()
+        return decode_embeddings(response.json()["data"])
 
-        result = response.json()
-        embeddings = [item["embedding"] for item in result["data"]]
-
-        return embeddings
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        return self.embed_array(texts).tolist()
 
     def embed_query(self, text: str) -> list[float]:
-        return self.embed_documents([text])[0]
+        return self.embed_array([text])[0].tolist()
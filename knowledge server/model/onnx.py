@@ -0,0 +1,92 @@
+import os
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from config.config import EmbeddingsConfig
+
+
+class OnnxEmbeddings(Embeddings):
+    """
+    In-process embeddings with ONNX Runtime on CPU.
+
+    Inputs are tokenized in one batch call, sorted by token length and split
+    into batches of similar length, so each batch is padded only to its own
+    longest input. Outputs are mean- or CLS-pooled, L2-normalized float32 rows
+    returned in the original input order.
+    """
+
+    def __init__(self, config: EmbeddingsConfig):
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = config.intra_op_threads
+        options.inter_op_num_threads = 1
+        options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(
+            config.model_path,
+            sess_options=options,
+            providers=["CPUExecutionProvider"],
+        )
+        self.input_names = {i.name for i in self.session.get_inputs()}
+
+        if os.path.exists(config.tokenizer):
+            self.tokenizer = Tokenizer.from_file(config.tokenizer)
+        else:
+            self.tokenizer = Tokenizer.from_pretrained(config.tokenizer)
+        self.tokenizer.enable_truncation(max_length=config.max_length)
+        self.tokenizer.no_padding()
+
+        self.batch_size = config.batch_size
+        self.pooling = config.pooling
+
+    def embed_array(self, texts: list[str]) -> np.ndarray:
+        """Embed `texts` into a (len(texts), dim) float32 array."""
+        if not texts:
+            return np.empty((0, 0), dtype=np.float32)
+
+        encodings = self.tokenizer.encode_batch(texts)
+        lengths = np.fromiter((len(e.ids) for e in encodings), dtype=np.int64)
+        order = np.argsort(lengths, kind="stable")
+
+        result = np.empty((0, 0), dtype=np.float32)
+        for start in range(0, len(texts), self.batch_size):
+            indices = order[start : start + self.batch_size]
+            width = max(1, int(lengths[indices].max()))
+            input_ids = np.zeros((len(indices), width), dtype=np.int64)
+            attention_mask = np.zeros((len(indices), width), dtype=np.int64)
+            for row, index in enumerate(indices):
+                ids = encodings[index].ids
+                input_ids[row, : len(ids)] = ids
+                attention_mask[row, : len(ids)] = 1
+
+            embeddings = self._run(input_ids, attention_mask)
+            if start == 0:
+                result = np.empty((len(texts), embeddings.shape[1]), dtype=np.float32)
+            result[indices] = embeddings
+
+        return result
+
+    def _run(self, input_ids: np.ndarray, attention_mask: np.ndarray) -> np.ndarray:
+        feeds = {"input_ids": input_ids, "attention_mask": attention_mask}
+        if "token_type_ids" in self.input_names:
+            feeds["token_type_ids"] = np.zeros_like(input_ids)
+        output = self.session.run(None, feeds)[0].astype(np.float32, copy=False)
+
+        if output.ndim == 3:  # token embeddings, pool them per input
+            if self.pooling == "cls":
+                output = output[:, 0]
+            else:
+                mask = attention_mask[..., None].astype(np.float32)
+                output = (output * mask).sum(axis=1) / np.maximum(mask.sum(axis=1), 1.0)
+
+        norms = np.linalg.norm(output, axis=1, keepdims=True)
+        return output / np.maximum(norms, 1e-12)
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        return self.embed_array(texts).tolist()
+
+    def embed_query(self, text: str) -> list[float]:
+        return self.embed_array([text])[0].tolist()
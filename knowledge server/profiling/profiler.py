@@ -0,0 +1,216 @@
+import logging
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from collections.abc import Callable, Iterable, Iterator
+from contextlib import contextmanager, nullcontext
+from functools import wraps
+
+
+class NullProfiler:
+    """Profiler used when profiling is off. Every hook is a no-op."""
+
+    enabled = False
+
+    def start(self) -> None:
+        pass
+
+    def stop(self) -> None:
+        pass
+
+    def stage(self, name: str):
+        return nullcontext()
+
+    def iterate(self, name: str, iterable: Iterable) -> Iterable:
+        return iterable
+
+    def wrap(self, name: str, function: Callable) -> Callable:
+        return function
+
+    def record_document(self, name: str) -> None:
+        pass
+
+    def report(self) -> None:
+        pass
+
+
+class Profiler(NullProfiler):
+    """
+    Sampling profiler attributing time to pipeline stages.
+
+    A background thread samples the stack of every thread that is inside a
+    `stage` every `interval` seconds. Samples are wall-clock, so time spent
+    waiting on Milvus or the embedding server shows up as well as CPU time.
+    Threads outside any stage are not sampled. Peak traced memory is recorded
+    per document with tracemalloc.
+
+    `report` writes to `output_dir`:
+    - `<stage>.folded` and `all.folded`: collapsed stacks for flamegraph.pl,
+      inferno or speedscope
+    - `memory.tsv`: peak memory per document
+    - `summary.txt`: time per stage, top functions and top documents
+    """
+
+    enabled = True
+
+    def __init__(
+        self,
+        output_dir: str,
+        logger: logging.Logger,
+        interval: float = 0.005,
+        top_n: int = 20,
+    ):
+        self.output_dir = output_dir
+        self.logger = logger
+        self.interval = interval
+        self.top_n = top_n
+        self.samples: Counter[tuple[str, str]] = Counter()
+        self.stage_seconds: Counter[str] = Counter()
+        self.document_peaks: list[tuple[str, int]] = []
+        self._stages: dict[int, list[str]] = {}
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> None:
+        tracemalloc.start()
+        self._thread = threading.Thread(
+            target=self._sample_loop, name="profiler", daemon=True
+        )
+        self._thread.start()
+        self.logger.info("Profiling into %s", self.output_dir)
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        stack = self._stages.setdefault(threading.get_ident(), [])
+        stack.append(name)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stage_seconds[";".join(stack)] += time.perf_counter() - started
+            stack.pop()
+
+    def iterate(self, name: str, iterable: Iterable) -> Iterator:
+        """Yield from `iterable`, attributing only the time spent producing items."""
+        iterator = iter(iterable)
+        while True:
+            with self.stage(name):
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+            yield item
+
+    def wrap(self, name: str, function: Callable) -> Callable:
+        @wraps(function)
+        def staged(*args, **kwargs):
+            with self.stage(name):
+                return function(*args, **kwargs)
+
+        return staged
+
+    def record_document(self, name: str) -> None:
+        """Record the peak memory since the previous document."""
+        _, peak = tracemalloc.get_traced_memory()
+        self.document_peaks.append((name, peak))
+        tracemalloc.reset_peak()
+
+    def _sample_loop(self) -> None:
+        own_ident = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for ident, frame in sys._current_frames().items():
+                stack = self._stages.get(ident)
+                if ident == own_ident or not stack:
+                    continue
+                self.samples[(";".join(stack), _collapse(frame))] += 1
+
+    def report(self) -> None:
+        os.makedirs(self.output_dir, exist_ok=True)
+        samples = self.samples.copy()
+
+        by_stage: dict[str, Counter[str]] = {}
+        for (stage_path, stack), count in samples.items():
+            stage = stage_path.rsplit(";", 1)[-1]
+            by_stage.setdefault(stage, Counter())[stack] += count
+        for stage, stacks in by_stage.items():
+            _write_folded(os.path.join(self.output_dir, f"{stage}.folded"), stacks)
+        # stages become the root frames of the combined flamegraph
+        combined: Counter[str] = Counter()
+        for (stage_path, stack), count in samples.items():
+            combined[f"{stage_path};{stack}"] += count
+        _write_folded(os.path.join(self.output_dir, "all.folded"), combined)
+
+        with open(os.path.join(self.output_dir, "memory.tsv"), "w") as f:
+            f.write("document\tpeak_bytes\n")
+            for name, peak in self.document_peaks:
+                f.write(f"{name}\t{peak}\n")
+
+        summary = self._summary(samples)
+        with open(os.path.join(self.output_dir, "summary.txt"), "w") as f:
+            f.write(summary)
+        self.logger.info("Profile written to %s\n%s", self.output_dir, summary)
+
+    def _summary(self, samples: Counter[tuple[str, str]]) -> str:
+        # stage seconds include the nested stages
+        lines = [f"{'Stage':<30} {'seconds':>8} {'samples':>8}"]
+        stage_samples: Counter[str] = Counter()
+        self_samples: Counter[str] = Counter()
+        total_samples: Counter[str] = Counter()
+        for (stage_path, stack), count in samples.items():
+            stage_samples[stage_path] += count
+            frames = stack.split(";")
+            self_samples[frames[-1]] += count
+            for frame in set(frames):
+                total_samples[frame] += count
+        for stage_path, seconds in sorted(self.stage_seconds.items()):
+            lines.append(
+                f"{stage_path:<30} {seconds:>8.2f} {stage_samples[stage_path]:>8}"
+            )
+
+        all_samples = max(1, sum(samples.values()))
+        for title, counter in (
+            ("self", self_samples),
+            ("total (including callees)", total_samples),
+        ):
+            lines.append("")
+            lines.append(f"Top {self.top_n} functions by {title} samples")
+            for frame, count in counter.most_common(self.top_n):
+                lines.append(f"{100 * count / all_samples:6.1f}% {count:>8}  {frame}")
+
+        lines.append("")
+        lines.append(f"Top {self.top_n} documents by peak memory")
+        peaks = sorted(self.document_peaks, key=lambda item: item[1], reverse=True)
+        for name, peak in peaks[: self.top_n]:
+            lines.append(f"{peak / 1024 / 1024:9.1f} MiB  {name}")
+        return "\n".join(lines) + "\n"
+
+
+def _collapse(frame) -> str:
+    frames = []
+    while frame is not None:
+        code = frame.f_code
+        filename = "/".join(code.co_filename.rsplit(os.sep, 2)[-2:])
+        frames.append(f"{code.co_name} ({filename}:{code.co_firstlineno})")
+        frame = frame.f_back
+    return ";".join(reversed(frames)).replace("\n", " ")
+
+
+def _write_folded(path: str, stacks: Counter[str]) -> None:
+    with open(path, "w") as f:
+        for stack, count in stacks.most_common():
+            f.write(f"{stack} {count}\n")
+
+
+def build_profiler(output_dir: str | None, logger: logging.Logger) -> NullProfiler:
+    if not output_dir:
+        return NullProfiler()
+    return Profiler(output_dir, logger)
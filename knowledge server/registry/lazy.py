@@ -0,0 +1,30 @@
+import importlib
+from typing import Any
+
+
+class LazyRegistry:
+    """
+    Maps configured names (a datasource `type`, an embeddings `source`, ...) to
+    "module:attribute" paths. A module is only imported when one of its names
+    is looked up, so optional backends cost nothing unless they are configured.
+    """
+
+    def __init__(self, kind: str, entries: dict[str, str]):
+        self.kind = kind
+        self.entries = entries
+        self._resolved: dict[str, Any] = {}
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.entries
+
+    def names(self) -> list[str]:
+        return list(self.entries)
+
+    def get(self, name: str) -> Any:
+        if name not in self._resolved:
+            if name not in self.entries:
+                raise ValueError(f"Unsupported {self.kind}: {name}")
+            module_name, _, attribute = self.entries[name].partition(":")
+            module = importlib.import_module(module_name)
+            self._resolved[name] = getattr(module, attribute)
+        return self._resolved[name]
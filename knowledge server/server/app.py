@@ -0,0 +1,166 @@
+import logging
+import multiprocessing
+import socket
+from collections.abc import Callable
+from functools import partial
+from typing import TYPE_CHECKING
+
+import anyio
+import uvicorn
+from anyio import to_thread
+from mcp.server.fastmcp import FastMCP
+
+from config.config import ServerConfig
+from loader.factory import Datasource
+from server.packing import pack_results
+from transformer.chunker import load_tokenizer
+from vector_store.filter import SearchFilter
+
+if TYPE_CHECKING:
+    from vector_store.milvus import MilvusVectorStore
+
+
+def build_server(
+    config: ServerConfig,
+    vector_store: "MilvusVectorStore",
+    datasources: list[Datasource],
+    tokenizer: str,
+    logger: logging.Logger,
+) -> FastMCP:
+    # Sessions live in one process, so with several workers behind one port
+    # every request must be self-contained.
+    mcp_server = FastMCP(
+        "KnowledgeServer",
+        host=config.host,
+        port=config.port,
+        stateless_http=config.workers > 1,
+    )
+    # Embedding and Milvus calls block, so they run on a bounded thread pool
+    # and the event loop keeps serving other requests meanwhile.
+    limiter = anyio.CapacityLimiter(config.max_concurrency)
+    response_tokenizer = load_tokenizer(tokenizer)
+
+    @mcp_server.tool()
+    async def query_knowledge_base(
+        query: str,
+        top_k: int = 4,
+        source: list[str] | None = None,
+        type: list[str] | None = None,
+        space_name: list[str] | None = None,
+        title: str | None = None,
+        date_from: str | None = None,
+        date_to: str | None = None,
+        datasource: list[str] | None = None,
+        collection: list[str] | None = None,
+        max_tokens: int | None = None,
+        fields: list[str] | None = None,
+    ) -> list[dict]:
+        """
+        Query the knowledge base to gather relevant information.
+
+        Optional filters narrow the search before ranking: `source`, `type`
+        (pdf, markdown, lark-doc, lark-wiki) and `space_name` match any of the
+        given values, `title` matches a title prefix, and `date_from`/`date_to`
+        are ISO-8601 dates bounding the document modification time.
+        `datasource` restricts the search to the partitions of the given
+        datasources, as returned by `list_datasources`, and `collection` to
+        the given knowledge bases; by default every collection is searched.
+
+        Overlapping and adjacent chunks of the same document are merged, and
+        results are returned best first until `max_tokens` of text is reached.
+        `fields` selects the returned keys: `text` and any metadata key such
+        as `source`, `title`, `page`, `type` or `moddate`.
+        """
+        search_filter = SearchFilter(
+            source=source,
+            type=type,
+            space_name=space_name,
+            title=title or "",
+            date_from=date_from,
+            date_to=date_to,
+        )
+        logger.info("Received query: %s (%s)", query, search_filter)
+        results = await to_thread.run_sync(
+            partial(
+                vector_store.search,
+                query=query,
+                top_k=top_k,
+                search_filter=search_filter,
+                partition_names=datasource,
+                collection_names=collection,
+            ),
+            limiter=limiter,
+        )
+        packed = pack_results(
+            results,
+            response_tokenizer,
+            max_tokens=config.response_max_tokens if max_tokens is None else max_tokens,
+            fields=fields or config.response_fields,
+            merge=config.merge_adjacent_chunks,
+        )
+        logger.info("Returning %d of %d results", len(packed), len(results))
+        return packed
+
+    @mcp_server.tool()
+    def list_datasources() -> list[dict[str, str]]:
+        """List the datasources that can be passed to `query_knowledge_base`."""
+        default_collection = vector_store.config.collection_name
+        return [
+            {
+                "datasource": datasource.partition_name,
+                "collection": datasource.collection or default_collection,
+                "type": datasource.type,
+                "id": datasource.id,
+                "path": datasource.path,
+            }
+            for datasource in datasources
+        ]
+
+    return mcp_server
+
+
+def serve_on_shared_port(mcp_server: FastMCP, config: ServerConfig) -> None:
+    """
+    Serve from this process on a SO_REUSEPORT socket, so several worker
+    processes can listen on the same port and the kernel balances
+    connections between them.
+    """
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    sock.bind((config.host, config.port))
+    server = uvicorn.Server(
+        uvicorn.Config(
+            mcp_server.streamable_http_app(),
+            log_level=mcp_server.settings.log_level.lower(),
+        )
+    )
+    server.run(sockets=[sock])
+
+
+def run_workers(
+    config: ServerConfig, worker: Callable[[], None], logger: logging.Logger
+) -> None:
+    """
+    Start `config.workers` processes running `worker` and wait for them. Each
+    process is spawned fresh, so it builds its own clients and caches.
+    """
+    context = multiprocessing.get_context("spawn")
+    processes = [
+        context.Process(target=worker, name=f"worker-{i}")
+        for i in range(config.workers)
+    ]
+    for process in processes:
+        process.start()
+    logger.info("Started %d workers on %s:%d", len(processes), config.host, config.port)
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        logger.info("Stopping workers")
+    finally:
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+        for process in processes:
+            process.join()
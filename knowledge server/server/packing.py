@@ -0,0 +1,116 @@
+from langchain_core.documents import Document
+
+from transformer.chunker import HuggingFaceTokenizer, RegexTokenizer
+
+DEFAULT_FIELDS = ["text", "source", "title", "page"]
+# Chunks of the same document separated by at most this many characters
+# (usually the whitespace the splitter stripped) are treated as adjacent.
+ADJACENT_GAP = 16
+# Do not bother truncating the last item into fewer tokens than this, unless
+# it is the first one.
+MIN_TRUNCATED_TOKENS = 32
+
+
+class _Span:
+    def __init__(self, rank: int, document: Document):
+        self.rank = rank
+        self.text = document.page_content
+        self.metadata = document.metadata or {}
+        # chunks without offsets are never merged, so 0 is only a placeholder
+        start = self.metadata.get("start_index")
+        end = self.metadata.get("end_index")
+        self.has_offsets = start is not None
+        self.start: int = start if start is not None else 0
+        self.end: int = end if end is not None else self.start + len(self.text)
+
+    @property
+    def document_key(self) -> str | None:
+        key = self.metadata.get("document_id") or self.metadata.get("source")
+        if key is None or not self.has_offsets:
+            return None
+        return str(key)
+
+    def merge(self, other: "_Span") -> None:
+        """Append `other`, which starts at or after this span, minus the overlap."""
+        if other.start < self.end:
+            self.text += other.text[self.end - other.start :]
+        else:
+            self.text += "\n" + other.text
+        self.end = max(self.end, other.end)
+        self.rank = min(self.rank, other.rank)
+        self.metadata = {**self.metadata, "end_index": self.end}
+
+
+def merge_adjacent(documents: list[Document]) -> list[_Span]:
+    """
+    Merge overlapping or adjacent chunks of the same document into one span,
+    ranked by its best chunk. Chunks without offsets are kept as they are.
+    """
+    spans = [_Span(rank, document) for rank, document in enumerate(documents)]
+    by_document: dict[str, list[_Span]] = {}
+    merged = []
+    for span in spans:
+        key = span.document_key
+        if key is None:
+            merged.append(span)
+        else:
+            by_document.setdefault(key, []).append(span)
+
+    for group in by_document.values():
+        group.sort(key=lambda span: span.start)
+        current = group[0]
+        for span in group[1:]:
+            if span.start <= current.end + ADJACENT_GAP:
+                current.merge(span)
+            else:
+                merged.append(current)
+                current = span
+        merged.append(current)
+
+    merged.sort(key=lambda span: span.rank)
+    return merged
+
+
+def pack_results(
+    documents: list[Document],
+    tokenizer: HuggingFaceTokenizer | RegexTokenizer,
+    max_tokens: int = 0,
+    fields: list[str] | None = None,
+    merge: bool = True,
+) -> list[dict]:
+    """
+    Turn ranked search results into a compact payload: optionally merge
+    overlapping chunks, keep only `fields` (metadata keys, plus `text`), and
+    stop once `max_tokens` of text have been packed, truncating the last item
+    when enough budget is left. `max_tokens` of 0 disables the budget.
+    """
+    if merge:
+        spans = merge_adjacent(documents)
+    else:
+        spans = [_Span(rank, document) for rank, document in enumerate(documents)]
+    fields = fields or DEFAULT_FIELDS
+
+    packed = []
+    remaining = max_tokens
+    for span in spans:
+        text = span.text
+        if max_tokens > 0:
+            offsets = tokenizer.offsets(text)
+            if len(offsets) > remaining:
+                if packed and remaining < MIN_TRUNCATED_TOKENS:
+                    break
+                text = text[: offsets[remaining - 1][1]]
+                remaining = 0
+            else:
+                remaining -= len(offsets)
+
+        item = {}
+        for field in fields:
+            value = text if field == "text" else span.metadata.get(field)
+            if value not in (None, ""):
+                item[field] = value
+        packed.append(item)
+
+        if max_tokens > 0 and remaining <= 0:
+            break
+    return packed
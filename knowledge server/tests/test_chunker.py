@@ -0,0 +1,97 @@
+import random
+
+import pytest
+
+from transformer.chunker import RegexTokenizer, TokenTextChunker
+
+
+def sample_text(seed: int, words: int = 400) -> str:
+    rng = random.Random(seed)
+    pieces = []
+    for _ in range(words):
+        pieces.append("x" * rng.randint(1, 30))
+        pieces.append(rng.choice([" ", " ", " ", ", ", ". ", "\n", "\n\n"]))
+    return "".join(pieces)
+
+
+def assert_covers(text: str, spans: list[tuple[int, int, int]]) -> None:
+    covered = [False] * len(text)
+    for start, end, _ in spans:
+        for i in range(start, end):
+            covered[i] = True
+    missing = [
+        i for i, char in enumerate(text) if not char.isspace() and not covered[i]
+    ]
+    assert not missing, f"characters {missing[:10]} are in no chunk"
+
+
+@pytest.mark.parametrize("seed", range(20))
+@pytest.mark.parametrize(
+    ("max_tokens", "overlap_tokens", "max_chars"),
+    [(50, 5, 20), (16, 4, 200), (8, 0, 40), (100, 20, 60)],
+)
+def test_chunks_cover_text_within_budget(seed, max_tokens, overlap_tokens, max_chars):
+    text = sample_text(seed)
+    chunker = TokenTextChunker("", max_tokens, overlap_tokens, max_chars)
+    spans = chunker.split_offsets(text)
+
+    assert_covers(text, spans)
+    tokenizer = RegexTokenizer()
+    for start, end, token_count in spans:
+        assert end - start <= max_chars
+        assert token_count <= max_tokens
+        assert len(tokenizer.offsets(text[start:end])) <= max_tokens
+
+
+def test_last_token_cut_by_max_chars_is_kept():
+    text = "ab cd " + "x" * 18
+    spans = TokenTextChunker("", 50, 5, 20).split_offsets(text)
+
+    assert_covers(text, spans)
+    assert spans[-1][1] == len(text)
+
+
+def test_token_longer_than_max_chars_is_split():
+    text = "a " + "y" * 45 + " b"
+    spans = TokenTextChunker("", 10, 0, 20).split_offsets(text)
+
+    assert_covers(text, spans)
+    assert all(end - start <= 20 for start, end, _ in spans)
+
+
+def test_split_documents_records_offsets_and_pages():
+    from langchain_core.documents import Document
+
+    text = "first page words\fsecond page words " + "z " * 30
+    chunker = TokenTextChunker("", 10, 0, 1000)
+    chunks = chunker.split_documents(
+        [Document(page_content=text, metadata={"source": "a.pdf"})]
+    )
+
+    assert chunks[0].metadata["page"] == 1
+    assert chunks[-1].metadata["page"] == 2
+    for chunk in chunks:
+        start, end = chunk.metadata["start_index"], chunk.metadata["end_index"]
+        assert text[start:end] == chunk.page_content
+        assert chunk.metadata["token_count"] <= 10
+
+
+def test_tokenizer_truncation_is_disabled(tmp_path):
+    tokenizers = pytest.importorskip("tokenizers")
+    words = [f"w{i}" for i in range(40)]
+    tokenizer = tokenizers.Tokenizer(
+        tokenizers.models.WordLevel(
+            {word: i for i, word in enumerate(["[UNK]", *words])}, unk_token="[UNK]"
+        )
+    )
+    tokenizer.pre_tokenizer = tokenizers.pre_tokenizers.Whitespace()
+    tokenizer.enable_truncation(8)
+    path = tmp_path / "tokenizer.json"
+    tokenizer.save(str(path))
+
+    text = " ".join(words)
+    spans = TokenTextChunker(str(path), 4, 0, 1000).split_offsets(text)
+
+    assert_covers(text, spans)
+    assert all(token_count <= 4 for _, _, token_count in spans)
+    assert all(len(text[start:end].split()) <= 4 for start, end, _ in spans)
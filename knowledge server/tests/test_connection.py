@@ -0,0 +1,107 @@
+import logging
+from typing import Any, cast
+
+import grpc
+import pytest
+
+from config.config import VectorStoreConfig
+from vector_store import connection
+from vector_store.connection import RetryingMilvusClient, connect, is_retryable
+
+
+class FakeMilvusClient:
+    def __init__(self, **kwargs):
+        self.kwargs = kwargs
+        self.failures: list[Exception] = []
+        self.calls = 0
+
+    def search(self, **kwargs):
+        self.calls += 1
+        if self.failures:
+            raise self.failures.pop(0)
+        return [[]]
+
+
+def test_connect_passes_timeout_and_wraps_with_retries(monkeypatch):
+    monkeypatch.setattr(connection, "MilvusClient", FakeMilvusClient)
+    config = VectorStoreConfig(
+        {
+            "vector_store": {
+                "url": "http://milvus:19530",
+                "timeout_seconds": 7,
+                "retry_attempts": 4,
+            }
+        }
+    )
+
+    client = connect(config, logging.getLogger("test"))
+
+    assert isinstance(client, RetryingMilvusClient)
+    assert client._client.kwargs == {"uri": "http://milvus:19530", "timeout": 7}
+    assert client._attempts == 4
+
+
+class FakeRpcError(grpc.RpcError, grpc.Call):
+    def __init__(self, status: grpc.StatusCode):
+        self.status = status
+
+    def code(self):
+        return self.status
+
+    def details(self):
+        return ""
+
+    def initial_metadata(self):
+        return None
+
+    def trailing_metadata(self):
+        return None
+
+    def is_active(self):
+        return False
+
+    def time_remaining(self):
+        return None
+
+    def cancel(self):
+        return False
+
+    def add_callback(self, callback):
+        return False
+
+
+def test_inserts_are_only_retried_when_unavailable():
+    deadline = FakeRpcError(grpc.StatusCode.DEADLINE_EXCEEDED)
+    unavailable = FakeRpcError(grpc.StatusCode.UNAVAILABLE)
+    assert is_retryable(deadline, "search")
+    assert not is_retryable(deadline, "insert")
+    assert is_retryable(unavailable, "insert")
+
+
+def test_retryable_errors_are_retried():
+    client = FakeMilvusClient()
+    client.failures = [FakeRpcError(grpc.StatusCode.UNAVAILABLE)]
+    retrying = RetryingMilvusClient(
+        cast(Any, client),
+        attempts=3,
+        backoff_seconds=0,
+        logger=logging.getLogger("test"),
+    )
+
+    assert retrying.search(collection_name="kb") == [[]]
+    assert client.calls == 2
+
+
+def test_other_errors_are_raised_at_once():
+    client = FakeMilvusClient()
+    client.failures = [ValueError("bad request")]
+    retrying = RetryingMilvusClient(
+        cast(Any, client),
+        attempts=3,
+        backoff_seconds=0,
+        logger=logging.getLogger("test"),
+    )
+
+    with pytest.raises(ValueError):
+        retrying.search(collection_name="kb")
+    assert client.calls == 1
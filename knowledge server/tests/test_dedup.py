@@ -0,0 +1,65 @@
+import logging
+
+from langchain_core.documents import Document
+
+from transformer.dedup import ChunkDeduplicator
+
+LOGGER = logging.getLogger("test")
+PAGE = " ".join(f"word{i}" for i in range(60))
+
+
+def chunk(text: str, source: str, ingest_key: str) -> Document:
+    return Document(
+        page_content=text, metadata={"source": source, "ingest_key": ingest_key}
+    )
+
+
+def test_copies_are_dropped_across_datasources():
+    deduplicator = ChunkDeduplicator(LOGGER)
+    wiki = deduplicator.transform_documents(
+        [chunk(PAGE, "wiki/page", "w1")], scope="kb", owner="kb/wiki"
+    )
+    space = deduplicator.transform_documents(
+        [chunk(PAGE.upper(), "space/page", "s1"), chunk("other", "space/o", "s2")],
+        scope="kb",
+        owner="kb/space",
+    )
+
+    assert [d.page_content for d in space] == ["other"]
+    assert wiki[0].metadata["duplicate_sources"] == ["space/page"]
+    assert deduplicator.dropped_exact == 1
+    assert deduplicator.pop_references() == {("kb/space", "s1", "kb/wiki")}
+    assert deduplicator.pop_references() == set()
+
+
+def test_near_duplicates_are_dropped():
+    deduplicator = ChunkDeduplicator(LOGGER)
+    deduplicator.transform_documents([chunk(PAGE, "a", "a")], owner="a")
+    edited = PAGE.replace("word59", "changed")
+
+    assert deduplicator.transform_documents([chunk(edited, "b", "b")], owner="b") == []
+    assert deduplicator.dropped_near == 1
+
+
+def test_collections_are_deduplicated_separately():
+    deduplicator = ChunkDeduplicator(LOGGER)
+    deduplicator.transform_documents([chunk(PAGE, "a", "a")], scope="kb1", owner="a")
+
+    kept = deduplicator.transform_documents(
+        [chunk(PAGE, "b", "b")], scope="kb2", owner="b"
+    )
+
+    assert len(kept) == 1
+
+
+def test_forgotten_units_are_admitted_again():
+    deduplicator = ChunkDeduplicator(LOGGER)
+    deduplicator.add_existing([chunk(PAGE, "a", "a1")], scope="kb", owner="kb/a")
+    deduplicator.forget("kb/a", "a1")
+
+    kept = deduplicator.transform_documents(
+        [chunk(PAGE, "a", "a1")], scope="kb", owner="kb/a"
+    )
+
+    assert len(kept) == 1
+    assert deduplicator.dropped_exact == 0
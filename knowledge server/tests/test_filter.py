@@ -0,0 +1,51 @@
+import pytest
+
+from vector_store.filter import SearchFilter, parse_timestamp
+
+JAN_1_2024 = 1704067200
+
+
+@pytest.mark.parametrize(
+    "value",
+    ["2024-01-01", "20240101", "2024-01-01T00:00:00Z", "D:20240101000000"],
+)
+def test_dates_are_parsed(value):
+    assert parse_timestamp(value) == JAN_1_2024
+
+
+@pytest.mark.parametrize(
+    "value", [JAN_1_2024, str(JAN_1_2024), JAN_1_2024 * 1000, str(JAN_1_2024 * 1000)]
+)
+def test_unix_timestamps_are_parsed(value):
+    assert parse_timestamp(value) == JAN_1_2024
+
+
+@pytest.mark.parametrize("value", ["", None, "yesterday", "123456789", True])
+def test_other_values_are_not_dates(value):
+    assert parse_timestamp(value) is None
+
+
+def test_date_only_upper_bound_includes_the_day():
+    search_filter = SearchFilter(date_from="20240101", date_to="2024-01-01")
+
+    assert search_filter.to_expression() == (
+        f"date >= {JAN_1_2024} and date <= {JAN_1_2024 + 86399}"
+    )
+
+
+def test_timestamp_upper_bound_is_exact():
+    assert SearchFilter(date_to="1700000000").date_to == 1700000000
+    assert SearchFilter(date_to="2024-01-01T12:00:00Z").date_to == JAN_1_2024 + 43200
+
+
+def test_invalid_dates_are_rejected():
+    with pytest.raises(ValueError):
+        SearchFilter(date_from="not a date")
+
+
+def test_filter_expression():
+    search_filter = SearchFilter(source=["a.pdf"], title="100%_done")
+
+    assert search_filter.to_expression() == (
+        'source in ["a.pdf"] and title like "100\\\\%\\\\_done%"'
+    )
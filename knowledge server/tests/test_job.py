@@ -0,0 +1,197 @@
+import logging
+from typing import Any, cast
+
+import pytest
+from langchain_core.documents import Document
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from config.config import IngestConfig
+from ingest.job import IngestJob
+from ingest.state import DONE, FAILED, PENDING, IngestState
+from loader.factory import Datasource
+from profiling.profiler import NullProfiler
+from vector_store.milvus import MilvusBufferedWriter
+
+LOGGER = logging.getLogger("test")
+
+
+class FakeClient:
+    def __init__(self):
+        self.inserted: list[dict] = []
+        self.failing_keys: set[str] = set()
+        self.documents: list[dict] = []
+        self.fail_upsert = False
+
+    def insert(self, collection_name, data, partition_name):
+        if any(row["metadata"]["ingest_key"] in self.failing_keys for row in data):
+            raise RuntimeError("insert failed")
+        self.inserted.extend(data)
+
+    def upsert(self, collection_name, data, partition_name):
+        if self.fail_upsert:
+            raise RuntimeError("upsert failed")
+        self.documents.extend(data)
+
+    def flush(self, collection_name):
+        pass
+
+
+class FakeConfig:
+    collection_name = "kb"
+
+
+class FakeStore:
+    config = FakeConfig()
+    document_search = False
+    batch_size = 2
+
+    def __init__(self):
+        self.client = FakeClient()
+        self.collections: dict[str, set[str]] = {}
+        self.embed_failures: dict[str, int] = {}
+        self.deleted: list[str] = []
+
+    def ensure_collection(self, collection_name):
+        self.collections.setdefault(collection_name, set())
+
+    def ensure_partition(self, partition_name, collection_name):
+        self.collections[collection_name].add(partition_name)
+
+    def delete_unit(self, ingest_key, partition_name, collection_name):
+        self.deleted.append(ingest_key)
+        self.client.inserted = [
+            row
+            for row in self.client.inserted
+            if row["metadata"]["ingest_key"] != ingest_key
+        ]
+
+    def to_rows(self, documents):
+        key = documents[0].metadata["ingest_key"]
+        if self.embed_failures.get(key, 0) > 0:
+            self.embed_failures[key] -= 1
+            raise RuntimeError("embedding failed")
+        return [
+            {
+                "text": document.page_content,
+                "text_vector_dense": [0.0],
+                "metadata": document.metadata,
+                "source": "",
+                "type": "",
+                "space_name": "",
+                "title": "",
+                "date": 0,
+                "doc_key": document.metadata["ingest_key"],
+            }
+            for document in documents
+        ]
+
+    def mean_chunk_vectors(self, doc_keys, partition_name, collection_name):
+        return {doc_key: [1.0] for doc_key in doc_keys}
+
+    def invalidate_query_cache(self):
+        pass
+
+    def writer(self, on_insert=None, on_documents=None):
+        return MilvusBufferedWriter(
+            cast(Any, self),
+            self.batch_size,
+            1 << 20,
+            0,
+            LOGGER,
+            on_insert,
+            on_documents,
+        )
+
+
+class FakeLoader:
+    def lazy_load_units(self):
+        for key in ("a", "b", "c"):
+            yield (
+                key,
+                lambda key=key: [
+                    Document(page_content=f"text of {key}", metadata={"source": key})
+                ],
+            )
+
+
+class FakeLoaderFactory:
+    def get_loader(self, datasource):
+        return FakeLoader()
+
+
+def run_job(store, state) -> str:
+    datasource = Datasource(type="directory", path="docs")
+    job = IngestJob(
+        IngestConfig({"ingest": {"max_attempts": 2, "retry_backoff_seconds": 0}}),
+        cast(Any, store),
+        cast(Any, FakeLoaderFactory()),
+        RecursiveCharacterTextSplitter(chunk_size=100, chunk_overlap=0),
+        None,
+        state,
+        NullProfiler(),
+        LOGGER,
+    )
+    job.run([datasource])
+    return f"kb/{datasource.partition_name}"
+
+
+def inserted_keys(store) -> list[str]:
+    return sorted(row["metadata"]["ingest_key"] for row in store.client.inserted)
+
+
+def test_transient_embedding_failure_is_retried(tmp_path):
+    store = FakeStore()
+    store.embed_failures["b"] = 1
+    state = IngestState(str(tmp_path / "state.sqlite"))
+
+    datasource_key = run_job(store, state)
+
+    assert inserted_keys(store) == ["a", "b", "c"]
+    assert state.status(datasource_key, "b") == DONE
+
+
+def test_failing_units_are_dead_lettered_and_the_job_goes_on(tmp_path):
+    store = FakeStore()
+    store.batch_size = 1
+    store.embed_failures["a"] = 5
+    store.client.failing_keys = {"b"}
+    state = IngestState(str(tmp_path / "state.sqlite"))
+
+    datasource_key = run_job(store, state)
+
+    assert inserted_keys(store) == ["c"]
+    assert state.status(datasource_key, "a") == FAILED
+    assert state.status(datasource_key, "b") == FAILED
+    assert state.status(datasource_key, "c") == DONE
+    assert [letter[1] for letter in state.dead_letters()] == ["a", "b"]
+
+
+def test_failed_insert_fails_every_unit_in_the_batch(tmp_path):
+    store = FakeStore()
+    store.client.failing_keys = {"b"}
+    state = IngestState(str(tmp_path / "state.sqlite"))
+
+    datasource_key = run_job(store, state)
+
+    # a and b share the writer's batch
+    assert inserted_keys(store) == ["c"]
+    assert state.status(datasource_key, "a") == FAILED
+    assert state.status(datasource_key, "b") == FAILED
+
+
+def test_units_are_done_once_their_document_vectors_are_written(tmp_path):
+    store = FakeStore()
+    store.document_search = True
+    store.client.fail_upsert = True
+    state = IngestState(str(tmp_path / "state.sqlite"))
+
+    with pytest.raises(RuntimeError):
+        run_job(store, state)
+    assert state.counts() == {PENDING: 4}
+
+    store.client.fail_upsert = False
+    datasource_key = run_job(store, state)
+
+    assert inserted_keys(store) == ["a", "b", "c"]
+    assert sorted(row["doc_key"] for row in store.client.documents) == ["a", "b", "c"]
+    assert state.status(datasource_key, "a") == DONE
@@ -0,0 +1,56 @@
+from langchain_core.documents import Document
+
+from server.packing import pack_results
+from transformer.chunker import RegexTokenizer
+
+
+def chunk(text: str, start: int, source: str = "a.md") -> Document:
+    return Document(
+        page_content=text,
+        metadata={
+            "source": source,
+            "start_index": start,
+            "end_index": start + len(text),
+        },
+    )
+
+
+def test_overlapping_chunks_are_merged():
+    text = "alpha beta gamma delta epsilon zeta"
+    documents = [
+        chunk(text[11:30], 11),
+        chunk(text[0:16], 0),
+        chunk("other", 0, "b.md"),
+    ]
+
+    packed = pack_results(documents, RegexTokenizer(), fields=["text", "source"])
+
+    assert packed == [
+        {"text": text[0:30], "source": "a.md"},
+        {"text": "other", "source": "b.md"},
+    ]
+
+
+def test_distant_chunks_are_not_merged():
+    documents = [chunk("first part", 0), chunk("later part", 500)]
+
+    packed = pack_results(documents, RegexTokenizer(), fields=["text"])
+
+    assert packed == [{"text": "first part"}, {"text": "later part"}]
+
+
+def test_merge_can_be_disabled():
+    documents = [chunk("alpha beta", 0), chunk("beta gamma", 6)]
+
+    packed = pack_results(documents, RegexTokenizer(), fields=["text"], merge=False)
+
+    assert [item["text"] for item in packed] == ["alpha beta", "beta gamma"]
+
+
+def test_token_budget_truncates_the_last_item():
+    documents = [chunk("one two three", 0), chunk(" ".join(["w"] * 100), 0, "b.md")]
+
+    packed = pack_results(documents, RegexTokenizer(), max_tokens=40, fields=["text"])
+
+    assert packed[0]["text"] == "one two three"
+    assert len(RegexTokenizer().offsets(packed[1]["text"])) == 37
@@ -0,0 +1,192 @@
+import bisect
+import os
+import re
+from collections.abc import Iterable, Sequence
+from functools import lru_cache
+from typing import Any
+
+from langchain_core.documents import BaseDocumentTransformer, Document
+
+DEFAULT_SEPARATORS = ("\n\n", "\n", ". ", " ")
+PAGE_BREAK = "\f"
+
+
+class RegexTokenizer:
+    """
+    Used when no tokenizer is configured. Counts words and punctuation, which
+    undercounts subword tokens, so budgets should be set conservatively with it.
+    """
+
+    pattern = re.compile(r"\w+|[^\w\s]")
+
+    def offsets(self, text: str) -> list[tuple[int, int]]:
+        return [match.span() for match in self.pattern.finditer(text)]
+
+
+class HuggingFaceTokenizer:
+    def __init__(self, name: str):
+        from tokenizers import Tokenizer
+
+        if os.path.exists(name):
+            self.tokenizer = Tokenizer.from_file(name)
+        else:
+            self.tokenizer = Tokenizer.from_pretrained(name)
+        # many embedding models ship a tokenizer.json that truncates to their
+        # context length, which would hide the rest of the text from the chunker
+        self.tokenizer.no_truncation()
+
+    def offsets(self, text: str) -> list[tuple[int, int]]:
+        encoding = self.tokenizer.encode(text, add_special_tokens=False)
+        return encoding.offsets
+
+
+@lru_cache(maxsize=4)
+def load_tokenizer(name: str) -> HuggingFaceTokenizer | RegexTokenizer:
+    """
+    Load a Hugging Face tokenizer by hub name or tokenizer.json path, once per
+    process. RegexTokenizer is only used when no tokenizer is configured; a
+    configured tokenizer that cannot be loaded raises instead of silently
+    budgeting chunks in words.
+    """
+    if not name:
+        return RegexTokenizer()
+    try:
+        return HuggingFaceTokenizer(name)
+    except Exception as e:
+        raise ValueError(
+            f"Failed to load tokenizer {name}: {e}. Install the `tokenizer` "
+            "extra, and for gated hub models accept the license and set HF_TOKEN, "
+            "or point `tokenizer` at a local tokenizer.json"
+        ) from e
+
+
+class TokenTextChunker(BaseDocumentTransformer):
+    """
+    Single-pass chunker that budgets chunks in model tokens.
+
+    The text is tokenized once and every chunk boundary is located from the
+    precomputed token offsets, preferring the strongest separator (paragraph,
+    line, sentence, word) inside the token window. Each chunk records its
+    character offsets, token count and, for texts with form-feed page breaks,
+    its page number.
+    """
+
+    def __init__(
+        self,
+        tokenizer: str,
+        max_tokens: int,
+        overlap_tokens: int,
+        max_chars: int,
+        separators: Sequence[str] = DEFAULT_SEPARATORS,
+    ):
+        if overlap_tokens >= max_tokens:
+            raise ValueError("overlap_tokens must be smaller than max_tokens.")
+
+        self.tokenizer = load_tokenizer(tokenizer)
+        self.max_tokens = max_tokens
+        self.overlap_tokens = overlap_tokens
+        self.max_chars = max_chars
+        self.separators = separators
+
+    def split_documents(self, documents: Iterable[Document]) -> list[Document]:
+        chunks = []
+        for document in documents:
+            chunks.extend(self._split_document(document))
+        return chunks
+
+    def transform_documents(
+        self, documents: Sequence[Document], **kwargs: Any
+    ) -> Sequence[Document]:
+        return self.split_documents(documents)
+
+    def _split_document(self, document: Document) -> list[Document]:
+        text = document.page_content
+        page_breaks = [m.start() for m in re.finditer(PAGE_BREAK, text)]
+        first_page = document.metadata.get("page", 0) + 1 if page_breaks else None
+
+        chunks = []
+        for start, end, token_count in self.split_offsets(text):
+            content = text[start:end]
+            stripped = content.lstrip()
+            start += len(content) - len(stripped)
+            content = stripped.rstrip()
+            if not content:
+                continue
+            metadata = {
+                **document.metadata,
+                "start_index": start,
+                "end_index": start + len(content),
+                "token_count": token_count,
+            }
+            if first_page is not None:
+                metadata["page"] = first_page + bisect.bisect_right(page_breaks, start)
+            chunks.append(Document(page_content=content, metadata=metadata))
+        return chunks
+
+    def split_offsets(self, text: str) -> list[tuple[int, int, int]]:
+        """Return (start, end, token_count) for every chunk of `text`."""
+        offsets = self.tokenizer.offsets(text)
+        if not offsets:
+            return []
+        starts = [start for start, _ in offsets]
+        ends = [end for _, end in offsets]
+        total = len(offsets)
+
+        spans = []
+        first = 0
+        while first < total:
+            start = starts[first]
+            if ends[first] - start > self.max_chars:
+                # a single token longer than max_chars is split on characters
+                for piece in range(start, ends[first], self.max_chars):
+                    spans.append((piece, min(piece + self.max_chars, ends[first]), 1))
+                first += 1
+                continue
+
+            last = min(total, first + self.max_tokens)
+            limit = min(ends[last - 1], start + self.max_chars)
+
+            if last == total and limit == ends[-1]:
+                end = min(len(text), start + self.max_chars)
+            else:
+                end = self._boundary(text, start, limit)
+
+            next_first = bisect.bisect_left(starts, end)
+            token_count = next_first - first
+            spans.append((start, end, token_count))
+
+            if ends[next_first - 1] > end:
+                # the window cut a token in half, start the next chunk with it
+                next_first -= 1
+            if next_first >= total:
+                break
+            first = max(first + 1, self._overlap_start(text, starts, first, next_first))
+        return spans
+
+    def _boundary(self, text: str, start: int, limit: int) -> int:
+        # only accept separators in the second half of the window to avoid
+        # emitting tiny chunks
+        floor = start + (limit - start) // 2
+        for separator in self.separators:
+            position = text.rfind(separator, floor, limit)
+            if position != -1:
+                return position + len(separator)
+        return limit
+
+    def _overlap_start(
+        self, text: str, starts: list[int], first: int, next_first: int
+    ) -> int:
+        if self.overlap_tokens <= 0:
+            return next_first
+        # never overlap more than half of the previous chunk so short chunks
+        # still make progress
+        candidate = max(
+            next_first - self.overlap_tokens, first + (next_first - first + 1) // 2
+        )
+        if candidate >= next_first:
+            return next_first
+        # move forward to a word boundary so the overlap does not start mid-word
+        space = text.find(" ", starts[candidate], starts[next_first])
+        if space != -1:
+            return bisect.bisect_left(starts, space + 1)
+        return candidate
@@ -0,0 +1,209 @@
+import hashlib
+import logging
+import re
+import zlib
+from collections.abc import Iterable, Sequence
+from typing import Any
+
+import numpy as np
+from langchain_core.documents import BaseDocumentTransformer, Document
+
+# Mersenne prime used for universal hashing of 32-bit shingle hashes.
+# a * x + b stays below 2**63, so uint64 arithmetic never overflows.
+_MERSENNE_PRIME = np.uint64((1 << 31) - 1)
+_WHITESPACE = re.compile(r"\s+")
+
+
+class ChunkDeduplicator(BaseDocumentTransformer):
+    """
+    Drops exact and near-duplicate chunks among the documents it has seen in
+    the same scope (e.g. one collection), across all the datasources
+    (owners) feeding it.
+
+    Exact duplicates are detected with a hash of the normalized text, near
+    duplicates with MinHash signatures bucketed by LSH banding. The first chunk
+    seen is kept as canonical and the sources of the dropped copies are recorded
+    in its `duplicate_sources` metadata. The canonical documents are mutated in
+    place, so that metadata only reaches the vector store for canonical chunks
+    that were not written yet.
+
+    Every copy dropped against another owner's canonical chunk is recorded in
+    `references` as (owner, ingest_key, canonical owner), so the units that
+    lost their copies can be ingested again when the canonical owner is
+    dropped or reindexed.
+    """
+
+    def __init__(
+        self,
+        logger: logging.Logger,
+        threshold: float = 0.85,
+        num_perm: int = 128,
+        bands: int = 32,
+        shingle_size: int = 5,
+        seed: int = 1,
+    ):
+        if num_perm % bands != 0:
+            raise ValueError("num_perm must be divisible by bands.")
+
+        self.logger = logger
+        self.threshold = threshold
+        self.bands = bands
+        self.rows_per_band = num_perm // bands
+        self.shingle_size = shingle_size
+
+        rng = np.random.default_rng(seed)
+        self.perm_a = rng.integers(1, _MERSENNE_PRIME, size=num_perm, dtype=np.uint64)
+        self.perm_b = rng.integers(0, _MERSENNE_PRIME, size=num_perm, dtype=np.uint64)
+
+        self.exact: dict[tuple[str, bytes], int] = {}
+        self.signatures: list[np.ndarray] = []
+        self.canonicals: list[Document] = []
+        self.scopes: list[str] = []
+        self.owners: list[str] = []
+        self.digests: list[bytes] = []
+        self.forgotten: set[int] = set()
+        self.buckets: dict[tuple[str, int, bytes], list[int]] = {}
+        self.references: set[tuple[str, str, str]] = set()
+        self.dropped_exact = 0
+        self.dropped_near = 0
+
+    def transform_documents(
+        self, documents: Sequence[Document], **kwargs: Any
+    ) -> Sequence[Document]:
+        """
+        Return only the chunks that were not seen before in the `scope`
+        keyword argument (default: one global scope). The `owner` keyword
+        argument names the datasource the documents come from.
+        """
+        scope = str(kwargs.get("scope", ""))
+        owner = str(kwargs.get("owner", ""))
+        unique = []
+        for document in documents:
+            if self._is_duplicate(document, scope, owner):
+                continue
+            unique.append(document)
+        return unique
+
+    def add_existing(
+        self, documents: Iterable[Document], scope: str, owner: str
+    ) -> None:
+        """
+        Index chunks that are already in the vector store (e.g. written by a
+        previous run), so new copies of them are dropped. Duplicates among
+        them are neither counted nor recorded.
+        """
+        for document in documents:
+            self._is_duplicate(document, scope, owner, existing=True)
+
+    def forget(self, owner: str, ingest_key: str | None = None) -> None:
+        """
+        Drop the canonical chunks of one ingest unit, or of every unit of
+        `owner`, from the index, so they can be ingested again without being
+        dropped as duplicates of themselves.
+        """
+        for index, canonical in enumerate(self.canonicals):
+            if (
+                index not in self.forgotten
+                and self.owners[index] == owner
+                and (
+                    ingest_key is None
+                    or canonical.metadata.get("ingest_key") == ingest_key
+                )
+            ):
+                self.forgotten.add(index)
+                key = (self.scopes[index], self.digests[index])
+                if self.exact.get(key) == index:
+                    del self.exact[key]
+
+    def pop_references(self) -> set[tuple[str, str, str]]:
+        """Return and clear the references recorded since the last call."""
+        references, self.references = self.references, set()
+        return references
+
+    def _is_duplicate(
+        self, document: Document, scope: str, owner: str, existing: bool = False
+    ) -> bool:
+        normalized = _WHITESPACE.sub(" ", document.page_content).strip().lower()
+        digest = hashlib.blake2b(normalized.encode("utf-8"), digest_size=16).digest()
+
+        index = self.exact.get((scope, digest))
+        if index is not None:
+            if not existing:
+                self._record_duplicate(index, document, owner)
+                self.dropped_exact += 1
+            return True
+
+        signature = self._signature(normalized)
+        rows = self.rows_per_band
+        band_keys = [
+            (scope, band, signature[band * rows : (band + 1) * rows].tobytes())
+            for band in range(self.bands)
+        ]
+
+        candidates = {
+            index
+            for key in band_keys
+            for index in self.buckets.get(key, [])
+            if index not in self.forgotten
+        }
+        for index in sorted(candidates):
+            similarity = float(np.mean(self.signatures[index] == signature))
+            if similarity >= self.threshold:
+                if not existing:
+                    self._record_duplicate(index, document, owner)
+                    self.dropped_near += 1
+                return True
+
+        index = len(self.canonicals)
+        self.exact[(scope, digest)] = index
+        self.signatures.append(signature)
+        self.canonicals.append(document)
+        self.scopes.append(scope)
+        self.owners.append(owner)
+        self.digests.append(digest)
+        for key in band_keys:
+            self.buckets.setdefault(key, []).append(index)
+        return False
+
+    def _signature(self, normalized: str) -> np.ndarray:
+        words = normalized.split(" ")
+        if len(words) <= self.shingle_size:
+            shingles = [normalized]
+        else:
+            shingles = [
+                " ".join(words[i : i + self.shingle_size])
+                for i in range(len(words) - self.shingle_size + 1)
+            ]
+        hashes = np.unique(
+            np.fromiter(
+                (zlib.crc32(s.encode("utf-8")) for s in shingles),
+                dtype=np.uint64,
+                count=len(shingles),
+            )
+        )
+        permuted = (
+            np.outer(self.perm_a, hashes) + self.perm_b[:, None]
+        ) % _MERSENNE_PRIME
+        return permuted.min(axis=1)
+
+    def _record_duplicate(self, index: int, duplicate: Document, owner: str) -> None:
+        canonical = self.canonicals[index]
+        if self.owners[index] != owner:
+            self.references.add(
+                (
+                    owner,
+                    str(duplicate.metadata.get("ingest_key", "")),
+                    self.owners[index],
+                )
+            )
+        source = duplicate.metadata.get("source")
+        if not source or source == canonical.metadata.get("source"):
+            return
+        sources = canonical.metadata.setdefault("duplicate_sources", [])
+        if source not in sources:
+            sources.append(source)
+        self.logger.debug(
+            "Dropped duplicate chunk from %s (canonical: %s)",
+            source,
+            canonical.metadata.get("source", "unknown"),
+        )
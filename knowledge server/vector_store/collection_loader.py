@@ -0,0 +1,107 @@
+import logging
+import threading
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+
+from vector_store.connection import RetryingMilvusClient, wait_until_ready
+
+
+class CollectionLoader:
+    """
+    Loads collections on first use and, with `idle_seconds` > 0, releases the
+    ones that were not searched for that long, so memory follows query
+    traffic. Collections with searches in flight are never released.
+    """
+
+    def __init__(
+        self,
+        client: RetryingMilvusClient,
+        ready_timeout_seconds: float,
+        idle_seconds: float,
+        logger: logging.Logger,
+    ):
+        self.client = client
+        self.ready_timeout_seconds = ready_timeout_seconds
+        self.idle_seconds = idle_seconds
+        self.logger = logger
+        self.loaded: set[str] = set()
+        self.last_used: dict[str, float] = {}
+        self.in_flight: dict[str, int] = {}
+        self._locks: dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+        self._reaper: threading.Thread | None = None
+
+    def load(self, collection_name: str) -> None:
+        with self._collection_lock(collection_name):
+            if collection_name in self.loaded:
+                return
+            wait_until_ready(
+                self.client,
+                collection_name,
+                timeout_seconds=self.ready_timeout_seconds,
+                logger=self.logger,
+            )
+            with self._lock:
+                self.loaded.add(collection_name)
+                self.last_used[collection_name] = time.monotonic()
+        self._start_reaper()
+
+    @contextmanager
+    def use(self, collection_name: str) -> Iterator[None]:
+        """Keep `collection_name` loaded while the block runs."""
+        with self._lock:
+            self.in_flight[collection_name] = self.in_flight.get(collection_name, 0) + 1
+        try:
+            self.load(collection_name)
+            yield
+        finally:
+            with self._lock:
+                self.in_flight[collection_name] -= 1
+                self.last_used[collection_name] = time.monotonic()
+
+    def release_idle(self) -> None:
+        now = time.monotonic()
+        with self._lock:
+            idle = [
+                name
+                for name in self.loaded
+                if not self.in_flight.get(name)
+                and now - self.last_used.get(name, now) >= self.idle_seconds
+            ]
+        for collection_name in idle:
+            with self._collection_lock(collection_name):
+                with self._lock:
+                    if self.in_flight.get(collection_name):
+                        continue
+                    self.loaded.discard(collection_name)
+                self.client.release_collection(collection_name=collection_name)
+                self.logger.info("Released idle collection %s", collection_name)
+
+    def forget(self, collection_name: str) -> None:
+        """Mark a dropped or recreated collection as not loaded."""
+        with self._lock:
+            self.loaded.discard(collection_name)
+
+    def _collection_lock(self, collection_name: str) -> threading.Lock:
+        with self._lock:
+            return self._locks.setdefault(collection_name, threading.Lock())
+
+    def _start_reaper(self) -> None:
+        if self.idle_seconds <= 0 or self._reaper is not None:
+            return
+        with self._lock:
+            if self._reaper is not None:
+                return
+            self._reaper = threading.Thread(
+                target=self._reap, name="collection-reaper", daemon=True
+            )
+        self._reaper.start()
+
+    def _reap(self) -> None:
+        while True:
+            time.sleep(max(1.0, self.idle_seconds / 2))
+            try:
+                self.release_idle()
+            except Exception as e:
+                self.logger.warning("Failed to release idle collections: %s", e)
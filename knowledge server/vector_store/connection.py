@@ -0,0 +1,137 @@
+import logging
+import random
+import time
+
+import grpc
+from pymilvus import MilvusClient
+from pymilvus.client.types import LoadState
+from pymilvus.exceptions import MilvusException, MilvusUnavailableException
+
+from config.config import VectorStoreConfig
+from profiling.profiler import NullProfiler
+
+RETRYABLE_STATUS = {
+    grpc.StatusCode.UNAVAILABLE,
+    grpc.StatusCode.DEADLINE_EXCEEDED,
+    grpc.StatusCode.RESOURCE_EXHAUSTED,
+}
+# Writes with auto_id may have been applied when the deadline expired, so they
+# are only retried when the server was not reachable at all.
+NON_IDEMPOTENT_METHODS = {"insert", "upsert"}
+# Calls attributed to the "milvus" profiler stage.
+PROFILED_METHODS = {"insert", "upsert", "flush", "search", "hybrid_search"}
+
+
+def is_retryable(error: Exception, method: str) -> bool:
+    if isinstance(error, MilvusUnavailableException):
+        return True
+    if isinstance(error, grpc.RpcError) and isinstance(error, grpc.Call):
+        status = error.code()
+        if method in NON_IDEMPOTENT_METHODS:
+            return status == grpc.StatusCode.UNAVAILABLE
+        return status in RETRYABLE_STATUS
+    if isinstance(error, MilvusException) and method not in NON_IDEMPOTENT_METHODS:
+        return "deadline exceeded" in str(error).lower()
+    return False
+
+
+class RetryingMilvusClient:
+    """
+    Proxy for MilvusClient that retries retryable errors with exponential
+    backoff and jitter. Every MilvusClient method is available unchanged.
+    Reads and writes run in the "milvus" stage of `profiler`.
+    """
+
+    def __init__(
+        self,
+        client: MilvusClient,
+        attempts: int,
+        backoff_seconds: float,
+        logger: logging.Logger,
+    ):
+        self._client = client
+        self._attempts = max(1, attempts)
+        self._backoff_seconds = backoff_seconds
+        self._logger = logger
+        self.profiler: NullProfiler = NullProfiler()
+
+    def __getattr__(self, name: str):
+        attribute = getattr(self._client, name)
+        if not callable(attribute):
+            return attribute
+
+        def call_with_retry(*args, **kwargs):
+            if name not in PROFILED_METHODS:
+                return call(*args, **kwargs)
+            with self.profiler.stage("milvus"):
+                return call(*args, **kwargs)
+
+        def call(*args, **kwargs):
+            for attempt in range(1, self._attempts + 1):
+                try:
+                    return attribute(*args, **kwargs)
+                except Exception as e:
+                    if attempt == self._attempts or not is_retryable(e, name):
+                        raise
+                    delay = self._backoff_seconds * 2 ** (attempt - 1)
+                    delay *= random.uniform(0.5, 1.5)
+                    self._logger.warning(
+                        "Milvus %s failed (attempt %d/%d), retrying in %.2fs: %s",
+                        name,
+                        attempt,
+                        self._attempts,
+                        delay,
+                        e,
+                    )
+                    time.sleep(delay)
+
+        return call_with_retry
+
+
+def connect(config: VectorStoreConfig, logger: logging.Logger) -> RetryingMilvusClient:
+    # pymilvus builds the channel itself with a fixed 55s keepalive and no way
+    # to pass channel options, so keepalive is not configurable here.
+    client = MilvusClient(uri=config.url, timeout=config.timeout_seconds)
+    return RetryingMilvusClient(
+        client,
+        attempts=config.retry_attempts,
+        backoff_seconds=config.retry_backoff_seconds,
+        logger=logger,
+    )
+
+
+def wait_until_ready(
+    client: RetryingMilvusClient,
+    collection_name: str,
+    timeout_seconds: float,
+    logger: logging.Logger,
+) -> None:
+    """
+    Wait for every index of the collection to finish building, then load it
+    into memory so the first queries do not pay the load.
+    """
+    deadline = time.monotonic() + timeout_seconds
+    for index_name in client.list_indexes(collection_name=collection_name):
+        while True:
+            index = client.describe_index(
+                collection_name=collection_name, index_name=index_name
+            )
+            pending = index.get("pending_index_rows", 0)
+            if not pending:
+                break
+            if time.monotonic() > deadline:
+                raise TimeoutError(
+                    f"Index {index_name} of {collection_name} still has "
+                    f"{pending} pending rows after {timeout_seconds}s"
+                )
+            logger.info("Waiting for index %s: %d rows pending", index_name, pending)
+            time.sleep(1)
+
+    client.load_collection(collection_name=collection_name)
+    while client.get_load_state(collection_name=collection_name)["state"] != (
+        LoadState.Loaded
+    ):
+        if time.monotonic() > deadline:
+            raise TimeoutError(f"Collection {collection_name} did not load in time")
+        time.sleep(1)
+    logger.info("Collection %s is loaded and indexed", collection_name)
@@ -0,0 +1,38 @@
+import logging
+from typing import TYPE_CHECKING
+
+from langchain_core.embeddings import Embeddings
+
+from config.config import VectorStoreConfig
+from registry.lazy import LazyRegistry
+
+if TYPE_CHECKING:
+    from vector_store.milvus import MilvusVectorStore
+
+VECTOR_STORES = LazyRegistry(
+    "vector store type",
+    {
+        "milvus": "vector_store.milvus:MilvusVectorStore",
+    },
+)
+
+
+class VectorStoreFactory:
+    @staticmethod
+    def get_vector_store(
+        config: VectorStoreConfig,
+        chunk_size: int,
+        chunk_overlap: int,
+        embeddings: Embeddings,
+        logger: logging.Logger,
+        vector_dim: int | None = None,
+    ) -> "MilvusVectorStore":
+        vector_store_class = VECTOR_STORES.get(config.type)
+        return vector_store_class(
+            config,
+            chunk_size=chunk_size,
+            chunk_overlap=chunk_overlap,
+            embeddings=embeddings,
+            logger=logger,
+            vector_dim=vector_dim,
+        )
@@ -0,0 +1,112 @@
+import json
+from datetime import date, datetime, timezone
+
+
+def parse_timestamp(value) -> int | None:
+    """
+    Convert an ISO-8601 date/datetime string or a unix timestamp (seconds or
+    milliseconds) into unix seconds. Returns None when the value is not a date.
+    """
+    parsed = _parse_date(value)
+    return parsed[0] if parsed is not None else None
+
+
+def _parse_date(value) -> tuple[int, bool] | None:
+    """Return the unix seconds of `value` and whether it is a date without a time."""
+    if value is None or value == "" or isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return _unix_seconds(int(value)), False
+
+    text = str(value).strip()
+    # only 10 (seconds) or 13 (milliseconds) digits are unix timestamps, so
+    # basic ISO dates such as 20240101 are parsed as dates
+    if text.isdigit() and len(text) in (10, 13):
+        return _unix_seconds(int(text)), False
+    if text.startswith("D:"):  # raw PDF date, e.g. D:20181208102700+07'00'
+        try:
+            parsed = datetime.strptime(text[2:16], "%Y%m%d%H%M%S")
+        except ValueError:
+            return None
+        date_only = False
+    else:
+        try:
+            day = date.fromisoformat(text)
+        except ValueError:
+            try:
+                parsed = datetime.fromisoformat(text.replace("Z", "+00:00"))
+            except ValueError:
+                return None
+            date_only = False
+        else:
+            parsed = datetime(day.year, day.month, day.day)
+            date_only = True
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return int(parsed.timestamp()), date_only
+
+
+def _unix_seconds(timestamp: int) -> int:
+    return timestamp // 1000 if timestamp > 10**11 else timestamp
+
+
+class SearchFilter:
+    """
+    Scalar filter applied inside Milvus before vector scoring. Every field is
+    optional; list fields match any of the given values and `title` is a
+    prefix match so it can use the inverted index.
+    """
+
+    source: list[str]
+    type: list[str]
+    space_name: list[str]
+    title: str
+    date_from: int | None
+    date_to: int | None
+
+    def __init__(
+        self,
+        source: list[str] | None = None,
+        type: list[str] | None = None,
+        space_name: list[str] | None = None,
+        title: str = "",
+        date_from: str | int | None = None,
+        date_to: str | int | None = None,
+    ):
+        self.source = source or []
+        self.type = type or []
+        self.space_name = space_name or []
+        self.title = title or ""
+        self.date_from = parse_timestamp(date_from)
+        self.date_to = None
+        parsed_to = _parse_date(date_to)
+        if parsed_to is not None:
+            self.date_to, date_only = parsed_to
+            if date_only:
+                self.date_to += 24 * 60 * 60 - 1  # date-only upper bound is inclusive
+
+        if date_from not in (None, "") and self.date_from is None:
+            raise ValueError(f"Invalid date_from: {date_from}")
+        if date_to not in (None, "") and self.date_to is None:
+            raise ValueError(f"Invalid date_to: {date_to}")
+
+    def is_empty(self) -> bool:
+        return not self.to_expression()
+
+    def to_expression(self) -> str:
+        clauses = []
+        for field_name in ("source", "type", "space_name"):
+            values = getattr(self, field_name)
+            if values:
+                clauses.append(f"{field_name} in {json.dumps(list(values))}")
+        if self.title:
+            pattern = self.title.replace("%", "\\%").replace("_", "\\_") + "%"
+            clauses.append(f"title like {json.dumps(pattern)}")
+        if self.date_from is not None:
+            clauses.append(f"date >= {self.date_from}")
+        if self.date_to is not None:
+            clauses.append(f"date <= {self.date_to}")
+        return " and ".join(clauses)
+
+    def __repr__(self) -> str:
+        return f"SearchFilter({self.to_expression()!r})"
@@ -3,14 +3,74 @@ from pymilvus import (
     DataType,
     Function,
     FunctionType,
-    MilvusClient,
     RRFRanker,
 )
+import hashlib
+import json
 import logging
+import time
+from collections.abc import Callable, Iterator
+from concurrent.futures import ThreadPoolExecutor
+from operator import itemgetter
+import numpy as np
 from langchain_core.documents import Document
 from langchain_core.embeddings import Embeddings
 
 from config.config import VectorStoreConfig
+from profiling.profiler import NullProfiler
+from vector_store.collection_loader import CollectionLoader
+from vector_store.connection import connect
+from vector_store.filter import SearchFilter, parse_timestamp
+from vector_store.semantic_cache import SemanticQueryCache
+
+# Metadata keys promoted to indexed scalar fields so filters run inside Milvus.
+# Values are truncated to the field's max length (in bytes).
+SCALAR_FIELDS = {
+    "source": 1024,
+    "type": 64,
+    "space_name": 256,
+    "title": 512,
+}
+DATE_METADATA_KEYS = ("moddate", "creationdate", "updated_at")
+RRF_K = 60  # same smoothing constant as pymilvus' RRFRanker default
+DOCUMENT_KEY_MAX_LENGTH = 1024
+
+# (collection_name, partition_name, rows) of an inserted batch
+InsertCallback = Callable[[str, str | None, list[dict]], None]
+
+
+def document_key(metadata: dict) -> str:
+    """Key grouping the chunks of one document: its ingest unit, id or source."""
+    key = metadata.get("ingest_key") or metadata.get("document_id")
+    return str(key or metadata.get("source") or "")
+
+
+def documents_collection_name(collection_name: str) -> str:
+    """Companion collection holding one vector per document of `collection_name`."""
+    return f"{collection_name}_documents"
+
+
+def document_row_id(partition_name: str | None, doc_key: str) -> str:
+    """
+    Primary key of a document row. The same document key may exist in several
+    partitions, so the key is hashed together with the partition.
+    """
+    value = f"{partition_name or '_default'}\0{doc_key}"
+    return hashlib.sha256(value.encode("utf-8")).hexdigest()
+
+
+def truncate_utf8(value: str, max_length: int) -> str:
+    return value.encode("utf-8")[:max_length].decode("utf-8", errors="ignore")
+
+
+def truncate_embedding(vector, dim: int) -> np.ndarray:
+    """
+    Matryoshka truncation: keep the leading `dim` components and re-normalize
+    so inner product remains cosine similarity.
+    """
+    truncated = np.asarray(vector, dtype=np.float32)[..., :dim]
+    norm = np.linalg.norm(truncated, axis=-1, keepdims=True)
+    return truncated / np.maximum(norm, 1e-12)
 
 
 class MilvusVectorStore:
@@ -21,40 +81,117 @@ class MilvusVectorStore:
         chunk_overlap: int,
         embeddings: Embeddings,
         logger: logging.Logger,
+        vector_dim: int | None = None,
     ):
-        self.client = MilvusClient(uri=config.url)
+        self.client = connect(config, logger)
         self.chunk_size = chunk_size
         self.chunk_overlap = chunk_overlap
-        self.vector_dim = self._get_embedding_dimension(embeddings)
+        # a known dimension (e.g. from a snapshot) avoids a sample embedding
+        self.vector_dim = vector_dim or self._get_embedding_dimension(embeddings)
         self.config = config
         self.embeddings = embeddings
         self.logger = logger
+        self.two_stage = 0 < config.matryoshka_dim < self.vector_dim
+        self.document_search = config.document_search
+        self.query_cache = None
+        if config.query_cache_size > 0:
+            self.query_cache = SemanticQueryCache(
+                max_entries=config.query_cache_size,
+                dim=self.vector_dim,
+                threshold=config.query_cache_threshold,
+                ttl_seconds=config.query_cache_ttl_seconds,
+            )
+
+        self.loader = CollectionLoader(
+            self.client,
+            ready_timeout_seconds=config.ready_timeout_seconds,
+            idle_seconds=config.collection_idle_seconds,
+            logger=logger,
+        )
+        # collections searched by default, with their known partitions
+        self.collections: dict[str, set[str]] = {}
+        self._reset_done: set[str] = set()
+        self._search_pool: ThreadPoolExecutor | None = None
+        self.profiler: NullProfiler = NullProfiler()
+
+        self.ensure_collection(config.collection_name)
+
+    def set_profiler(self, profiler: NullProfiler) -> None:
+        """Attribute embedding, Milvus calls and queries to profiler stages."""
+        self.profiler = profiler
+        self.client.profiler = profiler
 
-        if config.reset_collection:
-            self._reset_collection()
+    def ensure_collection(self, collection_name: str) -> None:
+        """
+        Create `collection_name` if needed (recreate it once per process with
+        `reset_collection`) and add it to the collections searched by default.
+        """
+        if self.config.reset_collection and collection_name not in self._reset_done:
+            self._reset_done.add(collection_name)
+            self._reset_collection(collection_name)
         else:
-            self._ensure_collection_exists()
+            self._ensure_collection_exists(collection_name)
 
-        if not self.client.has_collection(self.config.collection_name):
-            raise ValueError(
-                f"Collection {self.config.collection_name} does not exist in Milvus."
+        if not self.client.has_collection(collection_name):
+            raise ValueError(f"Collection {collection_name} does not exist in Milvus.")
+        if collection_name not in self.collections:
+            self.collections[collection_name] = set(
+                self.client.list_partitions(collection_name=collection_name)
+            )
+
+    def load(self) -> None:
+        """
+        Wait for index builds, load the collections and run the configured
+        warm-up queries so the first real queries hit warm caches. With
+        `lazy_load_collections`, collections are loaded by their first query.
+        """
+        if not self.config.lazy_load_collections:
+            for collection_name in self.collections:
+                for name in self._collection_group(collection_name):
+                    self.loader.load(name)
+        for query in self.config.warmup_queries:
+            started = time.perf_counter()
+            results = self.search(query=query, top_k=4)
+            self.logger.info(
+                "Warm-up query %r returned %d results in %.1fms",
+                query,
+                len(results),
+                (time.perf_counter() - started) * 1000,
             )
+            for i, result in enumerate(results):
+                self.logger.debug("Result %d: %s", i + 1, result.page_content[:200])
 
     def _get_embedding_dimension(self, embeddings: Embeddings) -> int:
         sample_text = "sample"
         embedding = embeddings.embed_query(sample_text)
         return len(embedding)
 
-    def _ensure_collection_exists(self) -> None:
-        if not self.client.has_collection(self.config.collection_name):
-            self.__create_collection()
+    def _collection_group(self, collection_name: str) -> list[str]:
+        """The chunk collection and, with `document_search`, its document one."""
+        if self.document_search:
+            return [collection_name, documents_collection_name(collection_name)]
+        return [collection_name]
 
-    def _reset_collection(self) -> None:
-        if self.client.has_collection(self.config.collection_name):
-            self.client.drop_collection(self.config.collection_name)
-        self.__create_collection()
+    def _ensure_collection_exists(self, collection_name: str) -> None:
+        if not self.client.has_collection(collection_name):
+            self.__create_collection(collection_name)
+        if self.document_search:
+            documents_collection = documents_collection_name(collection_name)
+            if not self.client.has_collection(documents_collection):
+                self.__create_documents_collection(documents_collection)
+
+    def _reset_collection(self, collection_name: str) -> None:
+        for name in self._collection_group(collection_name):
+            if self.client.has_collection(name):
+                self.client.drop_collection(name)
+                self.loader.forget(name)
+        self.__create_collection(collection_name)
+        if self.document_search:
+            self.__create_documents_collection(
+                documents_collection_name(collection_name)
+            )
 
-    def __create_collection(self) -> None:
+    def __create_collection(self, collection_name: str) -> None:
         schema = self.client.create_schema(auto_id=True)
         schema.add_field(
             field_name="id",
@@ -82,13 +219,75 @@ class MilvusVectorStore:
             datatype=DataType.JSON,
             description="document metadata",
         )
+        for field_name, max_length in SCALAR_FIELDS.items():
+            schema.add_field(
+                field_name=field_name,
+                datatype=DataType.VARCHAR,
+                max_length=max_length,
+                default_value="",
+                description=f"metadata {field_name} promoted for filtering",
+            )
+        schema.add_field(
+            field_name="date",
+            datatype=DataType.INT64,
+            default_value=0,
+            description="document modification time in unix seconds, 0 if unknown",
+        )
 
         index_params = self.client.prepare_index_params()
+        if self.document_search:
+            schema.add_field(
+                field_name="doc_key",
+                datatype=DataType.VARCHAR,
+                max_length=DOCUMENT_KEY_MAX_LENGTH,
+                default_value="",
+                description="key of the document the chunk belongs to",
+            )
+            index_params.add_index(
+                field_name="doc_key",
+                index_name="doc_key_index",
+                index_type="INVERTED",
+            )
+        if self.two_stage:
+            # The full vector is only read back to re-score the candidates of
+            # the low-dimension ANN search, so it gets a FLAT index kept on
+            # disk through mmap instead of an in-memory ANN graph.
+            schema.add_field(
+                field_name="text_vector_dense_low",
+                datatype=DataType.FLOAT_VECTOR,
+                dim=self.config.matryoshka_dim,
+                description="matryoshka-truncated dense vector for first-stage search",
+            )
+            index_params.add_index(
+                field_name="text_vector_dense_low",
+                index_name="text_vector_dense_low_index",
+                index_type="AUTOINDEX",
+                metric_type="IP",
+            )
+            index_params.add_index(
+                field_name="text_vector_dense",
+                index_name="text_vector_dense_index",
+                index_type="FLAT",
+                metric_type="IP",
+                params={"mmap.enabled": "true"},
+            )
+        else:
+            index_params.add_index(
+                field_name="text_vector_dense",
+                index_name="text_vector_dense_index",
+                index_type="AUTOINDEX",  # Need to compare with IVF_FLAT
+                metric_type="IP",  # Need to compare with L2 (Euclidean)
+            )
+        for field_name in SCALAR_FIELDS:
+            index_params.add_index(
+                field_name=field_name,
+                index_name=f"{field_name}_index",
+                index_type="INVERTED",
+            )
         index_params.add_index(
-            field_name="text_vector_dense",
-            index_name="text_vector_dense_index",
-            index_type="AUTOINDEX",  # Need to compare with IVF_FLAT
-            metric_type="IP",  # Need to compare with L2 (Euclidean)
+            field_name="date",
+            index_name="date_index",
+            index_type="STL_SORT",
         )
 
         if self.config.enable_full_text_search:
@@ -116,61 +315,834 @@ class MilvusVectorStore:
             )
 
         self.client.create_collection(
-            collection_name=self.config.collection_name,
+            collection_name=collection_name,
             schema=schema,
             index_params=index_params,
         )
 
-    def __document_to_milvus_format(self, document: Document) -> dict:
-        return {
+    def __create_documents_collection(self, collection_name: str) -> None:
+        """
+        One row per document: the normalized mean of its chunk vectors and the
+        same filterable scalar fields as its chunks, so the document stage of
+        a search honours the query's filters.
+        """
+        schema = self.client.create_schema(auto_id=False)
+        schema.add_field(
+            field_name="id",
+            datatype=DataType.VARCHAR,
+            max_length=64,
+            is_primary=True,
+            description="hash of the partition and the document key",
+        )
+        schema.add_field(
+            field_name="doc_key",
+            datatype=DataType.VARCHAR,
+            max_length=DOCUMENT_KEY_MAX_LENGTH,
+            description="document key, as stored in the chunks' doc_key",
+        )
+        schema.add_field(
+            field_name="vector",
+            datatype=DataType.FLOAT_VECTOR,
+            dim=self.vector_dim,
+            description="normalized mean of the document's chunk embeddings",
+        )
+        index_params = self.client.prepare_index_params()
+        index_params.add_index(
+            field_name="vector",
+            index_name="vector_index",
+            index_type="AUTOINDEX",
+            metric_type="IP",
+        )
+        for field_name, max_length in SCALAR_FIELDS.items():
+            schema.add_field(
+                field_name=field_name,
+                datatype=DataType.VARCHAR,
+                max_length=max_length,
+                default_value="",
+                description=f"metadata {field_name} promoted for filtering",
+            )
+            index_params.add_index(
+                field_name=field_name,
+                index_name=f"{field_name}_index",
+                index_type="INVERTED",
+            )
+        schema.add_field(
+            field_name="date",
+            datatype=DataType.INT64,
+            default_value=0,
+            description="document modification time in unix seconds, 0 if unknown",
+        )
+        index_params.add_index(
+            field_name="date",
+            index_name="date_index",
+            index_type="STL_SORT",
+        )
+
+        self.client.create_collection(
+            collection_name=collection_name,
+            schema=schema,
+            index_params=index_params,
+        )
+
+    def __document_to_milvus_format(self, document: Document, vector) -> dict:
+        row = {
             "text": document.page_content,
-            "text_vector_dense": self.embeddings.embed_query(document.page_content),
+            "text_vector_dense": vector,
             "metadata": document.metadata,
         }
+        if self.two_stage:
+            row["text_vector_dense_low"] = truncate_embedding(
+                row["text_vector_dense"], self.config.matryoshka_dim
+            )
+        for field_name, max_length in SCALAR_FIELDS.items():
+            value = str(document.metadata.get(field_name) or "")
+            row[field_name] = truncate_utf8(value, max_length)
+        if self.document_search:
+            row["doc_key"] = truncate_utf8(
+                document_key(document.metadata), DOCUMENT_KEY_MAX_LENGTH
+            )
+        row["date"] = 0
+        for key in DATE_METADATA_KEYS:
+            timestamp = parse_timestamp(document.metadata.get(key))
+            if timestamp is not None:
+                row["date"] = timestamp
+                break
+        return row
 
-    def add_documents(self, documents: list[Document]) -> None:
+    def to_rows(self, documents: list[Document]) -> list[dict]:
+        # one embedding call per batch lets providers batch and bucket inputs;
+        # in-process providers hand back their float32 matrix via embed_array
+        texts = [doc.page_content for doc in documents]
+        embed_array = getattr(self.embeddings, "embed_array", None)
+        with self.profiler.stage("embed"):
+            if embed_array is not None:
+                vectors = embed_array(texts)
+            else:
+                vectors = self.embeddings.embed_documents(texts)
+            return self.rows_from_vectors(documents, vectors)
+
+    def rows_from_vectors(self, documents: list[Document], vectors) -> list[dict]:
+        """Build the rows of already embedded documents."""
+        # one float32 matrix whose rows are buffered as views, instead of
+        # a Python float object per component
+        vectors = np.asarray(vectors, dtype=np.float32)
+        return [
+            self.__document_to_milvus_format(doc, vector)
+            for doc, vector in zip(documents, vectors)
+        ]
+
+    def writer(
+        self,
+        on_insert: InsertCallback | None = None,
+        on_documents: Callable[[], None] | None = None,
+    ) -> "MilvusBufferedWriter":
+        """
+        Return a buffered writer for bulk ingestion. Use it as a context manager
+        so the remaining buffer is inserted and flushed on exit. `on_insert` is
+        called with the collection, partition and rows of every inserted batch,
+        and `on_documents` once the document vectors of every row inserted so
+        far are written.
+        """
+        return MilvusBufferedWriter(
+            store=self,
+            batch_size=self.config.insert_batch_size,
+            batch_bytes=self.config.insert_batch_bytes,
+            flush_interval_seconds=self.config.flush_interval_seconds,
+            logger=self.logger,
+            on_insert=on_insert,
+            on_documents=on_documents,
+        )
+
+    def add_documents(
+        self,
+        documents: list[Document],
+        partition_name: str | None = None,
+        collection_name: str | None = None,
+    ) -> None:
         self.logger.debug("Adding %d documents to the collection", len(documents))
-        data = [self.__document_to_milvus_format(doc) for doc in documents]
-        self.client.insert(
-            collection_name=self.config.collection_name,
-            data=data,
+        with self.writer() as writer:
+            writer.add_documents(
+                documents,
+                partition_name=partition_name,
+                collection_name=collection_name,
+            )
+
+    def ensure_partition(
+        self, partition_name: str, collection_name: str | None = None
+    ) -> None:
+        collection_name = collection_name or self.config.collection_name
+        # document vectors are partitioned like their chunks
+        for name in self._collection_group(collection_name):
+            if not self.client.has_partition(
+                collection_name=name,
+                partition_name=partition_name,
+            ):
+                self.client.create_partition(
+                    collection_name=name,
+                    partition_name=partition_name,
+                )
+        self.collections.setdefault(collection_name, set()).add(partition_name)
+
+    def reset_partition(
+        self, partition_name: str, collection_name: str | None = None
+    ) -> None:
+        """
+        Drop every chunk of one datasource by dropping its partition, leaving
+        the rest of the collection untouched.
+        """
+        collection_name = collection_name or self.config.collection_name
+        self.invalidate_query_cache()
+        for name in self._collection_group(collection_name):
+            if self.client.has_partition(
+                collection_name=name,
+                partition_name=partition_name,
+            ):
+                # a loaded partition cannot be dropped
+                self.client.release_partitions(
+                    collection_name=name,
+                    partition_names=[partition_name],
+                )
+                self.client.drop_partition(
+                    collection_name=name,
+                    partition_name=partition_name,
+                )
+        self.ensure_partition(partition_name, collection_name=collection_name)
+
+    def delete_unit(
+        self, ingest_key: str, partition_name: str, collection_name: str | None = None
+    ) -> None:
+        """Delete the chunks of one ingest unit, e.g. left by an interrupted run."""
+        collection_name = collection_name or self.config.collection_name
+        # deleting by expression queries the collection, which must be loaded
+        self.loader.load(collection_name)
+        self.client.delete(
+            collection_name=collection_name,
+            filter=f'metadata["ingest_key"] == {json.dumps(ingest_key)}',
+            partition_name=partition_name,
+        )
+        if self.document_search:
+            documents_collection = documents_collection_name(collection_name)
+            self.loader.load(documents_collection)
+            self.client.delete(
+                collection_name=documents_collection,
+                ids=[
+                    document_row_id(
+                        partition_name,
+                        truncate_utf8(ingest_key, DOCUMENT_KEY_MAX_LENGTH),
+                    )
+                ],
+                partition_name=partition_name,
+            )
+        self.invalidate_query_cache()
+
+    def iter_chunks(
+        self,
+        partition_name: str,
+        collection_name: str | None = None,
+        batch_size: int = 1000,
+    ) -> Iterator[Document]:
+        """Yield the text and metadata of every chunk stored in one partition."""
+        collection_name = collection_name or self.config.collection_name
+        self.loader.load(collection_name)
+        iterator = self.client.query_iterator(
+            collection_name=collection_name,
+            batch_size=batch_size,
+            filter="",
+            output_fields=["text", "metadata"],
+            partition_names=[partition_name],
+        )
+        try:
+            while batch := iterator.next():
+                for row in batch:
+                    yield Document(
+                        page_content=row["text"], metadata=row["metadata"] or {}
+                    )
+        finally:
+            iterator.close()
+
+    def mean_chunk_vectors(
+        self,
+        doc_keys: list[str],
+        partition_name: str | None,
+        collection_name: str,
+        batch_size: int = 1000,
+    ) -> dict[str, np.ndarray]:
+        """
+        Normalized mean of the stored chunk vectors of each document, read
+        back from Milvus so chunks inserted by other writers are included.
+        """
+        self.loader.load(collection_name)
+        iterator = self.client.query_iterator(
+            collection_name=collection_name,
+            batch_size=batch_size,
+            filter=f"doc_key in {json.dumps(doc_keys)}",
+            output_fields=["doc_key", "text_vector_dense"],
+            partition_names=[partition_name or "_default"],
+            consistency_level="Strong",
+        )
+        sums: dict[str, np.ndarray] = {}
+        try:
+            while batch := iterator.next():
+                for row in batch:
+                    vector = np.asarray(row["text_vector_dense"], dtype=np.float32)
+                    if row["doc_key"] in sums:
+                        sums[row["doc_key"]] += vector
+                    else:
+                        sums[row["doc_key"]] = vector.copy()
+        finally:
+            iterator.close()
+        # the mean and the sum point the same way, so normalizing the sum suffices
+        return {
+            doc_key: vector_sum / max(float(np.linalg.norm(vector_sum)), 1e-12)
+            for doc_key, vector_sum in sums.items()
+        }
+
+    def invalidate_query_cache(self) -> None:
+        if self.query_cache is not None:
+            self.query_cache.invalidate()
+
+    def search(
+        self,
+        query: str,
+        top_k: int = 4,
+        search_filter: SearchFilter | None = None,
+        partition_names: list[str] | None = None,
+        collection_names: list[str] | None = None,
+    ) -> list[Document]:
+        """
+        Search `collection_names` (default: every known collection) in
+        parallel and fuse their rankings with RRF. With `partition_names`,
+        each collection is searched in the partitions it holds, and
+        collections holding none of them are skipped.
+        """
+        with self.profiler.stage("query"):
+            return self._cached_search(
+                query, top_k, search_filter, partition_names, collection_names
+            )
+
+    def _cached_search(
+        self,
+        query: str,
+        top_k: int,
+        search_filter: SearchFilter | None,
+        partition_names: list[str] | None,
+        collection_names: list[str] | None,
+    ) -> list[Document]:
+        # The filter is evaluated against the scalar indexes before the ANN
+        # scoring, so a scoped query touches fewer rows than an unscoped one.
+        expr = search_filter.to_expression() if search_filter else ""
+        if expr:
+            self.logger.debug("Searching with filter: %s", expr)
+
+        targets = self._route(partition_names, collection_names)
+        cache = self.query_cache
+        if cache is None:
+            query_vector = self.embeddings.embed_query(query)
+            return self._search(query, query_vector, top_k, expr, targets)
+
+        # paraphrases of a recent query reuse its results and skip Milvus
+        signature = (
+            top_k,
+            expr,
+            tuple(sorted((name, tuple(sorted(p))) for name, p in targets.items())),
         )
-        self.client.flush(collection_name=self.config.collection_name)
+        results = cache.get_exact(query, signature)
+        if results is not None:
+            return results
+        query_vector = self.embeddings.embed_query(query)
+        results = cache.get(query_vector, signature)
+        if results is not None:
+            self.logger.debug("Query cache hit for %r", query)
+            return results
 
-    def search(self, query: str, top_k: int = 4) -> list[Document]:
+        generation = cache.generation
+        results = self._search(query, query_vector, top_k, expr, targets)
+        cache.put(query, query_vector, signature, results, generation)
+        return results
+
+    def _route(
+        self, partition_names: list[str] | None, collection_names: list[str] | None
+    ) -> dict[str, list[str]]:
+        """
+        Map each collection to search to its partitions (empty for all). Only
+        the knowledge collections this store manages can be named; unknown
+        names and the `_documents` companions are rejected.
+        """
+        unknown = [
+            name for name in collection_names or [] if name not in self.collections
+        ]
+        if unknown:
+            raise ValueError(
+                f"Unknown collections {unknown}, expected any of "
+                f"{sorted(self.collections)}"
+            )
+        targets = {}
+        for collection_name in collection_names or list(self.collections):
+            if not partition_names:
+                targets[collection_name] = []
+                continue
+            known = self.collections.get(collection_name, set())
+            partitions = [name for name in partition_names if name in known]
+            if partitions:
+                targets[collection_name] = partitions
+        return targets
+
+    def _search(
+        self,
+        query: str,
+        query_vector: list[float],
+        top_k: int,
+        expr: str,
+        targets: dict[str, list[str]],
+    ) -> list[Document]:
+        if len(targets) <= 1:
+            rankings = [
+                self._search_collection(name, query, query_vector, top_k, expr, p)
+                for name, p in targets.items()
+            ]
+            return self._hits_to_documents(rankings[0] if rankings else [])
+
+        if self._search_pool is None:
+            self._search_pool = ThreadPoolExecutor(
+                max_workers=self.config.search_fanout_threads,
+                thread_name_prefix="collection-search",
+            )
+        futures = [
+            self._search_pool.submit(
+                self._search_collection, name, query, query_vector, top_k, expr, p
+            )
+            for name, p in targets.items()
+        ]
+        # primary keys are only unique within a collection
+        rankings = [
+            [((name, hit["id"]), hit) for hit in future.result()]
+            for name, future in zip(targets, futures)
+        ]
+        fused = reciprocal_rank_fusion(rankings, top_k, key=lambda item: item[0])
+        return self._hits_to_documents([hit for _, hit in fused])
+
+    def _search_collection(
+        self,
+        collection_name: str,
+        query: str,
+        query_vector: list[float],
+        top_k: int,
+        expr: str,
+        partition_names: list[str],
+    ) -> list:
+        with self.loader.use(collection_name):
+            if self.document_search:
+                restricted = self._restrict_to_documents(
+                    collection_name, query_vector, expr, partition_names
+                )
+                if restricted is None:
+                    return []
+                expr = restricted
+            if self.two_stage:
+                return self._two_stage_search(
+                    collection_name, query, query_vector, top_k, expr, partition_names
+                )
+            return self._hybrid_search(
+                collection_name, query, query_vector, top_k, expr, partition_names
+            )
+
+    def _restrict_to_documents(
+        self,
+        collection_name: str,
+        query_vector: list[float],
+        expr: str,
+        partition_names: list[str],
+    ) -> str | None:
+        """
+        Document stage of a hierarchical search: find the
+        `document_candidates` documents closest to the query and return `expr`
+        narrowed to their chunks, or None when no document matches.
+        """
+        documents_collection = documents_collection_name(collection_name)
+        with self.loader.use(documents_collection):
+            hits = self.client.search(
+                collection_name=documents_collection,
+                data=[np.asarray(query_vector, dtype=np.float32)],
+                anns_field="vector",
+                limit=self.config.document_candidates,
+                filter=expr,
+                output_fields=["doc_key"],
+                search_params={"metric_type": "IP"},
+                partition_names=partition_names or None,
+            )[0]
+        if not hits:
+            return None
+        clause = f"doc_key in {json.dumps([hit['entity']['doc_key'] for hit in hits])}"
+        return f"({expr}) and {clause}" if expr else clause
+
+    def _hybrid_search(
+        self,
+        collection_name: str,
+        query: str,
+        query_vector: list[float],
+        top_k: int,
+        expr: str,
+        partition_names: list[str],
+    ) -> list:
         vector_search = AnnSearchRequest(
-            data=[self.embeddings.embed_query(query)],
+            data=[query_vector],
             anns_field="text_vector_dense",
             param={"nprobe": 10},
             limit=top_k * 2,  # retrieve more to allow reranking
+            expr=expr or None,
         )
         full_text_search = AnnSearchRequest(
             data=[query],
             anns_field="text_vector_sparse",
             param={"drop_ratio_search": 0.2},
             limit=top_k * 2,  # retrieve more to allow reranking
+            expr=expr or None,
         )
         searchs = [vector_search]
         if self.config.enable_full_text_search:
             searchs.append(full_text_search)
 
         search_results = self.client.hybrid_search(
-            collection_name=self.config.collection_name,
+            collection_name=collection_name,
             reqs=searchs,
             ranker=RRFRanker(),
             limit=top_k,
             output_fields=["text", "metadata"],
+            partition_names=partition_names or None,
         )
 
+        return [hit for hits in search_results for hit in hits]
+
+    def _two_stage_search(
+        self,
+        collection_name: str,
+        query: str,
+        query_vector: list[float],
+        top_k: int,
+        expr: str,
+        partition_names: list[str],
+    ) -> list:
+        """
+        First stage: ANN over the truncated vectors for a wide candidate set.
+        Second stage: re-score the candidates with their full vectors, then
+        fuse with the full-text ranking using RRF, as hybrid_search would.
+        """
+        full_query = np.asarray(query_vector, dtype=np.float32)
+        low_query = truncate_embedding(full_query, self.config.matryoshka_dim)
+
+        candidates = self.client.search(
+            collection_name=collection_name,
+            data=[low_query],
+            anns_field="text_vector_dense_low",
+            limit=top_k * self.config.matryoshka_candidates,
+            filter=expr,
+            output_fields=["text", "metadata", "text_vector_dense"],
+            search_params={"metric_type": "IP"},
+            partition_names=partition_names or None,
+        )[0]
+
+        rankings = []
+        if candidates:
+            full_vectors = np.asarray(
+                [hit["entity"]["text_vector_dense"] for hit in candidates],
+                dtype=np.float32,
+            )
+            scores = full_vectors @ full_query
+            order = np.argsort(-scores)[: top_k * 2]
+            rankings.append([candidates[i] for i in order])
+
+        if self.config.enable_full_text_search:
+            rankings.append(
+                self.client.search(
+                    collection_name=collection_name,
+                    data=[query],
+                    anns_field="text_vector_sparse",
+                    limit=top_k * 2,
+                    filter=expr,
+                    output_fields=["text", "metadata"],
+                    search_params={
+                        "metric_type": "BM25",
+                        "params": {"drop_ratio_search": 0.2},
+                    },
+                    partition_names=partition_names or None,
+                )[0]
+            )
+
+        return reciprocal_rank_fusion(rankings, top_k)
+
+    def _hits_to_documents(self, hits: list) -> list[Document]:
         results = []
-        for hits in search_results:
-            for hit in hits:
-                if hit.entity is None:
-                    self.logger.warning("Hit entity is unexpected None, skipping.")
-                    continue
-                else:
-                    doc = Document(page_content=hit.entity.get("text"))
-                    doc.metadata = hit.entity.get("metadata")
-                    results.append(doc)
+        for hit in hits:
+            if hit.get("entity") is None:
+                self.logger.warning("Hit entity is unexpected None, skipping.")
+                continue
+            else:
+                doc = Document(page_content=hit["entity"].get("text"))
+                doc.metadata = hit["entity"].get("metadata")
+                results.append(doc)
 
         return results
+
+
+def reciprocal_rank_fusion(
+    rankings: list[list], limit: int, key: Callable = itemgetter("id")
+) -> list:
+    """Fuse ranked hit lists by summing 1 / (RRF_K + rank) per `key(hit)`."""
+    scores: dict = {}
+    hits: dict = {}
+    for ranking in rankings:
+        for rank, hit in enumerate(ranking, start=1):
+            hit_key = key(hit)
+            scores[hit_key] = scores.get(hit_key, 0.0) + 1.0 / (RRF_K + rank)
+            hits.setdefault(hit_key, hit)
+    ranked = sorted(scores, key=scores.__getitem__, reverse=True)
+    return [hits[pk] for pk in ranked[:limit]]
+
+
+class MilvusBufferedWriter:
+    """
+    Accumulates rows across documents and inserts them in batches bounded by
+    row count and approximate payload size. The collection is flushed only
+    when the writer is closed or, optionally, every `flush_interval_seconds`,
+    so segments are sealed per batch of work instead of per document.
+    Rows are buffered per collection and partition since one insert targets
+    one partition of one collection. Rows stay buffered until their insert
+    succeeds, so a failed insert can be retried, or its rows discarded.
+    With document search, the document vectors are written on every flush.
+    """
+
+    def __init__(
+        self,
+        store: MilvusVectorStore,
+        batch_size: int,
+        batch_bytes: int,
+        flush_interval_seconds: float,
+        logger: logging.Logger,
+        on_insert: InsertCallback | None = None,
+        on_documents: Callable[[], None] | None = None,
+    ):
+        self.store = store
+        self.batch_size = max(1, batch_size)
+        self.batch_bytes = max(1, batch_bytes)
+        self.flush_interval_seconds = flush_interval_seconds
+        self.logger = logger
+        self.on_insert = on_insert
+        self.on_documents = on_documents
+        self.rows: dict[tuple[str, str | None], list[dict]] = {}
+        # estimated payload size of every buffered row
+        self.row_bytes: dict[tuple[str, str | None], list[int]] = {}
+        self.inserted_rows = 0
+        self.last_flush = time.monotonic()
+        self.dirty: set[str] = set()
+        # scalar fields of every (collection, partition, doc_key) this writer
+        # inserted chunks for, whose document vectors are rewritten on flush
+        self.document_rows: dict[tuple[str, str | None, str], dict] = {}
+
+    def __enter__(self) -> "MilvusBufferedWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.close()
+            return
+        # do not let a second failure hide the one being raised
+        try:
+            self.close()
+        except Exception:
+            self.logger.exception("Failed to close the writer")
+
+    def add_documents(
+        self,
+        documents: list[Document],
+        partition_name: str | None = None,
+        collection_name: str | None = None,
+    ) -> None:
+        for start in range(0, len(documents), self.batch_size):
+            batch = documents[start : start + self.batch_size]
+            self.buffer_rows(
+                self.store.to_rows(batch),
+                partition_name=partition_name,
+                collection_name=collection_name,
+            )
+            self.insert_full()
+
+    def add_row(
+        self,
+        row: dict,
+        partition_name: str | None = None,
+        collection_name: str | None = None,
+    ) -> None:
+        self.buffer_rows(
+            [row], partition_name=partition_name, collection_name=collection_name
+        )
+        self.insert_full()
+
+    def buffer_rows(
+        self,
+        rows: list[dict],
+        partition_name: str | None = None,
+        collection_name: str | None = None,
+    ) -> None:
+        """Buffer `rows` without inserting them, see `insert_full`."""
+        key = (collection_name or self.store.config.collection_name, partition_name)
+        self.rows.setdefault(key, []).extend(rows)
+        self.row_bytes.setdefault(key, []).extend(
+            self._estimate_row_bytes(row) for row in rows
+        )
+
+    def insert_full(self) -> None:
+        """Insert every full batch, keeping the remainder buffered."""
+        for key in list(self.rows):
+            self._insert_buffer(key, full_only=True)
+        self._flush_if_due()
+
+    def insert_all(self) -> None:
+        for key in list(self.rows):
+            self._insert_buffer(key)
+
+    def discard(self) -> list[tuple[str, str | None, dict]]:
+        """Drop every buffered row, returning (collection, partition, row)."""
+        discarded = [
+            (collection_name, partition_name, row)
+            for (collection_name, partition_name), rows in self.rows.items()
+            for row in rows
+        ]
+        self.rows = {}
+        self.row_bytes = {}
+        return discarded
+
+    def close(self) -> None:
+        self.insert_all()
+        self.flush()
+        self.logger.debug("Writer closed after inserting %d rows", self.inserted_rows)
+
+    def flush(self) -> None:
+        if self.document_rows:
+            self._write_document_vectors()
+        for collection_name in self.dirty:
+            self.store.client.flush(collection_name=collection_name)
+        self.last_flush = time.monotonic()
+        self.dirty = set()
+
+    def _insert_buffer(
+        self, key: tuple[str, str | None], full_only: bool = False
+    ) -> None:
+        """
+        Insert the buffered rows of `key` in bounded batches. With `full_only`
+        a last batch below both bounds stays buffered.
+        """
+        rows = self.rows.get(key, [])
+        row_bytes = self.row_bytes.get(key, [])
+        collection_name, partition_name = key
+        while rows:
+            count = 0
+            batch_bytes = 0
+            while (
+                count < len(rows)
+                and count < self.batch_size
+                and batch_bytes < self.batch_bytes
+            ):
+                batch_bytes += row_bytes[count]
+                count += 1
+            full = count >= self.batch_size or batch_bytes >= self.batch_bytes
+            if full_only and not full:
+                break
+            batch = rows[:count]
+            self.logger.debug(
+                "Inserting batch of %d rows (~%d bytes) into %s/%s",
+                len(batch),
+                batch_bytes,
+                collection_name,
+                partition_name or "_default",
+            )
+            self.store.client.insert(
+                collection_name=collection_name,
+                data=batch,
+                partition_name=partition_name or "",
+            )
+            del rows[:count]
+            del row_bytes[:count]
+            self.inserted_rows += len(batch)
+            self.dirty.add(collection_name)
+            if self.store.document_search:
+                self._track_documents(collection_name, partition_name, batch)
+            if self.on_insert is not None:
+                self.on_insert(collection_name, partition_name, batch)
+            self.store.invalidate_query_cache()
+        if not rows:
+            self.rows.pop(key, None)
+            self.row_bytes.pop(key, None)
+
+    def _track_documents(
+        self, collection_name: str, partition_name: str | None, rows: list[dict]
+    ) -> None:
+        for row in rows:
+            key = (collection_name, partition_name, row["doc_key"])
+            if key not in self.document_rows:
+                self.document_rows[key] = {
+                    field_name: row[field_name]
+                    for field_name in (*SCALAR_FIELDS, "date")
+                }
+
+    def _write_document_vectors(self) -> None:
+        """
+        Upsert one row per document touched since the last flush into the companion
+        document collection. The chunks of a document may have been inserted
+        by several writers, e.g. across resumed runs, so the mean is computed
+        from every chunk stored in Milvus rather than from this writer's rows.
+        """
+        documents: dict[tuple[str, str | None], list[str]] = {}
+        for collection_name, partition_name, doc_key in self.document_rows:
+            documents.setdefault((collection_name, partition_name), []).append(doc_key)
+
+        for (collection_name, partition_name), doc_keys in documents.items():
+            documents_collection = documents_collection_name(collection_name)
+            for start in range(0, len(doc_keys), self.batch_size):
+                vectors = self.store.mean_chunk_vectors(
+                    doc_keys[start : start + self.batch_size],
+                    partition_name,
+                    collection_name,
+                )
+                rows = [
+                    {
+                        "id": document_row_id(partition_name, doc_key),
+                        "doc_key": doc_key,
+                        "vector": vector,
+                        **self.document_rows[
+                            (collection_name, partition_name, doc_key)
+                        ],
+                    }
+                    for doc_key, vector in vectors.items()
+                ]
+                if rows:
+                    self.store.client.upsert(
+                        collection_name=documents_collection,
+                        data=rows,
+                        partition_name=partition_name or "",
+                    )
+            self.dirty.add(documents_collection)
+            self.logger.debug(
+                "Upserted %d document vectors into %s",
+                len(doc_keys),
+                documents_collection,
+            )
+        self.document_rows = {}
+        if self.on_documents is not None:
+            self.on_documents()
+
+    def _flush_if_due(self) -> None:
+        if self.flush_interval_seconds <= 0:
+            return
+        if time.monotonic() - self.last_flush >= self.flush_interval_seconds:
+            self.flush()
+
+    @staticmethod
+    def _estimate_row_bytes(row: dict) -> int:
+        size = len(row["text"].encode("utf-8"))
+        size += 4 * len(row["text_vector_dense"])  # float32 on the wire
+        if "text_vector_dense_low" in row:
+            size += 4 * len(row["text_vector_dense_low"])
+        size += len(json.dumps(row["metadata"], default=str))
+        size += sum(len(row[field_name]) for field_name in SCALAR_FIELDS) + 8
+        size += len(row.get("doc_key", ""))
+        return size
@@ -0,0 +1,125 @@
+import threading
+import time
+from collections.abc import Hashable
+
+import numpy as np
+from langchain_core.documents import Document
+
+
+class SemanticQueryCache:
+    """
+    Cache of search results keyed by query embedding similarity.
+
+    Recent query embeddings are kept L2-normalized in one preallocated
+    (max_entries, dim) matrix, so a lookup is a single matrix-vector product.
+    A cached result is returned when its query has a cosine similarity of at
+    least `threshold` with the new one and was searched with the same
+    signature (top_k, filter, partitions). Entries expire after
+    `ttl_seconds`, the least recently used entry is replaced when the cache is
+    full, and `invalidate` drops everything after a write.
+    """
+
+    def __init__(
+        self, max_entries: int, dim: int, threshold: float, ttl_seconds: float
+    ):
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.vectors = np.zeros((max_entries, dim), dtype=np.float32)
+        self.queries: list[str | None] = [None] * max_entries
+        self.signatures: list[Hashable | None] = [None] * max_entries
+        self.signature_hashes = np.zeros(max_entries, dtype=np.int64)
+        self.results: list[list[Document] | None] = [None] * max_entries
+        self.created = np.zeros(max_entries, dtype=np.float64)
+        self.last_used = np.zeros(max_entries, dtype=np.float64)
+        self.valid = np.zeros(max_entries, dtype=bool)
+        self.slots: dict[tuple[str, Hashable], int] = {}
+        # bumped on every invalidation so searches that started before a
+        # write do not store their stale results afterwards
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def get_exact(self, query: str, signature: Hashable) -> list[Document] | None:
+        """Look up an identical query without embedding it."""
+        with self._lock:
+            now = time.monotonic()
+            self._expire(now)
+            slot = self.slots.get((query, signature))
+            if slot is not None and self.valid[slot]:
+                return self._hit(slot, now)
+        return None
+
+    def get(self, query_vector, signature: Hashable) -> list[Document] | None:
+        vector = self._normalize(query_vector)
+        with self._lock:
+            now = time.monotonic()
+            self._expire(now)
+            candidates = np.flatnonzero(
+                self.valid & (self.signature_hashes == hash(signature))
+            )
+            candidates = [
+                slot for slot in candidates if self.signatures[slot] == signature
+            ]
+            if candidates:
+                similarities = self.vectors[candidates] @ vector
+                best = int(np.argmax(similarities))
+                if similarities[best] >= self.threshold:
+                    return self._hit(candidates[best], now)
+            self.misses += 1
+        return None
+
+    def put(
+        self,
+        query: str,
+        query_vector,
+        signature: Hashable,
+        results: list[Document],
+        generation: int,
+    ) -> None:
+        vector = self._normalize(query_vector)
+        with self._lock:
+            if generation != self.generation:
+                return
+            now = time.monotonic()
+            slot = self.slots.get((query, signature))
+            if slot is None:
+                empty = np.flatnonzero(~self.valid)
+                if len(empty):
+                    slot = int(empty[0])
+                else:
+                    slot = int(np.argmin(self.last_used))
+                evicted = self.queries[slot]
+                if evicted is not None:
+                    self.slots.pop((evicted, self.signatures[slot]), None)
+                self.slots[(query, signature)] = slot
+            self.vectors[slot] = vector
+            self.queries[slot] = query
+            self.signatures[slot] = signature
+            self.signature_hashes[slot] = hash(signature)
+            self.results[slot] = list(results)
+            self.created[slot] = now
+            self.last_used[slot] = now
+            self.valid[slot] = True
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self.generation += 1
+            self.valid[:] = False
+            self.results = [None] * len(self.results)
+            self.queries = [None] * len(self.queries)
+            self.slots.clear()
+
+    def _hit(self, slot, now: float) -> list[Document]:
+        self.hits += 1
+        self.last_used[slot] = now
+        return list(self.results[slot])
+
+    def _expire(self, now: float) -> None:
+        if self.ttl_seconds > 0:
+            self.valid &= now - self.created < self.ttl_seconds
+
+    @staticmethod
+    def _normalize(query_vector) -> np.ndarray:
+        vector = np.asarray(query_vector, dtype=np.float32)
+        return vector / max(float(np.linalg.norm(vector)), 1e-12)
@@ -0,0 +1,218 @@
+import json
+import logging
+import os
+from datetime import datetime, timezone
+from typing import TYPE_CHECKING
+
+import numpy as np
+from langchain_core.documents import Document
+
+from config.config import EmbeddingsConfig
+from ingest.state import DONE, IngestState
+
+if TYPE_CHECKING:
+    from vector_store.milvus import MilvusVectorStore
+
+# A snapshot directory holds manifest.json (format version, collection, row
+# counts per partition, embedding model and vector dimension), chunks.parquet
+# (text, JSON metadata and partition of every chunk) and vectors.npy, a
+# (rows, dim) float32 matrix whose row i belongs to chunk i. pyarrow comes
+# from the `snapshot` extra.
+SNAPSHOT_VERSION = 1
+MANIFEST_FILE = "manifest.json"
+CHUNKS_FILE = "chunks.parquet"
+VECTORS_FILE = "vectors.npy"
+DEFAULT_PARTITION = "_default"
+
+
+def embeddings_identity(config: EmbeddingsConfig) -> dict:
+    return {"source": config.source, "model": config.model or config.model_path}
+
+
+def read_manifest(directory: str) -> dict:
+    with open(os.path.join(directory, MANIFEST_FILE), "r") as f:
+        manifest = json.load(f)
+    if manifest.get("version") != SNAPSHOT_VERSION:
+        raise ValueError(
+            f"Unsupported snapshot version {manifest.get('version')}, "
+            f"expected {SNAPSHOT_VERSION}"
+        )
+    return manifest
+
+
+def _vector_dim(client, collection_name: str) -> int:
+    for field in client.describe_collection(collection_name=collection_name)["fields"]:
+        if field["name"] == "text_vector_dense":
+            return int(field["params"]["dim"])
+    raise ValueError(f"Collection {collection_name} has no text_vector_dense field")
+
+
+def export_snapshot(
+    client,
+    collection_name: str,
+    directory: str,
+    embeddings_config: EmbeddingsConfig,
+    logger: logging.Logger,
+    batch_size: int = 1000,
+) -> dict:
+    """
+    Write every chunk of `collection_name` to a snapshot in `directory`,
+    reading it partition by partition with a query iterator. Vectors are
+    written straight into a memory-mapped `.npy` file.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    os.makedirs(directory, exist_ok=True)
+    client.load_collection(collection_name=collection_name)
+    dim = _vector_dim(client, collection_name)
+    counts = {}
+    for partition_name in client.list_partitions(collection_name=collection_name):
+        counts[partition_name] = client.query(
+            collection_name=collection_name,
+            filter="",
+            output_fields=["count(*)"],
+            partition_names=[partition_name],
+        )[0]["count(*)"]
+    total = sum(counts.values())
+
+    vectors = np.lib.format.open_memmap(
+        os.path.join(directory, VECTORS_FILE),
+        mode="w+",
+        dtype=np.float32,
+        shape=(total, dim),
+    )
+    schema = pa.schema(
+        [("text", pa.string()), ("metadata", pa.string()), ("partition", pa.string())]
+    )
+    offset = 0
+    with pq.ParquetWriter(
+        os.path.join(directory, CHUNKS_FILE), schema, compression="zstd"
+    ) as writer:
+        for partition_name, count in counts.items():
+            if count == 0:
+                continue
+            iterator = client.query_iterator(
+                collection_name=collection_name,
+                batch_size=batch_size,
+                filter="",
+                output_fields=["text", "metadata", "text_vector_dense"],
+                partition_names=[partition_name],
+            )
+            while batch := iterator.next():
+                if offset + len(batch) > total:
+                    iterator.close()
+                    raise RuntimeError(
+                        f"Collection {collection_name} changed during the export"
+                    )
+                vectors[offset : offset + len(batch)] = [
+                    row["text_vector_dense"] for row in batch
+                ]
+                offset += len(batch)
+                writer.write_table(
+                    pa.table(
+                        {
+                            "text": [row["text"] for row in batch],
+                            "metadata": [
+                                json.dumps(row["metadata"], default=str)
+                                for row in batch
+                            ],
+                            "partition": [partition_name] * len(batch),
+                        },
+                        schema=schema,
+                    )
+                )
+            iterator.close()
+            logger.info("Exported %d chunks of partition %s", count, partition_name)
+
+    if offset != total:
+        raise RuntimeError(f"Collection {collection_name} changed during the export")
+    vectors.flush()
+    del vectors
+
+    manifest = {
+        "version": SNAPSHOT_VERSION,
+        "collection": collection_name,
+        "rows": total,
+        "dim": dim,
+        "dtype": "float32",
+        "partitions": counts,
+        "embeddings": embeddings_identity(embeddings_config),
+        "created_at": datetime.now(timezone.utc).isoformat(),
+    }
+    with open(os.path.join(directory, MANIFEST_FILE), "w") as f:
+        json.dump(manifest, f, indent=2)
+    logger.info("Exported %d chunks of %s to %s", total, collection_name, directory)
+    return manifest
+
+
+def import_snapshot(
+    store: "MilvusVectorStore",
+    directory: str,
+    collection_name: str,
+    embeddings_config: EmbeddingsConfig,
+    logger: logging.Logger,
+    state: IngestState | None = None,
+    batch_size: int = 1000,
+) -> int:
+    """
+    Bulk-load a snapshot into `collection_name` through the store's buffered
+    writer, without any embedding call. The vector file is memory-mapped, so
+    only one batch is resident at a time. Imported ingest units are recorded
+    as done in `state` so the next ingest run does not load them again.
+    """
+    import pyarrow.parquet as pq
+
+    manifest = read_manifest(directory)
+    if manifest["dim"] != store.vector_dim:
+        raise ValueError(
+            f"Snapshot vectors have {manifest['dim']} dimensions, "
+            f"the store expects {store.vector_dim}"
+        )
+    identity = embeddings_identity(embeddings_config)
+    if manifest["embeddings"] != identity:
+        raise ValueError(
+            f"Snapshot was embedded with {manifest['embeddings']}, "
+            f"the configured embeddings are {identity}"
+        )
+
+    vectors = np.load(os.path.join(directory, VECTORS_FILE), mmap_mode="r")
+    if vectors.shape != (manifest["rows"], manifest["dim"]):
+        raise ValueError(f"Snapshot vectors have an unexpected shape {vectors.shape}")
+
+    store.ensure_collection(collection_name)
+    for partition_name in manifest["partitions"]:
+        if partition_name != DEFAULT_PARTITION:
+            store.ensure_partition(partition_name, collection_name)
+
+    units = set()
+    offset = 0
+    chunks = pq.ParquetFile(os.path.join(directory, CHUNKS_FILE))
+    with store.writer() as writer:
+        for batch in chunks.iter_batches(batch_size=batch_size):
+            columns = batch.to_pydict()
+            documents = [
+                Document(page_content=text, metadata=json.loads(metadata))
+                for text, metadata in zip(columns["text"], columns["metadata"])
+            ]
+            rows = store.rows_from_vectors(
+                documents, vectors[offset : offset + len(documents)]
+            )
+            offset += len(documents)
+            for row, partition_name in zip(rows, columns["partition"]):
+                if partition_name == DEFAULT_PARTITION:
+                    partition_name = None
+                writer.add_row(
+                    row, partition_name=partition_name, collection_name=collection_name
+                )
+                ingest_key = row["metadata"].get("ingest_key")
+                if ingest_key:
+                    units.add((f"{collection_name}/{partition_name}", ingest_key))
+
+    if state is not None:
+        for datasource_key, key in units:
+            state.mark(datasource_key, key, DONE)
+    logger.info(
+        "Imported %d chunks into %s from %s", offset, collection_name, directory
+    )
+    return offset